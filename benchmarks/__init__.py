@@ -0,0 +1,5 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+"""
+This module contains the package benchmarks, written to be run by airspeed
+velocity (asv) or directly as scripts.
+"""
@@ -0,0 +1,78 @@
+"""
+Benchmarks of the compressed storage of archived csv files, the compression
+ratio against the time to compress and read back each of the bundled test
+files with each method and level.
+
+Run directly for the trade-off of each method and level,
+
+    python benchmarks/compression.py
+
+@author:
+    Oscar Sage David O'Hara
+@email:
+    oharao@tcd.ie
+"""
+
+import shutil
+import tempfile
+import timeit
+from pathlib import Path
+
+from sidpy import compression
+from sidpy.compression import compress_file
+from sidpy.reader import read_file, read_header
+
+DATA = Path(__file__).parent.parent / 'sidpy' / 'tests' / 'data'
+FILES = {'sid': DATA / '20210703_000000_NAA_S-0055.csv',
+         'super_sid': DATA / 'Dunsink_NAA_2021-07-10_000000.csv'}
+# None is the plain csv, as archived without compression.
+METHODS = [(None, None), ('gzip', 1), ('gzip', 6), ('gzip', 9)]
+if compression.zstandard is not None:
+    METHODS += [('zstd', 3), ('zstd', 9), ('zstd', 19)]
+
+
+def store(source, directory, method, level):
+    if method is None:
+        return Path(shutil.copy(source, directory))
+    return compress_file(source, directory, method, level)
+
+
+class Compression:
+    params = [list(FILES), ['{}-{}'.format(*method) for method in METHODS]]
+    param_names = ['instrument', 'method']
+
+    def setup(self, instrument, method):
+        self.directory = tempfile.mkdtemp()
+        self.method, self.level = METHODS[self.params[1].index(method)]
+        self.path = store(FILES[instrument], self.directory, self.method, self.level)
+
+    def teardown(self, instrument, method):
+        shutil.rmtree(self.directory)
+
+    def time_compress(self, instrument, method):
+        store(FILES[instrument], self.directory, self.method, self.level)
+
+    def time_read_header(self, instrument, method):
+        read_header(self.path)
+
+    def time_read_file(self, instrument, method):
+        read_file(self.path)
+
+    def track_ratio(self, instrument, method):
+        return FILES[instrument].stat().st_size / self.path.stat().st_size
+    track_ratio.unit = 'ratio'
+
+
+if __name__ == '__main__':
+    print('{:<10} {:<8} {:>6} {:>8} {:>14} {:>14}'.format('file', 'method', 'level', 'ratio', 'compress (s)',
+                                                           'read (s)'))
+    with tempfile.TemporaryDirectory() as directory:
+        for instrument, source in FILES.items():
+            for method, level in METHODS:
+                compress = min(timeit.repeat(lambda: store(source, directory, method, level), number=1, repeat=3))
+                path = store(source, directory, method, level)
+                read = min(timeit.repeat(lambda: read_file(path), number=1, repeat=5))
+                print('{:<10} {:<8} {:>6} {:>8.2f} {:>14.3f} {:>14.3f}'.format(
+                    instrument, method or 'none', level or '-', source.stat().st_size / path.stat().st_size,
+                    compress, read))
+                path.unlink()
@@ -0,0 +1,68 @@
+"""
+Benchmarks of the startup cost of the ``sidpy`` command and the processing
+modules, each imported within a fresh interpreter.
+
+Run directly, as in CI, for the import time of each module. The exit status is
+non-zero if a module imports a heavy dependency it should only import once
+needed,
+
+    python benchmarks/imports.py
+
+@author:
+    Oscar Sage David O'Hara
+@email:
+    oharao@tcd.ie
+"""
+
+import subprocess
+import sys
+
+MODULES = ['sidpy.cli', 'sidpy.run', 'sidpy.watch', 'sidpy.reader', 'sidpy.render']
+# Dependencies which must not be imported by each module until they are used.
+DEFERRED = {'sidpy.cli': ['numpy', 'pandas', 'scipy', 'matplotlib', 'astral'],
+            'sidpy.run': ['pandas', 'scipy', 'matplotlib', 'astral'],
+            'sidpy.watch': ['scipy', 'matplotlib'],
+            'sidpy.reader': ['scipy', 'matplotlib']}
+
+
+class Imports:
+    params = MODULES
+    param_names = ['module']
+
+    def timeraw_import(self, module):
+        return 'import {}'.format(module)
+
+
+def import_time(module):
+    """
+    Import a module within a fresh interpreter.
+
+    Returns
+    -------
+    seconds : float
+        Cumulative import time of the module.
+    imported : set
+        Top level packages imported.
+    """
+    output = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import {}'.format(module)],
+                            stderr=subprocess.PIPE, universal_newlines=True, check=True).stderr
+    imported, seconds = set(), 0.0
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        imported.add(name.strip().split('.')[0])
+        if name.strip() == module:
+            seconds = int(cumulative) / 1e6
+    return seconds, imported
+
+
+if __name__ == '__main__':
+    failed = False
+    print('{:<14} {:>10}  {}'.format('module', 'time (s)', 'deferred dependencies imported'))
+    for module in MODULES:
+        seconds, imported = min((import_time(module) for _ in range(3)), key=lambda result: result[0])
+        eager = sorted(set(DEFERRED.get(module, [])) & imported)
+        failed = failed or bool(eager)
+        print('{:<14} {:>10.3f}  {}'.format(module, seconds, ', '.join(eager) or '-'))
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,48 @@
+"""
+Benchmarks comparing the single pass reader against read_csv, get_header and
+get_data on the bundled test files.
+
+Run directly for a quick comparison,
+
+    python benchmarks/ingest.py
+
+@author:
+    Oscar Sage David O'Hara
+@email:
+    oharao@tcd.ie
+"""
+
+import timeit
+from pathlib import Path
+
+from sidpy.reader import read_file
+from sidpy.vlfclient import VLFClient
+
+DATA = Path(__file__).parent.parent / 'sidpy' / 'tests' / 'data'
+FILES = {'sid': (DATA / '20210703_000000_NAA_S-0055.csv', True),
+         'super_sid': (DATA / 'Dunsink_NAA_2021-07-10_000000.csv', False)}
+
+
+def legacy_read(filename, original_sid):
+    df = VLFClient.read_csv(filename)
+    header = VLFClient.get_header(df)
+    return header, VLFClient.get_data(df, original_sid)
+
+
+class Ingest:
+    params = list(FILES)
+    param_names = ['instrument']
+
+    def time_legacy(self, instrument):
+        legacy_read(*FILES[instrument])
+
+    def time_read_file(self, instrument):
+        read_file(*FILES[instrument])
+
+
+if __name__ == '__main__':
+    print('{:<10} {:>12} {:>12} {:>8}'.format('file', 'legacy (s)', 'single (s)', 'speedup'))
+    for instrument, (filename, original_sid) in FILES.items():
+        legacy = min(timeit.repeat(lambda: legacy_read(filename, original_sid), number=1, repeat=3))
+        single = min(timeit.repeat(lambda: read_file(filename, original_sid), number=1, repeat=3))
+        print('{:<10} {:>12.3f} {:>12.3f} {:>7.1f}x'.format(instrument, legacy, single, legacy / single))
@@ -0,0 +1,186 @@
+"""
+Benchmarks of each stage of the processing pipeline; reading, plotting, the
+GOES XRS data, process_file and process_directory. The VLFClient stages are
+run on the bundled test files while process_file and process_directory are
+run on synthetic files, so that scaling with the sample rate, number of
+stations and number of workers can be measured.
+
+Run with asv, or directly for a single pass of every benchmark,
+
+    python benchmarks/pipeline.py
+
+@author:
+    Oscar Sage David O'Hara
+@email:
+    oharao@tcd.ie
+"""
+
+import itertools
+import os
+import shutil
+import tempfile
+import timeit
+from pathlib import Path
+
+from sidpy import run
+from sidpy.goes import GOESStore
+from sidpy.reader import read_file
+from sidpy.vlfclient import VLFClient
+
+try:
+    from .synthetic import generate
+except ImportError:
+    from synthetic import generate
+
+DATA = Path(__file__).parent.parent / 'sidpy' / 'tests' / 'data'
+GOES_JSON = DATA / 'xrays-3-day.json'
+BUNDLED = {'sid': (DATA / '20210703_000000_NAA_S-0055.csv', True),
+           'super_sid': (DATA / 'Dunsink_NAA_2021-07-10_000000.csv', False)}
+# Within the bundled GOES XRS data, so that the GOES panel is plotted.
+SYNTHETIC_START = '2021-07-01'
+
+
+def stage(source, directory):
+    """
+    Place a file in a data directory, the pipeline moves processed files into
+    the archive so each run needs its own copy. Hard links are used where
+    possible so that staging does not add to the time measured.
+    """
+    target = Path(directory) / Path(source).name
+    if target.exists():
+        # Left behind by a previous run which did not archive it.
+        target.unlink()
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy(source, target)
+    return target
+
+
+class VLFClientStages:
+    params = list(BUNDLED)
+    param_names = ['instrument']
+
+    def setup(self, instrument):
+        self.file_path, self.original_sid = BUNDLED[instrument]
+        self.df = VLFClient.read_csv(self.file_path)
+        self.header, self.data = read_file(self.file_path, self.original_sid)
+        self.gl, self.gs = VLFClient.get_recent_goes(GOES_JSON)
+        self.archive = tempfile.TemporaryDirectory()
+
+    def teardown(self, instrument):
+        self.archive.cleanup()
+
+    def time_read_csv(self, instrument):
+        VLFClient.read_csv(self.file_path)
+
+    def time_get_header(self, instrument):
+        VLFClient.get_header(self.df)
+
+    def time_get_data(self, instrument):
+        VLFClient.get_data(self.df, self.original_sid)
+
+    def time_create_plot(self, instrument):
+        VLFClient.create_plot(self.header, self.data, self.file_path, self.archive.name, self.original_sid)
+
+    def time_create_plot_xrs(self, instrument):
+        VLFClient.create_plot_xrs(self.header, self.data, self.file_path, self.archive.name, self.gl, self.gs,
+                                  self.original_sid)
+
+
+class GOES:
+
+    def time_get_recent_goes(self):
+        VLFClient.get_recent_goes(GOES_JSON)
+
+
+class ProcessFile:
+    params = (['sid', 'super_sid'], [1, 10])
+    param_names = ['instrument', 'sample_rate']
+    number = 1
+    timeout = 600
+
+    def setup_cache(self):
+        source = tempfile.mkdtemp(prefix='sidpy_bench_')
+        for instrument, sample_rate in itertools.product(*self.params):
+            generate(Path(source) / '{}_{}'.format(instrument, sample_rate), sample_rate,
+                     original_sid=instrument == 'sid', start=SYNTHETIC_START)
+        return source
+
+    def setup(self, source, instrument, sample_rate):
+        [self.source] = (Path(source) / '{}_{}'.format(instrument, sample_rate)).iterdir()
+        self.work = tempfile.TemporaryDirectory()
+        self.data_path = Path(self.work.name) / 'data'
+        self.data_path.mkdir()
+        self.archive_path = Path(self.work.name) / 'archive'
+        self.goes_store = GOESStore(self.archive_path / 'goes' / 'xrs')
+        self.goes_store.merge(*VLFClient.get_recent_goes(GOES_JSON))
+
+    def teardown(self, source, instrument, sample_rate):
+        self.work.cleanup()
+
+    def time_process_file(self, source, instrument, sample_rate):
+        run.process_file(stage(self.source, self.data_path), self.archive_path, goes_store=self.goes_store)
+
+    def peakmem_process_file(self, source, instrument, sample_rate):
+        run.process_file(stage(self.source, self.data_path), self.archive_path, goes_store=self.goes_store)
+
+
+class ProcessDirectory:
+    params = ([1, 4], [1, 4])
+    param_names = ['stations', 'workers']
+    number = 1
+    timeout = 600
+    days = 2
+
+    def setup_cache(self):
+        source = tempfile.mkdtemp(prefix='sidpy_bench_')
+        generate(source, days=self.days, stations=max(self.params[0]), start=SYNTHETIC_START)
+        return source
+
+    def setup(self, source, stations, workers):
+        self.sources = sorted(Path(source).iterdir())[:stations * self.days]
+        self.work = tempfile.TemporaryDirectory()
+        self.runs = itertools.count()
+
+    def teardown(self, source, stations, workers):
+        self.work.cleanup()
+
+    def time_process_directory(self, source, stations, workers):
+        # Each run has its own archive, otherwise the files would be skipped as already processed.
+        run_path = Path(self.work.name) / str(next(self.runs))
+        data_path = run_path / 'data'
+        data_path.mkdir(parents=True)
+        for path in self.sources:
+            stage(path, data_path)
+        run.process_directory([data_path], run_path / 'archive', workers=workers, goes_url=GOES_JSON)
+
+
+if __name__ == '__main__':
+    results = []
+    for bench_class in (VLFClientStages, GOES, ProcessFile, ProcessDirectory):
+        bench = bench_class()
+        cache = (bench.setup_cache(),) if hasattr(bench, 'setup_cache') else ()
+        params = getattr(bench, 'params', None)
+        if params is None:
+            combinations = [()]
+        elif isinstance(params, tuple):
+            combinations = itertools.product(*params)
+        else:
+            combinations = [(param,) for param in params]
+        for param in combinations:
+            for name in sorted(name for name in dir(bench) if name.startswith('time_')):
+                timings = []
+                for _ in range(3):
+                    if hasattr(bench, 'setup'):
+                        bench.setup(*cache, *param)
+                    timings.append(timeit.timeit(lambda: getattr(bench, name)(*cache, *param), number=1))
+                    if hasattr(bench, 'teardown'):
+                        bench.teardown(*cache, *param)
+                seconds = min(timings)
+                results.append((bench_class.__name__ + '.' + name, ', '.join(map(str, param)), seconds))
+        for path in cache:
+            shutil.rmtree(path)
+    print('{:<42} {:<16} {:>10}'.format('benchmark', 'params', 'time (s)'))
+    for name, param, seconds in results:
+        print('{:<42} {:<16} {:>10.3f}'.format(name, param, seconds))
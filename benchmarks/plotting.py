@@ -0,0 +1,79 @@
+"""
+Benchmarks of the png quick-look rendering, with and without pixel aware
+decimation, on the bundled test files and on the SID file resampled to 10 Hz,
+through pyplot and through the reusable figure templates.
+
+Run directly for the render time saved per file,
+
+    python benchmarks/plotting.py
+
+@author:
+    Oscar Sage David O'Hara
+@email:
+    oharao@tcd.ie
+"""
+
+import tempfile
+import timeit
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from sidpy.reader import read_file
+from sidpy.render import render_plot
+from sidpy.vlfclient import VLFClient
+
+DATA = Path(__file__).parent.parent / 'sidpy' / 'tests' / 'data'
+FILES = {'sid': DATA / '20210703_000000_NAA_S-0055.csv',
+         'super_sid': DATA / 'Dunsink_NAA_2021-07-10_000000.csv',
+         'sid_10hz': DATA / '20210703_000000_NAA_S-0055.csv'}
+
+
+def load(instrument):
+    header, data = read_file(FILES[instrument])
+    if instrument.endswith('10hz'):
+        start = data['datetime'].values[0]
+        times = start + np.arange(864000) * np.timedelta64(100, 'ms')
+        signal = np.interp(times.astype(np.int64), data['datetime'].values.astype(np.int64),
+                           data['signal_strength'].values)
+        data = pd.DataFrame({'datetime': times, 'signal_strength': signal})
+    return header, data
+
+
+class CreatePlot:
+    params = (list(FILES), [False, True])
+    param_names = ['instrument', 'decimate']
+
+    def setup(self, instrument, decimate):
+        self.file_path = FILES[instrument]
+        self.header, self.data = load(instrument)
+        self.original_sid = '-' in self.header['MonitorID']
+        self.archive = tempfile.TemporaryDirectory()
+
+    def teardown(self, instrument, decimate):
+        self.archive.cleanup()
+
+    def time_create_plot(self, instrument, decimate):
+        VLFClient.create_plot(self.header, self.data, self.file_path, self.archive.name, self.original_sid,
+                              decimate=decimate)
+
+    def time_render_plot(self, instrument, decimate):
+        render_plot(self.header, self.data, self.file_path, self.archive.name, self.original_sid,
+                    decimate=decimate)
+
+
+if __name__ == '__main__':
+    print('{:<10} {:>12} {:>14} {:>16} {:>22} {:>21}'.format('file', 'full (s)', 'decimated (s)', 'template (s)',
+                                                              'decimation saved (s)', 'template saved (s)'))
+    for instrument in FILES:
+        times = []
+        for decimate, method in ((False, 'time_create_plot'), (True, 'time_create_plot'),
+                                 (True, 'time_render_plot')):
+            bench = CreatePlot()
+            bench.setup(instrument, decimate)
+            times.append(min(timeit.repeat(lambda: getattr(bench, method)(instrument, decimate),
+                                           number=1, repeat=5)))
+            bench.teardown(instrument, decimate)
+        print('{:<10} {:>12.3f} {:>14.3f} {:>16.3f} {:>22.3f} {:>21.3f}'.format(
+            instrument, times[0], times[1], times[2], times[0] - times[1], times[1] - times[2]))
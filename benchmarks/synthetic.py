@@ -0,0 +1,168 @@
+"""
+Generator of synthetic SID and SuperSID day files, in the same layout as the
+files written by the receivers, so that the pipeline can be benchmarked at
+higher sample rates and over more days and stations than the bundled files.
+
+Run directly to write files to a directory,
+
+    python benchmarks/synthetic.py ./synthetic --sample-rate 10 --days 3 --stations 4
+
+@author:
+    Oscar Sage David O'Hara
+@email:
+    oharao@tcd.ie
+"""
+
+import argparse
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+from sidpy.config.config import transmitters
+
+__all__ = ['STATIONS', 'write_day_file', 'generate']
+
+# Transmitters used for the synthetic stations, in order.
+STATIONS = ['NAA', 'FTA', 'HWU', 'SRC', 'NRK', 'TBB', 'JXN', 'ICV', 'JJI', 'VTX4']
+
+SID_HEADER = """# Site = {site}
+# Longitude = -6.34
+# Latitude = 53.39
+#
+# UTC_Offset = +00:00
+# TimeZone = GMT Standard Time
+#
+# UTC_StartTime = {start}
+# StationID = {station}
+# Frequency = 24 KHZ
+# MonitorID = S-0055-FB-0055
+# SampleRate = {sample_rate}
+"""
+
+SUPER_SID_HEADER = """# Site = {site}
+# Contact = dunsinkvlf@gmail.com
+# Country = Ireland
+# Longitude = -6.34
+# Latitude = 53.39
+#
+# UTC_Offset = 0
+# TimeZone = NONE
+#
+# UTC_StartTime = {start}
+# LogInterval =  {interval}
+# LogType =  filtered
+# MonitorID = 9296
+# SampleRate =  {sample_rate}
+# StationID = {station}
+# Frequency = 24000
+"""
+
+
+def write_day_file(directory, date, station='NAA', sample_rate=1.0, original_sid=False, site='Dunsink', seed=0):
+    """
+    Write a single synthetic day file, a diurnal signal with noise and a
+    flare-like disturbance.
+
+    Parameters
+    ----------
+    directory : str
+        Directory the file is written to.
+    date : datetime
+        UTC day of the file.
+    station : str, optional
+        Transmitter StationID.
+    sample_rate : float, optional
+        Samples per second.
+    original_sid : bool, optional
+        Write a SID file rather than a SuperSID file.
+    site : str, optional
+        Site name.
+    seed : int, optional
+        Seed of the noise.
+
+    Returns
+    -------
+    path : PosixPath
+        Path of the file.
+    """
+    if station not in transmitters:
+        raise ValueError('{} is not a configured transmitter.'.format(station))
+    date = datetime(date.year, date.month, date.day)
+    n = int(round(86400 * sample_rate))
+    step = np.int64(round(1e9 / sample_rate))
+    times = np.datetime64(date, 'ns') + np.arange(n, dtype=np.int64) * step
+    phase = np.arange(n) / n
+    rng = np.random.default_rng(seed)
+    diurnal = np.sin(2 * np.pi * (phase - 0.25)) + 0.3 * np.sin(6 * np.pi * phase)
+    flare = np.exp(-((phase - 0.55) / 0.01) ** 2)
+    noise = rng.normal(0, 0.02, n)
+    if original_sid:
+        signal = 2 * diurnal + 3 * flare + noise
+        header = SID_HEADER
+        name = '{}_000000_{}_S-0055.csv'.format(date.strftime('%Y%m%d'), station)
+    else:
+        signal = 300 + 50 * diurnal + 80 * flare + 10 * noise
+        header = SUPER_SID_HEADER
+        name = '{}_{}_{}_000000.csv'.format(site, station, date.strftime('%Y-%m-%d'))
+
+    unit = 's' if step % 1000000000 == 0 else 'ms'
+    stamps = np.char.replace(np.datetime_as_string(times, unit=unit), 'T', ' ')
+    path = Path(directory) / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', newline='\n') as fh:
+        fh.write(header.format(site=site, start=date.strftime('%Y-%m-%d %H:%M:%S'), station=station,
+                               sample_rate='{:g}'.format(sample_rate),
+                               interval=max(1, int(round(1 / sample_rate)))))
+        fh.writelines('{}, {:.6f}\n'.format(t, v) for t, v in zip(stamps.tolist(), signal.tolist()))
+    return path
+
+
+def generate(directory, sample_rate=1.0, days=1, stations=1, original_sid=False, start='2021-07-10',
+             site='Dunsink'):
+    """
+    Write synthetic day files for a number of days and stations.
+
+    Parameters
+    ----------
+    directory : str
+        Directory the files are written to.
+    sample_rate : float, optional
+        Samples per second.
+    days : int, optional
+        Number of consecutive days.
+    stations : int, optional
+        Number of stations, taken in order from `STATIONS`.
+    original_sid : bool, optional
+        Write SID files rather than SuperSID files.
+    start : str, optional
+        First UTC day, yyyy-mm-dd.
+    site : str, optional
+        Site name.
+
+    Returns
+    -------
+    paths : list
+        Paths of the files written.
+    """
+    if stations > len(STATIONS):
+        raise ValueError('At most {} stations may be generated.'.format(len(STATIONS)))
+    first = datetime.strptime(start, '%Y-%m-%d')
+    return [write_day_file(directory, first + timedelta(days=day), station, sample_rate, original_sid, site,
+                           seed=day * len(STATIONS) + i)
+            for day in range(days) for i, station in enumerate(STATIONS[:stations])]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Write synthetic SID and SuperSID day files.')
+    parser.add_argument('directory', help='Directory the files are written to.')
+    parser.add_argument('--sample-rate', type=float, default=1.0, help='Samples per second.')
+    parser.add_argument('--days', type=int, default=1, help='Number of consecutive days.')
+    parser.add_argument('--stations', type=int, default=1, help='Number of stations.')
+    parser.add_argument('--sid', action='store_true', help='Write SID rather than SuperSID files.')
+    parser.add_argument('--start', default='2021-07-10', help='First UTC day, yyyy-mm-dd.')
+    parser.add_argument('--site', default='Dunsink', help='Site name.')
+    args = parser.parse_args()
+    for path in generate(args.directory, args.sample_rate, args.days, args.stations, args.sid, args.start,
+                         args.site):
+        print(path)
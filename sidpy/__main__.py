@@ -0,0 +1,14 @@
+"""
+Run the ``sidpy`` command line interface with ``python -m sidpy``.
+
+@author:
+    Oscar Sage David O'Hara
+@email:
+    oharao@tcd.ie
+"""
+
+import sys
+
+from sidpy.cli import main
+
+sys.exit(main())
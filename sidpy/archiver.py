@@ -9,21 +9,50 @@ and archive them accordingly. The default structure of the archive is
     oharao@tcd.ie
 """
 
-import logging
 import os
+import shutil
 from datetime import datetime
 from pathlib import Path
 
+from sidpy.compression import compress_file
+from sidpy.output import make_dirs
+
 
 class Archiver:
     """
     Class used to generate archive structure, specify paths of newly processed
     files and archive them accordingly. The default structure of the archive
     is {site}/YYYY/MM/DD/{file_type}/.
+
+    Parameters
+    ----------
+    root : str
+        Archive root.
+    compression : str, optional
+        Compression of the archived csv files, either 'gzip' or 'zstd'
+        (requires the zstandard package). Stored as plain text by default.
     """
 
-    def __init__(self, root):
+    def __init__(self, root, compression=None):
         self.root = root
+        self.compression = compression
+
+    def site_path(self, site):
+        """
+        Archive path of a site, under which all of its files are stored. Every
+        path within a site is built from this one.
+
+        Parameters
+        ----------
+        site : str
+            Site name.
+
+        Returns
+        -------
+        path : PosixPath
+            {site} path, the name in lower case with any spaces replaced.
+        """
+        return Path(self.root) / site.lower().replace(' ', '_')
 
     def archive_path(self, header, original_sid):
         """
@@ -42,14 +71,76 @@ class Archiver:
             Containing live data path and %Y/%m/%d archive path.
 
         """
+        instra_path = self.day_path(header, original_sid) / 'csv'
+        parents = [self.site_path(header['Site']) / 'live', instra_path]
+        return parents
+
+    def store_csv(self, file_path, directory):
+        """
+        Move a processed csv into the archive, compressing it if the archive is
+        compressed.
+
+        Parameters
+        ----------
+        file_path : str
+            Path of the processed csv, removed once archived.
+        directory : PosixPath
+            {site}/{instrument}/YYYY/MM/DD/csv path.
+
+        Returns
+        -------
+        csv_path : PosixPath
+            Path of the archived csv.
+        """
+        if self.compression is None:
+            csv_path = Path(directory) / Path(file_path).name
+            shutil.move(Path(file_path), csv_path)
+            return csv_path
+        csv_path = compress_file(file_path, directory, self.compression)
+        os.remove(file_path)
+        return csv_path
+
+    def day_path(self, header, original_sid):
+        """
+        Create the dated archive path for the given site and instrument, the
+        parent of each file type directory.
+
+        Parameters
+        ----------
+        header : dict
+            Dictionary containing observation parameters, eg. transmitter freq.
+        original_sid : bool
+            Statement on whether SID or Supersid data is being used.
+
+        Returns
+        -------
+        path : PosixPath
+            {site}/{instrument}/YYYY/MM/DD path.
+        """
         instrument = 'super_sid'
         if original_sid == True:
             instrument = 'sid'
+        return (self.site_path(header['Site']) / instrument /
+                datetime.strptime(header['UTC_StartTime'], '%Y-%m-%d%H:%M:%S').strftime('%Y/%m/%d'))
 
-        instra_path = (Path(self.root) / header['Site'].lower() / instrument /
-                       datetime.strptime(header['UTC_StartTime'], '%Y-%m-%d%H:%M:%S').strftime('%Y/%m/%d') / 'csv')
-        parents = [(Path(self.root) / header['Site'].lower() / 'live'), instra_path]
-        return parents
+    def day_store_path(self, header, original_sid):
+        """
+        Create the path of the binary day store directory, alongside the csv
+        directory.
+
+        Parameters
+        ----------
+        header : dict
+            Dictionary containing observation parameters, eg. transmitter freq.
+        original_sid : bool
+            Statement on whether SID or Supersid data is being used.
+
+        Returns
+        -------
+        path : PosixPath
+            {site}/{instrument}/YYYY/MM/DD/npz path.
+        """
+        return self.day_path(header, original_sid) / 'npz'
 
     def static_summary_path(self, site):
         """
@@ -59,9 +150,29 @@ class Archiver:
         ----------
          site : str
             Site name.
+
+        Returns
+        -------
+        live_dir : PosixPath
+            {site}/live path.
+        """
+        return make_dirs(self.site_path(site) / 'live')
+
+    def summary_path(self, site, date):
+        """
+        Create the dated archive path of the site summary plots.
+
+        Parameters
+        ----------
+        site : str
+            Site name.
+        date : str
+            UTC date, yyyy-mm-dd.
+
+        Returns
+        -------
+        path : PosixPath
+            {site}/summary/YYYY/MM/DD path.
         """
-        site = site.lower().replace(' ', '_')
-        live_dir = (Path(self.root) / site / 'live')
-        if not live_dir.exists():
-            os.makedirs(live_dir)
-            logging.debug('%s live directory created.', site)
+        return (self.site_path(site) / 'summary' /
+                datetime.strptime(date, '%Y-%m-%d').strftime('%Y/%m/%d'))
@@ -1,2 +1,2 @@
 call "C:\Users\user\anaconda3\Scripts\activate.bat"
-python -c "from sidpy import run;run.process_directory(['./data_path_1', './data_path_2'], './archive_path')"
+sidpy process ./data_path_1 ./data_path_2 --archive ./archive_path
@@ -0,0 +1,2 @@
+call "C:\Users\user\anaconda3\Scripts\activate.bat"
+sidpy watch ./data_path_1 ./data_path_2 --archive ./archive_path
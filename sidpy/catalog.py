@@ -0,0 +1,430 @@
+"""
+SQLite catalog of the archive, one row per archived day file indexed by site,
+station, instrument and date. It is updated by `sidpy.run.process_file` as each
+file is archived and may be rebuilt from an existing archive, so that coverage
+and gap queries do not need to walk the archive directories.
+
+@author:
+    Oscar Sage David O'Hara
+@email:
+    oharao@tcd.ie
+"""
+
+import json
+import logging
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sidpy.compression import is_csv
+
+__all__ = ['Catalog', 'catalog_entry', 'data_entry', 'scan_file', 'rebuild']
+
+INSTRUMENTS = ('sid', 'super_sid')
+COLUMNS = ('csv_path', 'site', 'site_name', 'station', 'instrument', 'date', 'monitor_id', 'frequency',
+           'sample_rate', 'latitude', 'longitude', 'header', 'rows', 'first_time', 'last_time', 'png_path',
+           'derived')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    csv_path TEXT PRIMARY KEY,
+    site TEXT NOT NULL,
+    site_name TEXT,
+    station TEXT NOT NULL,
+    instrument TEXT NOT NULL,
+    date TEXT NOT NULL,
+    monitor_id TEXT,
+    frequency TEXT,
+    sample_rate REAL,
+    latitude REAL,
+    longitude REAL,
+    header TEXT,
+    rows INTEGER,
+    first_time TEXT,
+    last_time TEXT,
+    png_path TEXT,
+    derived TEXT
+);
+CREATE INDEX IF NOT EXISTS files_site_station_date ON files (site, station, instrument, date, rows);
+CREATE INDEX IF NOT EXISTS files_date ON files (date);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _relative(path, root):
+    path = Path(path)
+    try:
+        return path.resolve().relative_to(Path(root).resolve()).as_posix()
+    except ValueError:
+        return str(path)
+
+
+def _timestamp(nanoseconds):
+    return (datetime(1970, 1, 1) + timedelta(microseconds=int(nanoseconds) // 1000)).isoformat()
+
+
+def catalog_entry(archive_path, header, original_sid, rows, first_time, last_time, csv_path, png_path=None,
+                  derived=()):
+    """
+    Create the catalog row of an archived day file.
+
+    Parameters
+    ----------
+    archive_path : str
+        Archive root, the paths are stored relative to it.
+    header : dict
+        Dictionary containing observation parameters, eg. transmitter freq.
+    original_sid : bool
+        Statement on whether SID or Supersid data is being used.
+    rows : int
+        Number of samples.
+    first_time : int
+        First timestamp, in nanoseconds since the epoch, None if no samples.
+    last_time : int
+        Last timestamp, in nanoseconds since the epoch, None if no samples.
+    csv_path : str
+        Path of the archived csv.
+    png_path : str, optional
+        Path of the archived png.
+    derived : list, optional
+        Paths of any other files derived from the csv, eg. the day store.
+
+    Returns
+    -------
+    entry : dict
+        Catalog row, keyed by column.
+    """
+    return {'csv_path': _relative(csv_path, archive_path),
+            'site': header['Site'].lower(),
+            'site_name': header['Site'],
+            'station': header['StationID'],
+            'instrument': 'sid' if original_sid else 'super_sid',
+            'date': datetime.strptime(header['UTC_StartTime'], '%Y-%m-%d%H:%M:%S').strftime('%Y-%m-%d'),
+            'monitor_id': header.get('MonitorID'),
+            'frequency': header.get('Frequency'),
+            'sample_rate': _to_float(header.get('SampleRate')),
+            'latitude': _to_float(header.get('Latitude')),
+            'longitude': _to_float(header.get('Longitude')),
+            'header': json.dumps(header, sort_keys=True),
+            'rows': int(rows),
+            'first_time': _timestamp(first_time) if rows else None,
+            'last_time': _timestamp(last_time) if rows else None,
+            'png_path': _relative(png_path, archive_path) if png_path is not None else None,
+            'derived': json.dumps([_relative(path, archive_path) for path in derived])}
+
+
+def data_entry(archive_path, header, original_sid, data, csv_path, png_path=None, derived=()):
+    """
+    Create the catalog row of an archived day file from its processed data,
+    see `catalog_entry`.
+
+    Parameters
+    ----------
+    data : pandas.DataFrame
+        Dataframe containing the datetime and signal strength.
+
+    Returns
+    -------
+    entry : dict
+        Catalog row, keyed by column.
+    """
+    times = data['datetime'].values.astype('datetime64[ns]').astype('int64')
+    first_time, last_time = (times[0], times[-1]) if len(times) else (None, None)
+    return catalog_entry(archive_path, header, original_sid, len(times), first_time, last_time, csv_path,
+                         png_path, derived)
+
+
+def scan_file(csv_path, archive_path):
+    """
+    Create the catalog row of a csv already within the archive, the row count
+    and time range are taken from the day store if present rather than by
+    parsing the csv.
+
+    Parameters
+    ----------
+    csv_path : PosixPath
+        {site}/{instrument}/YYYY/MM/DD/csv/ path of the archived csv.
+    archive_path : str
+        Archive root.
+
+    Returns
+    -------
+    entry : dict
+        Catalog row, None if the file could not be read.
+    """
+    from sidpy.daystore import day_extent
+    from sidpy.reader import read_file, read_header
+
+    csv_path = Path(csv_path)
+    day_path = csv_path.parent.parent
+    stem = csv_path.name.split('.')[0]
+    try:
+        header = read_header(csv_path)
+        if header.station_id is None or header.utc_start_time is None:
+            return None
+        npz_path = day_path / 'npz' / (stem + '.npz')
+        if npz_path.exists():
+            rows, first_time, last_time = day_extent(npz_path)
+            png_path = day_path / 'png' / (stem + '.png')
+            return catalog_entry(archive_path, header.parameters, header.original_sid, rows, first_time,
+                                 last_time, csv_path, png_path if png_path.exists() else None, [npz_path])
+        _, data = read_file(csv_path, header.original_sid)
+    except Exception:
+        logging.exception('%s : Could not be catalogued.', csv_path)
+        return None
+    png_path = day_path / 'png' / (stem + '.png')
+    return data_entry(archive_path, header.parameters, header.original_sid, data, csv_path,
+                      png_path if png_path.exists() else None)
+
+
+def _scan_files(csv_paths, archive_path):
+    return [scan_file(csv_path, archive_path) for csv_path in csv_paths]
+
+
+class Catalog:
+    """
+    SQLite catalog of the archived day files, stored as ``catalog.sqlite``
+    within the archive root.
+
+    Parameters
+    ----------
+    root : str
+        Archive root. If None the entries are held in memory only, as used by
+        worker processes which pass their entries back to the parent.
+    filename : str, optional
+        Name of the database file.
+    journal_mode : str, optional
+        SQLite journal mode, 'DELETE' where the archive is shared between
+        machines, as the write-ahead log may only be shared by the processes
+        of one machine.
+    """
+
+    def __init__(self, root, filename='catalog.sqlite', journal_mode='WAL'):
+        self.root = Path(root) if root is not None else None
+        self.path = self.root / filename if root is not None else None
+        self.entries = []
+        self.connection = None
+        if self.path is not None:
+            self.root.mkdir(parents=True, exist_ok=True)
+            # The watcher and the hourly run may write at the same time. The catalog may
+            # be created on one thread and used on another, though never concurrently.
+            self.connection = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+            self.connection.execute('PRAGMA journal_mode={}'.format(journal_mode))
+            self.connection.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def close(self):
+        """
+        Close the database.
+        """
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    @property
+    def rebuilt(self):
+        """
+        UTC time at which the catalog was last rebuilt, yyyy-mm-ddThh:mm:ss,
+        None if never. Until rebuilt, files archived before the catalog was
+        created may be missing from it.
+        """
+        if self.connection is None:
+            return None
+        row = self.connection.execute("SELECT value FROM meta WHERE key = 'rebuilt'").fetchone()
+        return row[0] if row is not None else None
+
+    @rebuilt.setter
+    def rebuilt(self, value):
+        with self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('rebuilt', ?)", (value,))
+
+    def record(self, entry):
+        """
+        Add or replace the row of an archived file.
+
+        Parameters
+        ----------
+        entry : dict
+            Output of `catalog_entry`.
+        """
+        if self.connection is None:
+            self.entries.append(entry)
+            return
+        self.update([entry])
+
+    def update(self, entries, replace=False):
+        """
+        Add or replace the rows of many archived files within one transaction,
+        eg. those recorded by a worker process.
+
+        Parameters
+        ----------
+        entries : list
+            Outputs of `catalog_entry`.
+        replace : bool, optional
+            Remove all other rows.
+        """
+        with self.connection:
+            if replace:
+                self.connection.execute('DELETE FROM files')
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO files ({}) VALUES ({})'.format(', '.join(COLUMNS),
+                                                                       ', '.join('?' * len(COLUMNS))),
+                [tuple(entry[column] for column in COLUMNS) for entry in entries])
+
+    def _select(self, columns, site=None, station=None, instrument=None, start=None, end=None, order='date',
+                group=None):
+        clauses, parameters = [], []
+        for column, value in (('site', site.lower() if site is not None else None), ('station', station),
+                              ('instrument', instrument)):
+            if value is not None:
+                clauses.append('{} = ?'.format(column))
+                parameters.append(value)
+        if start is not None:
+            clauses.append('date >= ?')
+            parameters.append(str(start)[:10])
+        if end is not None:
+            clauses.append('date <= ?')
+            parameters.append(str(end)[:10])
+        sql = 'SELECT {} FROM files'.format(columns)
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        if group is not None:
+            sql += ' GROUP BY ' + group
+        sql += ' ORDER BY ' + order
+        return self.connection.execute(sql, parameters).fetchall()
+
+    def files(self, site=None, station=None, instrument=None, start=None, end=None):
+        """
+        Rows of the archived files matching the given criteria.
+
+        Parameters
+        ----------
+        site : str, optional
+            Site name.
+        station : str, optional
+            Transmitter StationID, eg. NAA.
+        instrument : str, optional
+            Either 'sid' or 'super_sid'.
+        start : str, optional
+            First date, yyyy-mm-dd.
+        end : str, optional
+            Last date, yyyy-mm-dd.
+
+        Returns
+        -------
+        rows : list
+            Dictionary of the columns of each file, in date order.
+        """
+        return [dict(zip(COLUMNS, row)) for row in self._select(', '.join(COLUMNS), site, station, instrument,
+                                                                start, end, order='date, csv_path')]
+
+    def days(self, site=None, station=None, instrument=None, start=None, end=None):
+        """
+        Dates with archived files matching the given criteria, eg. the days
+        held for NDT at Birr in 2022.
+
+        Returns
+        -------
+        days : list
+            yyyy-mm-dd dates, in order.
+        """
+        return [row[0] for row in self._select('DISTINCT date', site, station, instrument, start, end)]
+
+    def gaps(self, site, station, start, end, instrument=None):
+        """
+        Dates between start and end, inclusive, without an archived file.
+
+        Parameters
+        ----------
+        site : str
+            Site name.
+        station : str
+            Transmitter StationID, eg. NAA.
+        start : str
+            First date, yyyy-mm-dd.
+        end : str
+            Last date, yyyy-mm-dd.
+        instrument : str, optional
+            Either 'sid' or 'super_sid', either is counted when not given.
+
+        Returns
+        -------
+        gaps : list
+            Missing yyyy-mm-dd dates, in order.
+        """
+        held = set(self.days(site, station, instrument, start, end))
+        first = datetime.strptime(str(start)[:10], '%Y-%m-%d').date()
+        last = datetime.strptime(str(end)[:10], '%Y-%m-%d').date()
+        missing = (first + timedelta(days=i) for i in range((last - first).days + 1))
+        return [day.isoformat() for day in missing if day.isoformat() not in held]
+
+    def coverage(self, site=None, station=None, instrument=None, start=None, end=None):
+        """
+        Number of days and samples held for each site, station and instrument.
+
+        Returns
+        -------
+        coverage : list
+            Dictionary of the site, station, instrument, number of days, first
+            and last date and total rows, for each combination held.
+        """
+        keys = ('site', 'station', 'instrument', 'days', 'first_date', 'last_date', 'rows')
+        rows = self._select('site, station, instrument, COUNT(DISTINCT date), MIN(date), MAX(date), SUM(rows)',
+                            site, station, instrument, start, end,
+                            order='site, station, instrument', group='site, station, instrument')
+        return [dict(zip(keys, row)) for row in rows]
+
+
+def rebuild(archive_path, workers=None, chunk_size=64):
+    """
+    Rebuild the catalog from the csv files within an existing archive,
+    replacing all existing rows. The files are read in parallel.
+
+    Parameters
+    ----------
+    archive_path : str
+        Archive root.
+    workers : int, optional
+        Number of worker processes, by default the number of processors.
+    chunk_size : int, optional
+        Number of files read by a worker at a time.
+
+    Returns
+    -------
+    count : int
+        Number of files catalogued.
+    """
+    archive_path = Path(archive_path)
+    csv_paths = sorted(path for instrument in INSTRUMENTS
+                       for path in archive_path.glob('*/{}/*/*/*/csv/*.csv*'.format(instrument)) if is_csv(path))
+    chunks = [csv_paths[i:i + chunk_size] for i in range(0, len(csv_paths), chunk_size)]
+    if workers == 1:
+        scanned = map(_scan_files, chunks, [archive_path] * len(chunks))
+        entries = [entry for chunk in scanned for entry in chunk if entry is not None]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            entries = [entry for chunk in executor.map(_scan_files, chunks, [archive_path] * len(chunks))
+                       for entry in chunk if entry is not None]
+    with Catalog(archive_path) as catalog:
+        catalog.update(entries, replace=True)
+        catalog.rebuilt = datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S')
+    logging.info('%d of %d archived files catalogued.', len(entries), len(csv_paths))
+    return len(entries)
@@ -0,0 +1,243 @@
+"""
+The ``sidpy`` command line interface, eg.
+
+    sidpy process ./data_path_1 ./data_path_2 --archive ./archive_path
+    sidpy process ./shared_data_path --archive ./shared_archive_path --shard 0/3
+    sidpy watch ./data_path_1 --archive ./archive_path
+    sidpy tail ./data_path_1 --archive ./archive_path
+    sidpy catalog gaps --archive ./archive_path --site Birr --station NDT --start 2022-01-01 --end 2022-12-31
+    sidpy reprocess --archive ./archive_path --site Birr --start 2022-01-01 --end 2022-12-31
+
+Only the standard library is imported until a subcommand runs, the modules
+each subcommand needs are imported by its handler.
+
+@author:
+    Oscar Sage David O'Hara
+@email:
+    oharao@tcd.ie
+"""
+
+import argparse
+import logging
+from pathlib import Path
+
+from sidpy import __version__
+
+__all__ = ['build_parser', 'main']
+
+
+def _process(args):
+    from sidpy.run import process_directory
+
+    leases = None
+    if args.distributed or args.shard is not None:
+        from sidpy.lease import Leases, parse_shard
+
+        try:
+            shard = parse_shard(args.shard or '0/1')
+        except ValueError as e:
+            raise SystemExit('sidpy process: {}'.format(e))
+        leases = Leases(args.archive / 'leases', ttl=args.lease_ttl, shard=shard, shard_by=args.shard_by,
+                        steal_after=args.steal_after)
+    results = process_directory(args.data_path, args.archive, workers=args.workers, force=args.force,
+                                force_site=args.force_site, force_date=args.force_date, summary=args.summary,
+                                goes_url=args.goes_url, metrics=args.metrics or args.trace_memory,
+                                compression=args.compression, leases=leases, trace_memory=args.trace_memory)
+    return 1 if any(error is not None for _, _, error in results) else 0
+
+
+def _watch(args):
+    from sidpy.watch import watch
+
+    watch(args.data_path, args.archive, settle=args.settle, poll_interval=args.poll_interval,
+          goes_interval=args.goes_interval, use_watchdog=False if args.poll else None, summary=args.summary,
+          live_interval=args.live_interval, compression=args.compression, retry_interval=args.retry_interval)
+    return 0
+
+
+def _tail(args):
+    from sidpy.goes import GOESStore
+    from sidpy.live import tail
+
+    image_paths = tail(args.data_path, args.archive, GOESStore(args.archive / 'goes' / 'xrs'))
+    for image_path in image_paths:
+        logging.info('%s updated.', image_path)
+    return 0
+
+
+def _catalog(args):
+    from sidpy.catalog import Catalog, rebuild
+
+    if args.action == 'rebuild':
+        rebuild(args.archive, workers=args.workers)
+        return 0
+    with Catalog(args.archive) as catalog:
+        if args.action == 'coverage':
+            print('{:<16} {:<8} {:<10} {:>6} {:<10} {:<10} {:>12}'.format('site', 'station', 'instrument', 'days',
+                                                                          'first', 'last', 'rows'))
+            for row in catalog.coverage(args.site, args.station, args.instrument, args.start, args.end):
+                print('{site:<16} {station:<8} {instrument:<10} {days:>6} {first_date:<10} {last_date:<10} '
+                      '{rows:>12}'.format(**row))
+        elif args.action == 'days':
+            print('\n'.join(catalog.days(args.site, args.station, args.instrument, args.start, args.end)))
+        elif args.action == 'gaps':
+            if None in (args.site, args.station, args.start, args.end):
+                raise SystemExit('sidpy catalog gaps: --site, --station, --start and --end are required.')
+            print('\n'.join(catalog.gaps(args.site, args.station, args.start, args.end, args.instrument)))
+    return 0
+
+
+def _reprocess(args):
+    from sidpy.reprocess import reprocess
+
+    results = reprocess(args.archive, args.site, args.station, args.instrument, args.start, args.end,
+                        workers=args.workers, restart=args.restart, summary=args.summary,
+                        metrics=args.metrics or args.trace_memory, trace_memory=args.trace_memory)
+    return 1 if any(error is not None for _, _, error in results) else 0
+
+
+def _add_filters(parser):
+    parser.add_argument('--site', help='Site name.')
+    parser.add_argument('--station', help='Transmitter StationID, eg. NAA.')
+    parser.add_argument('--instrument', choices=['sid', 'super_sid'], help='Instrument, both by default.')
+    parser.add_argument('--start', help='First date, yyyy-mm-dd.')
+    parser.add_argument('--end', help='Last date, yyyy-mm-dd.')
+
+
+def _add_paths(parser):
+    parser.add_argument('data_path', nargs='+', type=Path, help='Directories containing data to be processed.')
+    parser.add_argument('-a', '--archive', required=True, type=Path, help='Directory where the data is archived.')
+
+
+def _add_compression(parser):
+    parser.add_argument('--compression', choices=['gzip', 'zstd'],
+                        help='Compress the archived csv files, zstd requires the zstandard package.')
+
+
+def build_parser():
+    """
+    Build the parser of the ``sidpy`` command.
+
+    Returns
+    -------
+    parser : argparse.ArgumentParser
+        Parser, the handler of the chosen subcommand is set as ``func``.
+    """
+    parser = argparse.ArgumentParser(prog='sidpy', description='Process, plot and archive SID and SuperSID data.')
+    parser.add_argument('--version', action='version', version='%(prog)s ' + __version__)
+    parser.add_argument('--log-level', default=None,
+                        help='Minimum level logged, eg. INFO, by default SIDPY_LOG_LEVEL or DEBUG.')
+    parser.add_argument('--log-file', default='error.log', help='Log file, rotated once 10 MB (default: error.log).')
+    parser.add_argument('--quiet', action='store_true', help='Do not log to the console.')
+    subparsers = parser.add_subparsers(title='commands', dest='command', metavar='<command>')
+
+    process = subparsers.add_parser('process', help='Process and archive all files within the data directories.',
+                                     description='Process and archive all files within the data directories, '
+                                                 'skipping those already processed.')
+    _add_paths(process)
+    process.add_argument('-w', '--workers', type=int, default=1,
+                         help='Number of worker processes, 0 for one per processor (default: 1).')
+    process.add_argument('--force', action='store_true', help='Process files even if already processed.')
+    process.add_argument('--force-site', help='Process files for the given site even if already processed.')
+    process.add_argument('--force-date', help='Process files for the given yyyy-mm-dd date even if already processed.')
+    process.add_argument('--no-summary', dest='summary', action='store_false', help='Do not render site summaries.')
+    process.add_argument('--metrics', action='store_true', help='Write the time of each stage alongside the log.')
+    process.add_argument('--trace-memory', action='store_true',
+                         help='Also write the peak memory of each stage, several times slower (implies --metrics).')
+    process.add_argument('--goes-url', help='URL of the GOES XRS feed, or path to a local json file.')
+    _add_compression(process)
+    distributed = process.add_argument_group('distributed', 'Run on several machines sharing the data directories, '
+                                                            'each file claimed by one machine.')
+    distributed.add_argument('--distributed', action='store_true',
+                             help='Claim each file with a lease under {archive}/leases before processing it.')
+    distributed.add_argument('--shard', help='Shard of this machine as index/count, eg. 0/3, implies --distributed.')
+    distributed.add_argument('--shard-by', choices=['site', 'station'], default='station',
+                             help='Shard files by site or station (default: station).')
+    distributed.add_argument('--lease-ttl', type=float, default=600,
+                             help='Seconds after which the lease of a machine which stopped is taken over '
+                                  '(default: 600).')
+    distributed.add_argument('--steal-after', type=float, default=3600,
+                             help='Age in seconds after which files of other shards are processed (default: 3600).')
+    process.set_defaults(func=_process)
+
+    watch = subparsers.add_parser('watch', help='Process files as they land, until stopped.',
+                                  description='Watch the data directories, processing files as they land and '
+                                              'updating the live pngs, until SIGTERM or Ctrl+C.')
+    _add_paths(watch)
+    watch.add_argument('--settle', type=float, default=10,
+                       help='Seconds a file must be unchanged before it is processed (default: 10).')
+    watch.add_argument('--poll-interval', type=float, default=1, help='Seconds between checks (default: 1).')
+    watch.add_argument('--goes-interval', type=float, default=600,
+                       help='Seconds between refreshes of the GOES XRS data (default: 600).')
+    watch.add_argument('--live-interval', type=float, default=60,
+                       help='Seconds between updates of the live pngs (default: 60).')
+    watch.add_argument('--retry-interval', type=float, default=60,
+                       help='Seconds before a file which could not be processed is tried again, doubled after each '
+                            'further failure up to an hour (default: 60).')
+    watch.add_argument('--poll', action='store_true', help='Poll the directories rather than use watchdog.')
+    watch.add_argument('--no-summary', dest='summary', action='store_false', help='Do not render site summaries.')
+    _add_compression(watch)
+    watch.set_defaults(func=_watch)
+
+    tail = subparsers.add_parser('tail', help='Update the live pngs of the "current" files once.',
+                                 description='Update the live pngs from the rows appended to the "current" '
+                                             'files since the last update.')
+    _add_paths(tail)
+    tail.set_defaults(func=_tail)
+
+    catalog = subparsers.add_parser('catalog', help='Query or rebuild the catalog of the archive.',
+                                    description='Query the days held and missing for each site, station and '
+                                                'instrument, or rebuild the catalog from the archive.')
+    catalog.add_argument('action', choices=['coverage', 'days', 'gaps', 'rebuild'])
+    catalog.add_argument('-a', '--archive', required=True, type=Path, help='Directory where the data is archived.')
+    _add_filters(catalog)
+    catalog.add_argument('-w', '--workers', type=int, default=None,
+                         help='Number of worker processes used to rebuild, one per processor by default.')
+    catalog.set_defaults(func=_catalog)
+
+    reprocess = subparsers.add_parser('reprocess', help='Reprocess archived files in place.',
+                                      description='Rewrite the day stores, pngs and catalog rows of the archived '
+                                                  'files of the given sites, stations and dates, resuming an '
+                                                  'interrupted job unless --restart is given. The files are listed '
+                                                  'from the catalog once rebuilt by `sidpy catalog rebuild`, '
+                                                  'otherwise from the archive directories.')
+    reprocess.add_argument('-a', '--archive', required=True, type=Path, help='Directory where the data is archived.')
+    _add_filters(reprocess)
+    reprocess.add_argument('-w', '--workers', type=int, default=0,
+                           help='Number of worker processes, 0 for one per processor (default: 0).')
+    reprocess.add_argument('--restart', action='store_true', help='Discard the checkpoint of an interrupted job.')
+    reprocess.add_argument('--no-summary', dest='summary', action='store_false', help='Do not render site summaries.')
+    reprocess.add_argument('--metrics', action='store_true', help='Write the time of each stage alongside the log.')
+    reprocess.add_argument('--trace-memory', action='store_true',
+                           help='Also write the peak memory of each stage, several times slower (implies --metrics).')
+    reprocess.set_defaults(func=_reprocess)
+    return parser
+
+
+def main(argv=None):
+    """
+    Entry point of the ``sidpy`` command.
+
+    Parameters
+    ----------
+    argv : list, optional
+        Arguments, by default those given on the command line.
+
+    Returns
+    -------
+    status : int
+        Exit status, non-zero if any file raised an exception.
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command is None:
+        parser.print_help()
+        return 2
+    if (getattr(args, 'workers', 1) or 0) < 0:
+        parser.error('--workers must be 0 or more.')
+    if getattr(args, 'workers', 1) == 0:
+        args.workers = None
+
+    from sidpy.logger import init_logger
+    init_logger(args.log_level, args.log_file, console=not args.quiet)
+    return args.func(args)
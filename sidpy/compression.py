@@ -0,0 +1,141 @@
+"""
+Compressed storage of the archived csv files. Files are compressed with gzip
+or, if the optional zstandard package is installed, zstd and are read back
+through a streaming decompressor, so that the readers handle plain and
+compressed files alike without decompressing them to disk.
+
+@author:
+    Oscar Sage David O'Hara
+@email:
+    oharao@tcd.ie
+"""
+
+import gzip
+import io
+import os
+import shutil
+from pathlib import Path
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+__all__ = ['COMPRESSIONS', 'compression_of', 'plain_path', 'is_csv', 'open_csv', 'compress_file']
+
+# Suffix appended to the name of a file compressed by each method.
+COMPRESSIONS = {'gzip': '.gz', 'zstd': '.zst'}
+# Compression levels used unless given, favouring speed over a few percent of ratio.
+DEFAULT_LEVELS = {'gzip': 6, 'zstd': 9}
+_BLOCK_SIZE = 1 << 20
+
+
+def _check(compression):
+    if compression not in COMPRESSIONS:
+        raise ValueError('Unknown compression {!r}, expected one of {}.'.format(compression,
+                                                                              ', '.join(COMPRESSIONS)))
+    if compression == 'zstd' and zstandard is None:
+        raise ImportError('zstd compression requires the zstandard package.')
+
+
+def compression_of(path):
+    """
+    Compression of a file, from its suffix.
+
+    Returns
+    -------
+    compression : str
+        Either 'gzip' or 'zstd', None if the file is not compressed.
+    """
+    suffix = Path(path).suffix
+    for compression, compressed_suffix in COMPRESSIONS.items():
+        if suffix == compressed_suffix:
+            return compression
+    return None
+
+
+def plain_path(path):
+    """
+    Path of a file without its compression suffix, eg. the png of
+    'x.csv.gz' is named after 'x.csv'.
+
+    Returns
+    -------
+    path : PosixPath
+        The path, without the suffix if compressed.
+    """
+    path = Path(path)
+    return path.with_suffix('') if compression_of(path) is not None else path
+
+
+def is_csv(path):
+    """
+    Whether a path is a plain or compressed csv, excluding the partial files
+    written by `compress_file`.
+    """
+    path = Path(path)
+    return not path.name.startswith('.') and plain_path(path).suffix == '.csv'
+
+
+def open_csv(path):
+    """
+    Open a plain or compressed csv for reading, decompressing it as it is
+    read.
+
+    Parameters
+    ----------
+    path : str
+        Path to the csv file.
+
+    Returns
+    -------
+    file : io.BufferedIOBase
+        Binary file object supporting `peek`.
+    """
+    compression = compression_of(path)
+    if compression is None:
+        return open(path, 'rb')
+    _check(compression)
+    if compression == 'gzip':
+        return gzip.open(path, 'rb')
+    return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True),
+                             buffer_size=_BLOCK_SIZE)
+
+
+def compress_file(source, directory, compression, level=None):
+    """
+    Compress a file into a directory. The compressed file is written under a
+    temporary name and renamed once complete, so that a partial file is never
+    left under the final name.
+
+    Parameters
+    ----------
+    source : str
+        Path of the file to be compressed, left in place.
+    directory : str
+        Directory of the compressed file.
+    compression : str
+        Either 'gzip' or 'zstd'.
+    level : int, optional
+        Compression level, by default `DEFAULT_LEVELS`.
+
+    Returns
+    -------
+    path : PosixPath
+        Path of the compressed file, the source name with the compression
+        suffix appended.
+    """
+    _check(compression)
+    level = DEFAULT_LEVELS[compression] if level is None else level
+    path = Path(directory) / (Path(source).name + COMPRESSIONS[compression])
+    partial = path.with_name('.' + path.name + '.partial')
+    with open(source, 'rb') as src, open(partial, 'wb') as raw:
+        if compression == 'gzip':
+            # mtime=0 so that compressing the same file twice gives the same bytes.
+            with gzip.GzipFile(filename='', mode='wb', fileobj=raw, compresslevel=level, mtime=0) as dst:
+                shutil.copyfileobj(src, dst, _BLOCK_SIZE)
+        else:
+            zstandard.ZstdCompressor(level=level).copy_stream(src, raw, read_size=_BLOCK_SIZE,
+                                                              write_size=_BLOCK_SIZE)
+    os.replace(partial, path)
+    return path
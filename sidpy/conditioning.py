@@ -0,0 +1,149 @@
+"""
+Streaming conditioning of the SuperSID signal, the Savitzky-Golay smoothing
+followed by the conversion to dB. The signal is processed in fixed-size blocks,
+each overlapping its neighbours by half the filter window so that the output is
+identical to filtering the whole signal at once, while the memory used beyond
+the signal itself does not depend on its length.
+
+@author:
+    Oscar Sage David O'Hara
+@email:
+    oharao@tcd.ie
+"""
+
+import numpy as np
+
+__all__ = ['CHUNK_SIZE', 'Conditioner', 'condition_signal']
+
+# Number of samples conditioned at a time.
+CHUNK_SIZE = 1 << 16
+
+
+class Conditioner:
+    """
+    Incrementally apply ``20 * log10(savgol_filter(signal, window_length,
+    polyorder))`` to a signal received in blocks. Samples are returned once the
+    whole filter window about them has been received, the final samples are
+    returned by `finish`.
+
+    Parameters
+    ----------
+    window_length : int, optional
+        Length of the filter window.
+    polyorder : int, optional
+        Order of the polynomial used to fit the samples.
+    db : bool, optional
+        Convert the smoothed signal to dB.
+    """
+
+    def __init__(self, window_length=9, polyorder=1, db=True):
+        self.window_length = window_length
+        self.polyorder = polyorder
+        self.db = db
+        # scipy.signal is slow to import, so is only imported once a signal is conditioned.
+        from scipy.signal import savgol_coeffs
+        self.half = window_length // 2
+        self.coeffs = savgol_coeffs(window_length, polyorder)
+        # The last samples received, which the next samples returned depend upon.
+        self._context = np.empty(0)
+        self.received = 0
+        self.returned = 0
+
+    def _finish_block(self, y):
+        if self.db:
+            np.log10(y, out=y)
+            y *= 20
+        self.returned += len(y)
+        return y
+
+    def feed(self, block):
+        """
+        Condition the next block of the signal.
+
+        Parameters
+        ----------
+        block : array-like
+            The next samples of the signal.
+
+        Returns
+        -------
+        conditioned : numpy.ndarray
+            Conditioned float64 samples, which may be fewer than the samples
+            given as the filter window about the latest samples is incomplete.
+        """
+        from scipy.ndimage import convolve1d
+        from scipy.signal import savgol_filter
+        x = np.concatenate([self._context, np.asarray(block, dtype=np.float64)])
+        self.received += len(x) - len(self._context)
+        start = self.received - len(x)
+        parts = []
+        if self.returned == 0 and self.received >= self.window_length:
+            # The first samples are fitted by the polynomial of the first window.
+            parts.append(savgol_filter(x[:self.window_length], self.window_length, self.polyorder)[:self.half])
+        if self.returned or parts:
+            first, stop = self.returned + len(parts[0]) if parts else self.returned, self.received - self.half
+            if stop > first:
+                y = convolve1d(x[first - self.half - start:], self.coeffs, mode='constant')
+                parts.append(y[self.half:self.half + stop - first])
+        self._context = x[-self.window_length:] if self.returned or parts else x
+        if not parts:
+            return np.empty(0)
+        return self._finish_block(np.concatenate(parts) if len(parts) > 1 else parts[0])
+
+    def finish(self):
+        """
+        Condition the final samples of the signal.
+
+        Returns
+        -------
+        conditioned : numpy.ndarray
+            The remaining conditioned float64 samples.
+        """
+        from scipy.signal import savgol_filter
+        if self.received < self.window_length:
+            raise ValueError("If mode is 'interp', window_length must be less than or equal to the size of x.")
+        # The last samples are fitted by the polynomial of the last window.
+        y = savgol_filter(self._context[-self.window_length:], self.window_length, self.polyorder)
+        return self._finish_block(y[len(y) - (self.received - self.returned):])
+
+
+def condition_signal(signal, out=None, window_length=9, polyorder=1, chunk_size=CHUNK_SIZE):
+    """
+    Apply ``20 * log10(savgol_filter(signal, window_length, polyorder))`` in
+    blocks of ``chunk_size`` samples. The result is identical to the
+    unblocked calculation.
+
+    Parameters
+    ----------
+    signal : array-like
+        SuperSID signal.
+    out : numpy.ndarray, optional
+        Array into which the result is written, which may be ``signal`` itself
+        to condition the signal in place. A float32 array may be given to halve
+        the memory used, the result is then rounded to single precision.
+    window_length : int, optional
+        Length of the filter window.
+    polyorder : int, optional
+        Order of the polynomial used to fit the samples.
+    chunk_size : int, optional
+        Number of samples conditioned at a time.
+
+    Returns
+    -------
+    out : numpy.ndarray
+        The conditioned signal.
+    """
+    signal = np.asarray(signal)
+    if out is None:
+        out = np.empty(len(signal), dtype=np.float64)
+    conditioner = Conditioner(window_length, polyorder)
+    # Each block is copied into the conditioner before any of it is overwritten,
+    # so the signal may also be the output.
+    for start in range(0, len(signal), chunk_size):
+        position = conditioner.returned
+        y = conditioner.feed(signal[start:start + chunk_size])
+        out[position:position + len(y)] = y
+    position = conditioner.returned
+    y = conditioner.finish()
+    out[position:position + len(y)] = y
+    return out
@@ -0,0 +1,119 @@
+"""
+Compact binary copy of each processed day, stored alongside the csv archive
+as an uncompressed numpy .npz file. The signal is held as a float32 array with
+the start time and cadence stored as metadata, so that archived days may be
+loaded without parsing any text.
+
+@author:
+    Oscar Sage David O'Hara
+@email:
+    oharao@tcd.ie
+"""
+
+import json
+import logging
+
+import numpy as np
+import pandas as pd
+
+from sidpy.output import atomic_path
+
+__all__ = ['write_day', 'read_day', 'day_extent']
+
+
+def write_day(path, header, data):
+    """
+    Write processed data to the binary day store. Regularly sampled data is
+    stored as the start time and cadence only, otherwise the offset of every
+    sample from the start time is also stored.
+
+    Parameters
+    ----------
+    path : PosixPath
+        Path of the .npz file.
+    header : dict
+        Dictionary containing observation parameters, eg. transmitter freq.
+    data : pandas.DataFrame
+        Dataframe containing the datetime and signal strength.
+
+    Returns
+    -------
+    path : PosixPath
+        Path of the .npz file.
+    """
+    times = data['datetime'].values.astype('datetime64[ns]').astype(np.int64)
+    start = times[0] if len(times) else 0
+    steps = np.diff(times)
+    cadence = steps[0] if len(steps) and (steps == steps[0]).all() else 0
+    offsets = times - start if (cadence == 0 and len(times) > 1) else np.empty(0, dtype=np.int64)
+
+    # Written to a temporary file first so that readers never see partial days.
+    with atomic_path(path) as temp_path, open(temp_path, 'wb') as fh:
+        np.savez(fh,
+                 signal=data['signal_strength'].values.astype(np.float32),
+                 start=np.int64(start),
+                 cadence=np.int64(cadence),
+                 offsets=offsets,
+                 header=np.array(json.dumps(header)))
+    logging.debug('%s written to the day store.', path.name)
+    return path
+
+
+def read_day(path):
+    """
+    Read a day written by `write_day`.
+
+    Parameters
+    ----------
+    path : PosixPath
+        Path of the .npz file.
+
+    Returns
+    -------
+    header : dict
+        Dictionary containing observation parameters, eg. transmitter freq.
+    data : pandas.DataFrame
+        Dataframe containing the datetime and float32 signal strength.
+    """
+    with np.load(path) as store:
+        signal = store['signal']
+        start, cadence = int(store['start']), int(store['cadence'])
+        if cadence:
+            times = start + np.arange(len(signal), dtype=np.int64) * cadence
+        elif len(store['offsets']):
+            times = start + store['offsets']
+        else:
+            times = np.full(len(signal), start, dtype=np.int64)
+        header = json.loads(str(store['header']))
+    data = pd.DataFrame({'datetime': times.astype('datetime64[ns]'), 'signal_strength': signal})
+    return header, data
+
+
+def day_extent(path):
+    """
+    Number of samples and the first and last timestamps of a day written by
+    `write_day`, without building the dataframe.
+
+    Parameters
+    ----------
+    path : PosixPath
+        Path of the .npz file.
+
+    Returns
+    -------
+    rows : int
+        Number of samples.
+    first : int
+        First timestamp in nanoseconds since the epoch, None if no samples.
+    last : int
+        Last timestamp in nanoseconds since the epoch, None if no samples.
+    """
+    with np.load(path) as store:
+        rows = len(store['signal'])
+        start, cadence = int(store['start']), int(store['cadence'])
+        offsets = store['offsets']
+    if not rows:
+        return 0, None, None
+    if cadence:
+        return rows, start, start + (rows - 1) * cadence
+    return rows, start, start + (int(offsets[-1]) if len(offsets) else 0)
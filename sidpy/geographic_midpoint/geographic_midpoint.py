@@ -1,7 +1,8 @@
 """
 Calculate the weighted geographic midpoint between a set of given lat and lon
 values. The sunrise and sunset times are then calculated at the geographic
-midpoint.
+midpoint, either for a single date, through a bounded cache, or for a range of
+dates at once.
 
 @author:
     Oscar Sage David O'Hara
@@ -10,9 +11,58 @@ midpoint.
 """
 
 import math
+from functools import lru_cache
 
+import numpy as np
 from astral import Observer, sun
 
+# Apparent radius of the sun in degrees, matching astral.
+SUN_APPARENT_RADIUS = 32.0 / (60.0 * 2.0)
+
+
+# Cached in place of the times where the sun does not rise or set, rather than the exception itself, which would
+# keep the frames of its traceback alive and grow the traceback each time it was raised again.
+_NO_SUN = object()
+
+
+@lru_cache(maxsize=4096)
+def _cached_sunrise_sunset(date, lat, lon):
+    try:
+        return Geographic_Midpoint.sunrise_sunset(date, lat, lon)
+    except ValueError as e:
+        return _NO_SUN, str(e)
+
+
+def _sun_declination(t):
+    """
+    Solar declination and equation of time (minutes) for julian centuries t,
+    following the NOAA solar calculations used by astral.
+    """
+    l0 = (280.46646 + t * (36000.76983 + 0.0003032 * t)) % 360.0
+    m = 357.52911 + t * (35999.05029 - 0.0001537 * t)
+    e = 0.016708634 - t * (0.000042037 + 0.0000001267 * t)
+    mrad = np.radians(m)
+    c = (np.sin(mrad) * (1.914602 - t * (0.004817 + 0.000014 * t))
+         + np.sin(mrad + mrad) * (0.019993 - 0.000101 * t) + np.sin(mrad + mrad + mrad) * 0.000289)
+    omega = 125.04 - 1934.136 * t
+    apparent_long = l0 + c - 0.00569 - 0.00478 * np.sin(np.radians(omega))
+    seconds = 21.448 - t * (46.815 + t * (0.00059 - t * 0.001813))
+    obliquity = 23.0 + (26.0 + (seconds / 60.0)) / 60.0 + 0.00256 * np.cos(np.radians(omega))
+    declination = np.degrees(np.arcsin(np.sin(np.radians(obliquity)) * np.sin(np.radians(apparent_long))))
+
+    y = np.tan(np.radians(obliquity) / 2.0) ** 2
+    l0rad = np.radians(l0)
+    eq_time = (y * np.sin(2.0 * l0rad) - 2.0 * e * np.sin(mrad) + 4.0 * e * y * np.sin(mrad) * np.cos(2.0 * l0rad)
+               - 0.5 * y * y * np.sin(4.0 * l0rad) - 1.25 * e * e * np.sin(2.0 * mrad))
+    return declination, np.degrees(eq_time) * 4.0
+
+
+def _hour_angle(lat, declination, zenith):
+    lat, declination = np.radians(lat), np.radians(declination)
+    h = (np.cos(np.radians(zenith)) - np.sin(lat) * np.sin(declination)) / (np.cos(lat) * np.cos(declination))
+    with np.errstate(invalid='ignore'):
+        return np.arccos(h)
+
 
 class Geographic_Midpoint:
     """ Calculate the weighted geographic midpoint and sunrise/sunset times
@@ -129,6 +179,161 @@ class Geographic_Midpoint:
         lon = lon * 180.0 / math.pi
         return lat, lon
 
+    @staticmethod
+    def to_cart_array(lat, lon):
+        """
+        Convert arrays of lat and lon to 3D cartesian coords, the array form
+        of `to_cart`.
+
+        Parameters
+        ----------
+        lat : array-like
+            Point latitudes.
+        lon : array-like
+            Point longitudes.
+
+        Returns
+        -------
+        cart : numpy.ndarray
+            Cartesian coords with x, y, z along the last axis.
+        """
+        lat, lon = np.radians(lat), np.radians(lon)
+        return np.stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)], axis=-1)
+
+    @staticmethod
+    def to_latlon_array(cart):
+        """
+        Convert arrays of 3D cartesian coords into lat and lon, the array form
+        of `to_latlon`.
+
+        Parameters
+        ----------
+        cart : array-like
+            Cartesian coords with x, y, z along the last axis.
+
+        Returns
+        -------
+        lat : numpy.ndarray
+            Point latitudes.
+        lon : numpy.ndarray
+            Point longitudes.
+        """
+        cart = np.asarray(cart, dtype=float)
+        x, y, z = cart[..., 0], cart[..., 1], cart[..., 2]
+        lat = np.degrees(np.arctan2(z, np.hypot(x, y)))
+        lon = np.degrees(np.arctan2(y, x))
+        return lat, lon
+
+    @classmethod
+    def weighted_centroid(cls, lat, lon, weights=None, axis=-1):
+        """
+        Calculate the weighted geographic midpoint of N points, for many sets
+        of points at once.
+
+        Parameters
+        ----------
+        lat : array-like
+            Point latitudes, the points of each set lie along the given axis.
+        lon : array-like
+            Point longitudes.
+        weights : array-like, optional
+            Point weightings, broadcast against lat & lon, equal by default.
+        axis : int, optional
+            Axis along which the points of each set lie.
+
+        Returns
+        -------
+        lat : numpy.ndarray
+            Midpoint latitudes.
+        lon : numpy.ndarray
+            Midpoint longitudes.
+        """
+        cart = cls.to_cart_array(lat, lon)
+        weights = np.ones(cart.shape[:-1]) if weights is None else np.broadcast_to(weights, cart.shape[:-1])
+        axis = axis % (cart.ndim - 1)
+        mean = (cart * weights[..., np.newaxis]).sum(axis=axis) / weights.sum(axis=axis)[..., np.newaxis]
+        return cls.to_latlon_array(mean)
+
+    @classmethod
+    def calc_midpoints(cls, lat1, lon1, lat2, lon2, w1=1, w2=1):
+        """
+        Calculate the geographic midpoints between arrays of point pairs, the
+        array form of `calc_midpoint`.
+
+        Parameters
+        ----------
+        lat1, lon1 : array-like
+            lat & lon respectively of the first points.
+        lat2, lon2 : array-like
+            lat & lon respectively of the second points.
+        w1, w2 : array-like, optional
+            Weightings of the first and second points.
+
+        Returns
+        -------
+        lat : numpy.ndarray
+            Midpoint latitudes.
+        lon : numpy.ndarray
+            Midpoint longitudes.
+        """
+        lat1, lon1, lat2, lon2, w1, w2 = np.broadcast_arrays(lat1, lon1, lat2, lon2, w1, w2)
+        return cls.weighted_centroid(np.stack([lat1, lat2], axis=-1), np.stack([lon1, lon2], axis=-1),
+                                     np.stack([w1, w2], axis=-1).astype(float))
+
+    @staticmethod
+    def great_circle_distance(lat1, lon1, lat2, lon2, radius=6371.0):
+        """
+        Calculate the great-circle distance between arrays of point pairs
+        using the haversine formula.
+
+        Parameters
+        ----------
+        lat1, lon1 : array-like
+            lat & lon respectively of the first points.
+        lat2, lon2 : array-like
+            lat & lon respectively of the second points.
+        radius : float, optional
+            Radius of the sphere, by default the mean radius of the earth in km.
+
+        Returns
+        -------
+        distance : numpy.ndarray
+            Distances in the units of radius.
+        """
+        lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=float)) for v in (lat1, lon1, lat2, lon2))
+        a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+        return 2 * radius * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+    @classmethod
+    def path_geometry(cls, receivers, transmitters):
+        """
+        Calculate the midpoint and great-circle distance of every receiver and
+        transmitter pair in a single call.
+
+        Parameters
+        ----------
+        receivers : dict
+            Receiver names mapped to their lat & lon.
+        transmitters : dict
+            Transmitter codes mapped to their lat & lon, eg. config.transmitters.
+
+        Returns
+        -------
+        geometry : dict
+            (receiver, transmitter) pairs mapped to the midpoint lat, lon and
+            the distance in km.
+        """
+        rx_names, tx_names = list(receivers), list(transmitters)
+        rx = np.array([receivers[name][:2] for name in rx_names], dtype=float).reshape(-1, 2)
+        tx = np.array([transmitters[name][:2] for name in tx_names], dtype=float).reshape(-1, 2)
+        # Receivers along the first axis, transmitters along the second.
+        rx_lat, rx_lon = rx[:, 0, np.newaxis], rx[:, 1, np.newaxis]
+        tx_lat, tx_lon = tx[np.newaxis, :, 0], tx[np.newaxis, :, 1]
+        lat, lon = cls.calc_midpoints(rx_lat, rx_lon, tx_lat, tx_lon)
+        distance = cls.great_circle_distance(rx_lat, rx_lon, tx_lat, tx_lon)
+        return {(r, t): (lat[i, j], lon[i, j], distance[i, j])
+                for i, r in enumerate(rx_names) for j, t in enumerate(tx_names)}
+
     @staticmethod
     def sunrise_sunset(date, lat, lon):
         """
@@ -153,3 +358,82 @@ class Geographic_Midpoint:
         sunrise = sun.sunrise(observer=obs, date=date)
         sunset = sun.sunset(observer=obs, date=date)
         return sunrise, sunset
+
+    @staticmethod
+    def sunrise_sunset_cached(date, lat, lon):
+        """
+        Calculate sunrise and sunset times in utc for given date, lat and lon,
+        using a bounded cache keyed on the date, lat and lon. Files from the
+        same site and day therefore share a single calculation, giving the same
+        times as `sunrise_sunset`.
+
+        Parameters
+        ----------
+        date : datetime.date
+            Date in yyyy-mm-dd.
+        lat : float
+            Latitude.
+        lon : float
+            Longitude.
+
+        Returns
+        -------
+        sunrise : datetime
+            Sunrise time.
+        sunset : datetime
+            Sunset time.
+        """
+        sunrise, sunset = _cached_sunrise_sunset(date, float(lat), float(lon))
+        if sunrise is _NO_SUN:
+            raise ValueError(sunset)
+        return sunrise, sunset
+
+    @staticmethod
+    def sunrise_sunset_range(dates, lat, lon):
+        """
+        Calculate sunrise and sunset times in utc for many dates at once, for
+        a given lat and lon. The calculation follows that of `sunrise_sunset`.
+
+        Parameters
+        ----------
+        dates : array-like
+            Dates, eg. a pandas.DatetimeIndex or array of datetime64.
+        lat : float
+            Latitude.
+        lon : float
+            Longitude.
+
+        Returns
+        -------
+        sunrise : numpy.ndarray
+            Sunrise times as datetime64[ns], NaT where the sun does not rise.
+        sunset : numpy.ndarray
+            Sunset times as datetime64[ns], NaT where the sun does not set.
+        """
+        days = np.asarray(dates, dtype='datetime64[D]')
+        lat = min(max(float(lat), -89.8), 89.8)
+        lon = float(lon)
+        zenith = 90.0 + SUN_APPARENT_RADIUS
+        # Refraction for an elevation between -0.575 and 5 degrees.
+        elevation = 90.0 - zenith
+        refraction = (1735.0 + elevation * (-518.2 + elevation * (103.4 + elevation * (-12.79 + elevation * 0.711))))
+        refraction /= 3600.0
+
+        # Julian century at midnight of each date, julian day 2440587.5 is 1970-01-01.
+        t0 = (days.astype(np.int64) + 2440587.5 - 2451545.0) / 36525.0
+        times = []
+        for direction in (1.0, -1.0):
+            declination, eq_time = _sun_declination(t0)
+            hour_angle = direction * _hour_angle(lat, declination, zenith - refraction)
+            minutes = 720.0 + 4.0 * (-lon - np.degrees(hour_angle)) - eq_time
+
+            declination, eq_time = _sun_declination(t0 + minutes / 1440.0 / 36525.0)
+            hour_angle = direction * _hour_angle(lat, declination, zenith + refraction)
+            minutes = 720.0 + 4.0 * (-lon - np.degrees(hour_angle)) - eq_time
+
+            never = np.isnan(minutes)
+            microseconds = np.trunc(np.where(never, 0.0, minutes) * 60e6).astype(np.int64)
+            result = days.astype('datetime64[ns]') + microseconds.astype('timedelta64[us]')
+            result[never] = np.datetime64('NaT')
+            times.append(result)
+        return times[0], times[1]
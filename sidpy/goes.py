@@ -0,0 +1,302 @@
+"""
+Cached, offline capable access to the GOES XRS data published by NOAA. The
+most recent copy of the feed is kept on disk and only refreshed once it is
+older than the given time to live, using a conditional request. If the feed
+cannot be reached the last good copy is used. Each fetch may be merged into a
+local day partitioned store, so that older days also have GOES XRS data.
+
+@author:
+    Oscar Sage David O'Hara
+@email:
+    oharao@tcd.ie
+"""
+
+import json
+import logging
+import shutil
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from sidpy.lease import file_lock
+from sidpy.output import atomic_path
+
+__all__ = ['GOES_URL', 'GOESCache', 'GOESStore', 'parse_goes']
+
+GOES_URL = "https://services.swpc.noaa.gov/json/goes/primary/xrays-7-day.json"
+
+
+def parse_goes(data):
+    """
+    Split GOES XRS json data into the long and short channels, converting all
+    timestamps at once.
+
+    Parameters
+    ----------
+    data : pandas.DataFrame
+        GOES XRS data, as read from the NOAA json.
+
+    Returns
+    -------
+    gl : pandas.Series
+        The GOES long channel indexed by UTC datetime.
+    gs : pandas.Series
+        The GOES short channel indexed by UTC datetime.
+    """
+    channels = []
+    for energy in ("0.1-0.8nm", "0.05-0.4nm"):
+        channel = data[data["energy"] == energy]
+        index = pd.to_datetime(channel['time_tag'].values, utc=True).tz_localize(None)
+        channels.append(pd.Series(channel["flux"].values, index=index))
+    return channels[0], channels[1]
+
+
+def _same(stored, data):
+    """
+    Whether merged GOES XRS data is identical to the data stored for the day.
+    """
+    return (stored.index.equals(data.index) and
+            all(np.array_equal(stored[column].values, data[column].values.astype(np.float64), equal_nan=True)
+                for column in ('long', 'short')))
+
+
+class GOESCache:
+    """
+    On disk cache of a GOES XRS json feed.
+
+    Parameters
+    ----------
+    cache_dir : str
+        Directory in which the cached feed is stored.
+    url : str, optional
+        URL of the feed, or path to a local json file.
+    ttl : float, optional
+        Time in seconds for which the cached copy is used without refreshing.
+    timeout : float, optional
+        Timeout in seconds of the request to the feed.
+    """
+
+    def __init__(self, cache_dir, url=GOES_URL, ttl=600, timeout=30):
+        self.cache_dir = Path(cache_dir)
+        self.url = str(url)
+        self.ttl = ttl
+        self.timeout = timeout
+        name = self.url.rstrip('/').split('/')[-1]
+        self.path = self.cache_dir / name
+        self.meta_path = self.cache_dir / (name + '.meta')
+
+    def _read_meta(self):
+        try:
+            with open(self.meta_path) as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self, content, meta):
+        # Written under a temporary name per thread, as the watcher refreshes the cache on its own thread.
+        with atomic_path(self.path) as temp_path, open(temp_path, 'wb') as fh:
+            fh.write(content)
+        self._write_meta(meta)
+
+    def _write_meta(self, meta):
+        with atomic_path(self.meta_path) as temp_path, open(temp_path, 'w') as fh:
+            json.dump(meta, fh)
+
+    def is_stale(self):
+        """
+        Whether the cached copy is missing or older than the time to live.
+        """
+        return not self.path.exists() or time.time() - self._read_meta().get('fetched', 0) > self.ttl
+
+    def refresh(self):
+        """
+        Refresh the cached copy of the feed. A conditional request is made so
+        that the feed is only downloaded if it has changed.
+
+        Returns
+        -------
+        refreshed : bool
+            True if the cached copy is up to date, False if the feed could not
+            be reached.
+        """
+        meta = self._read_meta()
+        source = Path(self.url)
+        try:
+            if source.exists():
+                if not self.path.exists() or source.stat().st_mtime != meta.get('mtime'):
+                    with atomic_path(self.path) as temp_path:
+                        shutil.copyfile(source, temp_path)
+                meta.update({'mtime': source.stat().st_mtime, 'fetched': time.time()})
+                self._write_meta(meta)
+                return True
+
+            request = urllib.request.Request(self.url)
+            if self.path.exists():
+                if meta.get('etag'):
+                    request.add_header('If-None-Match', meta['etag'])
+                if meta.get('last_modified'):
+                    request.add_header('If-Modified-Since', meta['last_modified'])
+            try:
+                with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                    content = response.read()
+                    self._write(content, {'etag': response.headers.get('ETag'),
+                                          'last_modified': response.headers.get('Last-Modified'),
+                                          'fetched': time.time()})
+                logging.debug('GOES swpc xrays data acquired.')
+            except urllib.error.HTTPError as e:
+                if e.code != 304:
+                    raise
+                meta['fetched'] = time.time()
+                self._write_meta(meta)
+                logging.debug('GOES swpc xrays data unchanged.')
+            return True
+        except Exception:
+            logging.warning('GOES XRS data could not be refreshed from %s, using cached copy.', self.url,
+                            exc_info=True)
+            return False
+
+    def get(self):
+        """
+        Get the GOES XRS data, refreshing the cached copy if it is stale.
+
+        Returns
+        -------
+        gl : pandas.Series
+            The GOES long channel, None if no data is available.
+        gs : pandas.Series
+            The GOES short channel, None if no data is available.
+        """
+        if self.is_stale():
+            self.refresh()
+        if not self.path.exists():
+            logging.warning('No GOES XRS data available.')
+            return None, None
+        try:
+            gl, gs = parse_goes(pd.read_json(self.path))
+        except Exception:
+            logging.exception('Cached GOES XRS data could not be read.')
+            return None, None
+        logging.debug('GOES XRS data processed.')
+        return gl, gs
+
+
+class GOESStore:
+    """
+    Local, day partitioned store of GOES XRS data, stored as
+    {root}/YYYY/MM/goes_xrs_YYYYMMDD.npz. An index of the archived days is kept
+    alongside the data, so that the data for any day is found in constant time.
+
+    Parameters
+    ----------
+    root : str
+        Directory in which the store is kept.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.index_path = self.root / 'index.json'
+        self._index = None
+
+    @property
+    def index(self):
+        """
+        Dictionary of archived days, yyyy-mm-dd, and the number of samples held.
+        """
+        if self._index is None:
+            try:
+                with open(self.index_path) as fh:
+                    self._index = json.load(fh)
+            except (OSError, ValueError):
+                self._index = {}
+        return self._index
+
+    def day_path(self, date):
+        """
+        Path of the file holding the given UTC day.
+        """
+        date = pd.Timestamp(date)
+        return self.root / date.strftime('%Y') / date.strftime('%m') / date.strftime('goes_xrs_%Y%m%d.npz')
+
+    def _load(self, path):
+        with np.load(path) as store:
+            return pd.DataFrame({'long': store['long'], 'short': store['short']},
+                                index=store['time'].astype('datetime64[ns]'))
+
+    def merge(self, gl, gs):
+        """
+        Merge GOES XRS data into the store, replacing any existing samples with
+        the same timestamp. Days whose data is unchanged are not rewritten.
+
+        Parameters
+        ----------
+        gl : pandas.Series
+            The GOES long channel indexed by UTC datetime.
+        gs : pandas.Series
+            The GOES short channel indexed by UTC datetime.
+
+        Returns
+        -------
+        days : list
+            The days written, yyyy-mm-dd.
+        """
+        if gl is None or gs is None:
+            return []
+        new = pd.DataFrame({'long': gl[~gl.index.duplicated(keep='last')],
+                            'short': gs[~gs.index.duplicated(keep='last')]})
+        days = []
+        self.root.mkdir(parents=True, exist_ok=True)
+        # Held while the day files and index are read, merged and replaced, as other processes or nodes may merge
+        # into the same store.
+        with file_lock(self.root / 'index.json.lock'):
+            self._index = None
+            index_changed = False
+            for day, data in new.groupby(new.index.normalize()):
+                path = self.day_path(day)
+                stored = self._load(path) if path.exists() else None
+                if stored is not None:
+                    data = pd.concat([stored, data])
+                    data = data[~data.index.duplicated(keep='last')]
+                data = data.sort_index()
+                key = day.strftime('%Y-%m-%d')
+                if self.index.get(key) != len(data):
+                    self.index[key] = len(data)
+                    index_changed = True
+                # Most of each fetch overlaps the days already stored, which are left untouched.
+                if stored is not None and _same(stored, data):
+                    continue
+                with atomic_path(path) as temp_path, open(temp_path, 'wb') as fh:
+                    np.savez(fh, time=data.index.values.astype(np.int64),
+                             long=data['long'].values.astype(np.float64),
+                             short=data['short'].values.astype(np.float64))
+                days.append(key)
+            if index_changed:
+                with atomic_path(self.index_path) as temp_path, open(temp_path, 'w') as fh:
+                    json.dump(self.index, fh, indent=1, sort_keys=True)
+        if days:
+            logging.debug('GOES XRS data merged for %d days.', len(days))
+        return days
+
+    def get_day(self, date):
+        """
+        Get the GOES XRS data for a UTC day.
+
+        Parameters
+        ----------
+        date : datetime
+            Any time within the day.
+
+        Returns
+        -------
+        gl : pandas.Series
+            The GOES long channel, None if the day is not archived.
+        gs : pandas.Series
+            The GOES short channel, None if the day is not archived.
+        """
+        if pd.Timestamp(date).strftime('%Y-%m-%d') not in self.index:
+            return None, None
+        data = self._load(self.day_path(date))
+        return data['long'], data['short']
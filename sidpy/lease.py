@@ -0,0 +1,372 @@
+"""
+Leases on the files being processed, so that several machines sharing the data
+directories may run `sidpy.run.process_directory` at once, each file being
+processed by one of them. A lease is a lock file within a directory on the
+shared filesystem, created with O_EXCL so that only one node may claim a file.
+Leases are renewed by a heartbeat while held and expire once a node stops
+renewing them, eg. having crashed, after which another node may take them over.
+
+Files may be sharded between nodes by site or station, each node claiming the
+files of its own shard and those of other shards left unprocessed for longer
+than `Leases.steal_after`, so that a node only renders the stations it usually
+renders while no file is left behind by a node which is down.
+
+The json files shared by the nodes, eg. the manifest and the GOES XRS index,
+are read, merged and replaced under a `file_lock`, so that no node loses the
+updates saved by another.
+
+The clocks of the nodes are assumed to agree to well within the lease time.
+
+@author:
+    Oscar Sage David O'Hara
+@email:
+    oharao@tcd.ie
+"""
+
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+
+__all__ = ['Leases', 'file_lock', 'holds_lease', 'parse_shard']
+
+
+def parse_shard(value):
+    """
+    Parse a shard given as 'index/count', eg. '0/3' for the first of three.
+
+    Returns
+    -------
+    shard : tuple
+        (index, count).
+    """
+    try:
+        index, count = (int(part) for part in str(value).split('/'))
+    except ValueError:
+        raise ValueError('Shard {!r} is not of the form index/count, eg. 0/3.'.format(value))
+    if not 0 <= index < count:
+        raise ValueError('Shard index {} is not within 0 to {}.'.format(index, count - 1))
+    return index, count
+
+
+@contextmanager
+def file_lock(path, timeout=60, stale=120, interval=0.05):
+    """
+    Hold an exclusive lock file, eg. while reading, merging and replacing a
+    file shared between processes or nodes.
+
+    Parameters
+    ----------
+    path : str
+        Path of the lock file.
+    timeout : float, optional
+        Time in seconds to wait for the lock before raising TimeoutError.
+    stale : float, optional
+        Age in seconds after which a lock is assumed to have been left by a
+        process which died while holding it, and is broken.
+    interval : float, optional
+        Time in seconds between attempts.
+    """
+    path = Path(path)
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            fd = os.open(str(path), os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - path.stat().st_mtime > stale:
+                    grave = path.with_name('{}.{}.stale'.format(path.name, token))
+                    os.rename(path, grave)
+                    if time.time() - grave.stat().st_mtime > stale:
+                        logging.warning('%s : Stale lock broken.', path)
+                    else:
+                        # Taken by another process after being found stale, and put back.
+                        try:
+                            os.link(grave, path)
+                        except FileExistsError:
+                            pass
+                    os.remove(grave)
+                    continue
+            except FileNotFoundError:
+                continue
+            if time.monotonic() > deadline:
+                raise TimeoutError('{} is held by another process.'.format(path))
+            time.sleep(interval)
+    with os.fdopen(fd, 'w') as fh:
+        fh.write(token)
+    try:
+        yield path
+    finally:
+        # Only removed if still held, rather than broken as stale and taken by another process.
+        try:
+            with open(path) as fh:
+                held = fh.read() == token
+            if held:
+                os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def holds_lease(token):
+    """
+    Whether a lease is still held, from its `Leases.token`, eg. by a worker
+    process right before processing the file.
+    """
+    path, owner = token
+    if Leases.owner_of(path) == owner:
+        return True
+    logging.warning('%s : Lease lost.', Path(path).name)
+    return False
+
+
+class Leases:
+    """
+    Leases held by this node on files within the shared data directories.
+
+    Parameters
+    ----------
+    directory : str
+        Directory of the lock files, on the filesystem shared by all nodes, eg.
+        {archive}/leases.
+    ttl : float, optional
+        Time in seconds after its last renewal at which a lease expires.
+    shard : tuple, optional
+        (index, count) of the shard of this node, all files by default.
+    shard_by : str, optional
+        Either 'site' or 'station', read from the header of each file.
+    steal_after : float, optional
+        Age in seconds after which files of other shards are claimed, never if
+        None.
+    owner : str, optional
+        Identifier of this node, unique by default.
+    """
+
+    def __init__(self, directory, ttl=600, shard=(0, 1), shard_by='station', steal_after=3600, owner=None):
+        if shard_by not in ('site', 'station'):
+            raise ValueError("shard_by must be either 'site' or 'station', not {!r}.".format(shard_by))
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.shard, self.shards = shard
+        self.shard_by = shard_by
+        self.steal_after = steal_after
+        self.owner = owner or '{}-{}-{}'.format(socket.gethostname(), os.getpid(), uuid.uuid4().hex[:8])
+        self.held = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._heartbeat = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def lease_path(self, file_path):
+        """
+        Path of the lock file of a data file.
+        """
+        return self.directory / (Path(file_path).name + '.lease')
+
+    def _expired(self, path):
+        try:
+            return time.time() - path.stat().st_mtime > self.ttl
+        except FileNotFoundError:
+            return True
+
+    @staticmethod
+    def owner_of(path):
+        """
+        Owner of a lock file, None if it does not exist or is being written.
+        """
+        try:
+            with open(path) as fh:
+                return json.load(fh).get('owner')
+        except (OSError, ValueError):
+            return None
+
+    def _break(self, path):
+        # Renaming is atomic, so of the nodes breaking an expired lease only one succeeds.
+        grave = path.with_name('{}.{}.expired'.format(path.name, self.owner))
+        try:
+            os.rename(path, grave)
+        except FileNotFoundError:
+            return
+        if not self._expired(grave):
+            # Taken over by another node after being found expired, and put back. Should a third node claim the
+            # lease in between, its holder finds the lease lost with `holds` before processing the file.
+            try:
+                os.link(grave, path)
+            except FileExistsError:
+                pass
+        else:
+            logging.info('%s : Expired lease of %s taken over.', path.name, self.owner_of(grave))
+        os.remove(grave)
+
+    def claim(self, file_path):
+        """
+        Claim a file, taking over its lease if expired.
+
+        Returns
+        -------
+        claimed : bool
+            Whether this node now holds the lease.
+        """
+        path = self.lease_path(file_path)
+        for _ in range(2):
+            try:
+                fd = os.open(str(path), os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+            except FileExistsError:
+                if not self._expired(path):
+                    return False
+                self._break(path)
+                continue
+            with os.fdopen(fd, 'w') as fh:
+                json.dump({'owner': self.owner, 'host': socket.gethostname(), 'pid': os.getpid(),
+                           'file': str(file_path), 'claimed': time.time()}, fh)
+            with self._lock:
+                self.held[path.name] = path
+            return True
+        return False
+
+    def renew(self):
+        """
+        Renew every lease held, dropping those taken over by another node.
+
+        Returns
+        -------
+        lost : list
+            Lock files of the leases no longer held.
+        """
+        lost = []
+        with self._lock:
+            for name, path in list(self.held.items()):
+                try:
+                    if self.owner_of(path) != self.owner:
+                        raise FileNotFoundError(path)
+                    os.utime(path)
+                except FileNotFoundError:
+                    logging.warning('%s : Lease lost.', name)
+                    del self.held[name]
+                    lost.append(path)
+        return lost
+
+    def holds(self, file_path):
+        """
+        Whether this node holds the lease of a file. The owner is read back
+        from the lock file, so that a lease taken over by another node is found
+        right before the file is processed rather than at the next renewal.
+        """
+        path = self.lease_path(file_path)
+        with self._lock:
+            if path.name not in self.held:
+                return False
+            if self.owner_of(path) == self.owner:
+                return True
+            del self.held[path.name]
+        logging.warning('%s : Lease lost.', path.name)
+        return False
+
+    def token(self, file_path):
+        """
+        Lock file and owner of the lease of a file, passed to a worker process
+        to check with `holds_lease` that the lease is still held.
+        """
+        return str(self.lease_path(file_path)), self.owner
+
+    def release(self, file_path):
+        """
+        Release the lease of a file, eg. once it has been processed.
+        """
+        with self._lock:
+            path = self.held.pop(self.lease_path(file_path).name, None)
+        if path is not None and self.owner_of(path) == self.owner:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def start(self):
+        """
+        Start renewing the leases held every third of the lease time.
+        """
+        if self._heartbeat is None:
+            self._stop.clear()
+            self._heartbeat = threading.Thread(target=self._beat, name='sidpy-leases', daemon=True)
+            self._heartbeat.start()
+
+    def _beat(self):
+        while not self._stop.wait(self.ttl / 3):
+            self.renew()
+
+    def stop(self):
+        """
+        Stop renewing and release all leases held.
+        """
+        if self._heartbeat is not None:
+            self._stop.set()
+            self._heartbeat.join()
+            self._heartbeat = None
+        with self._lock:
+            names = list(self.held)
+        for name in names:
+            self.release(self.directory / name[:-len('.lease')])
+
+    def shard_of(self, file_path):
+        """
+        Shard of a file, from a stable hash of its site or station.
+        """
+        key = Path(file_path).name
+        if Path(file_path).suffix == '.csv':
+            from sidpy.reader import read_header
+            try:
+                header = read_header(file_path)
+                value = header.parameters.get('Site') if self.shard_by == 'site' else header.station_id
+                key = (value or key).lower()
+            except (OSError, ValueError, UnicodeError):
+                pass
+        return zlib.crc32(key.encode()) % self.shards
+
+    def claim_files(self, files):
+        """
+        Claim the files of this node's shard, and those of other shards older
+        than `steal_after`.
+
+        Parameters
+        ----------
+        files : list
+            Paths of the files to be processed.
+
+        Returns
+        -------
+        claimed : list
+            Paths of the files claimed, in the order given.
+        """
+        claimed = []
+        for file_path in files:
+            if self.shards > 1 and self.shard_of(file_path) != self.shard:
+                try:
+                    age = time.time() - Path(file_path).stat().st_mtime
+                except FileNotFoundError:
+                    continue
+                if self.steal_after is None or age < self.steal_after:
+                    continue
+            if not self.claim(file_path):
+                continue
+            if not Path(file_path).exists():
+                # Processed by another node between being listed and claimed.
+                self.release(file_path)
+                continue
+            claimed.append(file_path)
+        logging.debug('%d of %d files claimed by %s.', len(claimed), len(files), self.owner)
+        return claimed
@@ -0,0 +1,253 @@
+"""
+Incremental live plots of the "current" files, which are still being written to
+by the SID and SuperSID software and so are skipped by `sidpy.run.process_file`.
+The byte offset reached within each file is stored, so that each update only
+parses the rows appended since the last, which are added to an on-disk buffer
+of the day before the live png is rendered again.
+
+@author:
+    Oscar Sage David O'Hara
+@email:
+    oharao@tcd.ie
+"""
+
+import io
+import json
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from sidpy.archiver import Archiver
+from sidpy.conditioning import condition_signal
+from sidpy.reader import _read_header_block, parse_header_lines, parse_timestamps
+
+__all__ = ['BUFFER_DTYPE', 'LiveTail', 'is_live_file', 'tail']
+
+# Record of the on-disk day buffer, the raw signal is kept so that the
+# SuperSID smoothing is applied over the whole day when rendered.
+BUFFER_DTYPE = np.dtype([('time', '<i8'), ('signal', '<f8')])
+
+
+def is_live_file(file_path):
+    """
+    Whether the file is a "current" file, still being written to.
+    """
+    path = Path(file_path)
+    return path.suffix == '.csv' and 'current' in path.name
+
+
+class LiveTail:
+    """
+    Follow growing "current" files, rendering the live png of each from the
+    rows appended since the previous update.
+
+    Parameters
+    ----------
+    archive_path : str
+        Archive root, the offsets are stored in ``live_tail.json`` and the day
+        buffers within the live directory of each site.
+    goes_store : sidpy.goes.GOESStore, optional
+        Source of the GOES XRS panel, omitted if not given or if the day is not
+        held.
+    filename : str, optional
+        Name of the file in which the offsets are stored.
+    """
+
+    def __init__(self, archive_path, goes_store=None, filename='live_tail.json'):
+        self.archive_path = Path(archive_path)
+        self.goes_store = goes_store
+        self.path = self.archive_path / filename
+        self.state = {}
+        if self.path.exists():
+            try:
+                with open(self.path) as fh:
+                    self.state = json.load(fh)
+            except ValueError:
+                logging.warning('%s is corrupt, live files will be read from the start.', self.path)
+
+    def save(self):
+        """
+        Write the offsets to disk, via a temporary file so that an interrupted
+        write does not corrupt them.
+        """
+        self.archive_path.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_name(self.path.name + '.tmp')
+        with open(temp_path, 'w') as fh:
+            json.dump(self.state, fh, indent=1)
+        os.replace(temp_path, self.path)
+
+    def buffer_path(self, header, original_sid):
+        """
+        Path of the day buffer for the given observation parameters.
+
+        Parameters
+        ----------
+        header : dict
+            Dictionary containing observation parameters, eg. transmitter freq.
+        original_sid : bool
+            Statement on whether SID or Supersid data is being used.
+
+        Returns
+        -------
+        path : PosixPath
+            {site}/live/buffer/{StationID}_{instrument}_YYYYMMDD.bin path.
+        """
+        date = datetime.strptime(header['UTC_StartTime'], '%Y-%m-%d%H:%M:%S')
+        return (Archiver(self.archive_path).site_path(header['Site']) / 'live' / 'buffer' /
+                '{}_{}_{}.bin'.format(header['StationID'], 'sid' if original_sid else 'super_sid',
+                                      date.strftime('%Y%m%d')))
+
+    def read_new(self, file_path):
+        """
+        Read the complete rows appended to a file since the previous call. A
+        file which has been replaced or truncated, eg. at the start of a new
+        day, is read from the start.
+
+        Parameters
+        ----------
+        file_path : str
+            Path to the csv file.
+
+        Returns
+        -------
+        header : dict
+            Dictionary containing observation parameters, None if the header
+            has not been completely written.
+        records : numpy.ndarray
+            New rows, as a `BUFFER_DTYPE` array of the raw signal.
+        """
+        key = str(Path(file_path).resolve())
+        stat = os.stat(file_path)
+        with open(file_path, 'rb') as fh:
+            # The header is read each time, so a file rewritten for a new day is also detected.
+            header = parse_header_lines(_read_header_block(fh))
+            body_start = fh.tell()
+            if body_start >= stat.st_size or 'UTC_StartTime' not in header or 'StationID' not in header:
+                # The header is still being written.
+                return None, np.empty(0, dtype=BUFFER_DTYPE)
+            entry = self.state.get(key)
+            if (entry is None or entry['inode'] != stat.st_ino or entry['header'] != header or
+                    stat.st_size < entry['offset'] or self._buffer_size(entry['buffer']) < entry['length']):
+                entry = {'inode': stat.st_ino, 'offset': body_start, 'header': header,
+                         'buffer': entry['buffer'] if entry is not None else None, 'length': 0}
+            fh.seek(entry['offset'])
+            chunk = fh.read(stat.st_size - entry['offset'])
+        # Only complete lines are parsed, a partially written row is read next time.
+        chunk = chunk[:chunk.rfind(b'\n') + 1]
+        entry['offset'] += len(chunk)
+        self.state[key] = entry
+
+        records = np.empty(0, dtype=BUFFER_DTYPE)
+        if chunk.strip():
+            body = pd.read_csv(io.BytesIO(chunk),
+                               header=None,
+                               names=['datetime', 'signal_strength'],
+                               skipinitialspace=True,
+                               dtype={'datetime': object, 'signal_strength': np.float64},
+                               comment='#').dropna()
+            records = np.empty(len(body), dtype=BUFFER_DTYPE)
+            records['time'] = parse_timestamps(body['datetime'].values).astype(np.int64)
+            records['signal'] = body['signal_strength'].values
+        return entry['header'], records
+
+    @staticmethod
+    def _buffer_size(buffer_path):
+        if buffer_path is None:
+            return 0
+        try:
+            return os.path.getsize(buffer_path)
+        except OSError:
+            return 0
+
+    def _append(self, entry, buffer_path, records):
+        if entry['buffer'] != str(buffer_path):
+            # A new day, the buffer of the previous day is no longer needed.
+            if entry['buffer'] is not None and os.path.exists(entry['buffer']):
+                os.remove(entry['buffer'])
+            entry['buffer'], entry['length'] = str(buffer_path), 0
+        buffer_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(buffer_path, 'ab') as fh:
+            # Discard any rows appended after the offsets were last saved.
+            fh.truncate(entry['length'])
+            fh.write(records.tobytes())
+        entry['length'] += records.nbytes
+
+    def update(self, file_path):
+        """
+        Read the rows appended to a live file and render its live png if any
+        were found.
+
+        Parameters
+        ----------
+        file_path : str
+            Path to the csv file.
+
+        Returns
+        -------
+        image_path : PosixPath
+            Path of the live png, None if it was not rendered.
+        """
+        from sidpy.render import get_template
+        header, records = self.read_new(file_path)
+        entry = self.state.get(str(Path(file_path).resolve()))
+        if header is None or (not len(records) and entry['length']):
+            return None
+        original_sid = '-' in header.get('MonitorID', '')
+        buffer_path = self.buffer_path(header, original_sid)
+        self._append(entry, buffer_path, records)
+        self.save()
+
+        day = np.fromfile(buffer_path, dtype=BUFFER_DTYPE)
+        signal = day['signal']
+        if len(signal) < (1 if original_sid else 9):
+            return None
+        if not original_sid:
+            signal = condition_signal(signal, out=signal)
+        data = pd.DataFrame({'datetime': day['time'].astype('datetime64[ns]'), 'signal_strength': signal})
+
+        start_time = datetime.strptime(header['UTC_StartTime'], '%Y-%m-%d%H:%M:%S')
+        gl, gs = self.goes_store.get_day(start_time) if self.goes_store is not None else (None, None)
+        xrs = gl is not None and gs is not None
+        image_path = (buffer_path.parent.parent /
+                      (header['StationID'] + ('_SID.png' if original_sid else '_SuperSID.png')))
+        get_template(xrs).render(header, data, image_path, original_sid, gl, gs)
+        logging.debug('%s : %d new rows, live plot updated.', file_path, len(records))
+        return image_path
+
+
+def tail(data_path, archive_path, goes_store=None):
+    """
+    Update the live png of every "current" file within the data directories.
+
+    Parameters
+    ----------
+    data_path : list
+        Directories containing data to be processed.
+    archive_path : str
+        Archive root.
+    goes_store : sidpy.goes.GOESStore, optional
+        Source of the GOES XRS panels.
+
+    Returns
+    -------
+    image_paths : list
+        Paths of the live pngs rendered.
+    """
+    live = LiveTail(archive_path, goes_store)
+    image_paths = []
+    for directory in data_path:
+        for file_path in sorted(Path(directory).iterdir()):
+            if not is_live_file(file_path):
+                continue
+            try:
+                image_path = live.update(file_path)
+            except Exception:
+                logging.exception('%s : The following exception was raised:', file_path)
+                continue
+            if image_path is not None:
+                image_paths.append(image_path)
+    return image_paths
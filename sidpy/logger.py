@@ -2,40 +2,204 @@
 Contains functions to initialise the associated logging parameters. This specifies the
 logging format and removes "spam" entries diluting key information.
 
+Records are put on a queue by the processing loop and written to the console and
+a rotating log file by a listener thread, so logging does not block on disk
+writes. Worker processes send their records to the same listener.
+
 @author:
     Oscar Sage David O'Hara
 @email:
     oharao@tcd.ie
 """
 
+import atexit
 import logging
-import sys
+import logging.handlers
+import multiprocessing
+import os
+import queue
+from pathlib import Path
+
+FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+DATE_FORMAT = '%Y/%m/%d %H:%M:%S'
+
+# The queue handler and listener(s) installed by init_logger, replaced if it is called again.
+_state = {'handler': None, 'listeners': [], 'file_handler': None, 'worker_queue': None, 'level': None,
+          'pid': None, 'configured': False}
 
 
-def init_logger():
+def _level(level):
+    if level is None:
+        level = os.environ.get('SIDPY_LOG_LEVEL', 'DEBUG')
+    return logging.getLevelName(level.upper()) if isinstance(level, str) else level
+
+
+def init_logger(level=None, filename='error.log', max_bytes=10 * 1024 * 1024, backup_count=5, when=None,
+                console=True):
     """
     Once called this initialises logging config. By default logging levels have been altered for
-    matplotlib, requests & numexpr.
+    matplotlib, requests & numexpr. Calling it again replaces the previous configuration rather
+    than adding further handlers.
+
+    Parameters
+    ----------
+    level : str or int, optional
+        Minimum level logged, eg. 'INFO'. Taken from the SIDPY_LOG_LEVEL environment
+        variable if not given, DEBUG by default.
+    filename : str, optional
+        Log file, not written if None.
+    max_bytes : int, optional
+        Size at which the log file is rotated, if rotated by size.
+    backup_count : int, optional
+        Number of rotated log files kept.
+    when : str, optional
+        Rotate the log file by time rather than size, eg. 'midnight', see
+        `logging.handlers.TimedRotatingFileHandler`.
+    console : bool, optional
+        Also log to the console.
+
+    Returns
+    -------
+    logger : logging.Logger
+        The root logger.
     """
+    stop_logger()
+    level = _level(level)
+    formatter = logging.Formatter(fmt=FORMAT, datefmt=DATE_FORMAT)
+    handlers = []
+    if filename is not None:
+        # create file handler that logs debug and higher level messages
+        if when is not None:
+            fh = logging.handlers.TimedRotatingFileHandler(filename, when=when, backupCount=backup_count,
+                                                           delay=True)
+        else:
+            fh = logging.handlers.RotatingFileHandler(filename, maxBytes=max_bytes, backupCount=backup_count,
+                                                      delay=True)
+        handlers.append(fh)
+        _state['file_handler'] = fh
+    if console:
+        # create console handler
+        handlers.append(logging.StreamHandler())
+    for handler in handlers:
+        handler.setLevel(level)
+        handler.setFormatter(formatter)
+
+    records = queue.Queue(-1)
+    listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+    listener.start()
+    _state['listeners'].append(listener)
+    _state['handler'] = logging.handlers.QueueHandler(records)
+    _state['level'], _state['pid'], _state['configured'] = level, os.getpid(), True
+
     logger = logging.getLogger()
-    logger.setLevel(logging.DEBUG)
-    # create file handler that logs debug and higher level messages
-    fh = logging.FileHandler('error.log')
-    fh.setLevel(logging.DEBUG)
-    # create console handler with a higher log level
-    ch = logging.StreamHandler()
-    ch.setLevel(logging.DEBUG)
-    # create formatter and add it to the handlers
-    formatter = logging.Formatter(fmt='%(asctime)s - %(levelname)s - %(message)s',
-                                  datefmt='%Y/%m/%d %H:%M:%S')
-    ch.setFormatter(formatter)
-    fh.setFormatter(formatter)
-    # add the handlers to logger
-    logger.addHandler(ch)
-    logger.addHandler(fh)
+    logger.setLevel(level)
+    logger.addHandler(_state['handler'])
 
     logging.getLogger('requests').setLevel(logging.DEBUG)
     logging.getLogger('matplotlib.font_manager').disabled = True
     logging.getLogger('matplotlib').setLevel(logging.WARNING)
     logging.getLogger('numexpr').setLevel(logging.WARNING)
     return logger
+
+
+def ensure_logger():
+    """
+    Initialise logging with the default configuration, unless `init_logger`
+    or `init_worker_logger` has already been called.
+    """
+    if not _state['configured']:
+        init_logger()
+
+
+def stop_logger():
+    """
+    Write out the queued records and remove the handlers installed by `init_logger`.
+    """
+    if _state['handler'] is not None:
+        logging.getLogger().removeHandler(_state['handler'])
+        _state['handler'] = None
+    for listener in _state['listeners']:
+        listener.stop()
+    # The listeners share their handlers, which are closed once all have stopped.
+    for handler in {handler for listener in _state['listeners'] for handler in listener.handlers}:
+        handler.close()
+    _state['listeners'] = []
+    _state['file_handler'] = None
+    _state['worker_queue'] = None
+
+
+atexit.register(stop_logger)
+
+
+def worker_queue():
+    """
+    Queue on which worker processes put their records, written by the same
+    handlers as those of this process.
+
+    Returns
+    -------
+    queue : multiprocessing.Queue
+        Passed to `init_worker_logger` within each worker, None if logging has
+        not been initialised.
+    """
+    if _state['worker_queue'] is None and _state['listeners']:
+        _state['worker_queue'] = multiprocessing.Queue(-1)
+        listener = logging.handlers.QueueListener(_state['worker_queue'], *_state['listeners'][0].handlers,
+                                                  respect_handler_level=True)
+        listener.start()
+        _state['listeners'].append(listener)
+    return _state['worker_queue']
+
+
+def init_worker_logger(records, level=None):
+    """
+    Send the records of a worker process to the listener of the parent
+    process, replacing any handlers inherited from the parent.
+
+    Parameters
+    ----------
+    records : multiprocessing.Queue
+        Output of `worker_queue` within the parent process.
+    level : str or int, optional
+        Minimum level logged.
+    """
+    if _state['pid'] == os.getpid():
+        # Logging was initialised within this process itself, rather than inherited from a forked parent.
+        stop_logger()
+    else:
+        # The listeners inherited from a forked parent are not running within this process.
+        _state['handler'], _state['listeners'], _state['file_handler'], _state['worker_queue'] = None, [], None, None
+    _state['configured'] = True
+    logger = logging.getLogger()
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    logger.setLevel(_level(level))
+    if records is not None:
+        logger.addHandler(logging.handlers.QueueHandler(records))
+    logging.getLogger('matplotlib.font_manager').disabled = True
+    logging.getLogger('matplotlib').setLevel(logging.WARNING)
+    logging.getLogger('numexpr').setLevel(logging.WARNING)
+
+
+def log_level():
+    """
+    Level set by the last call to `init_logger`, None if not called.
+    """
+    return _state['level']
+
+
+def log_directory():
+    """
+    Directory of the log file, in which the run metrics are also written.
+
+    Returns
+    -------
+    directory : PosixPath
+        Directory of the log file, the working directory if there is none.
+    """
+    if _state['file_handler'] is not None:
+        return Path(_state['file_handler'].baseFilename).parent
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, logging.FileHandler):
+            return Path(handler.baseFilename).parent
+    return Path('.')
@@ -0,0 +1,283 @@
+"""
+Persistent record of the files which have already been processed, allowing
+repeated or interrupted runs to skip work which has already been completed.
+The manifest is stored as json under the archive root. Files are recorded by
+their content, so that a copy of an archived file landing in the data
+directories again is recognised wherever it was processed from.
+
+@author:
+    Oscar Sage David O'Hara
+@email:
+    oharao@tcd.ie
+"""
+
+import hashlib
+import json
+import logging
+import os
+import socket
+from pathlib import Path
+
+from sidpy.lease import file_lock
+
+
+class Manifest:
+    """
+    Record of processed files keyed by the sha256 hash of their contents,
+    holding the name, size and modification time of each file along with the
+    outputs produced.
+
+    Parameters
+    ----------
+    root : str
+        Archive root, the manifest is stored within this directory. If None the
+        manifest is held in memory only, as used by worker processes which pass
+        their entries back to the parent.
+    filename : str, optional
+        Name of the manifest file.
+    save_every : int, optional
+        Number of files recorded between saves, the manifest is also saved
+        by `save` at the end of each run. An interrupted run processes at most
+        this many files again.
+    """
+
+    def __init__(self, root, filename='manifest.json', save_every=64):
+        self.path = Path(root) / filename if root is not None else None
+        self.entries = {}
+        # Keys of the entries by file name and size, so that only likely copies are hashed.
+        self._names = {}
+        self.save_every = save_every
+        # Number of changes made, and keys of the entries invalidated, since the manifest was last saved.
+        self._unsaved = 0
+        self._removed = set()
+        for key, entry in self._read().items():
+            self._add(key, entry)
+
+    def _read(self):
+        if self.path is None or not self.path.exists():
+            return {}
+        try:
+            with open(self.path) as fh:
+                entries = json.load(fh)
+        except ValueError:
+            logging.warning('%s is corrupt, all files will be processed.', self.path)
+            return {}
+        for key in list(entries):
+            if 'name' not in entries[key]:
+                # Recorded by path by earlier versions.
+                entry = entries.pop(key)
+                entry['name'] = Path(key).name
+                entries[entry.pop('sha256')] = entry
+                self._unsaved = max(self._unsaved, 1)
+        return entries
+
+    def _add(self, key, entry):
+        self.entries[key] = entry
+        self._names.setdefault((entry['name'], entry['size']), set()).add(key)
+
+    def _discard(self, key):
+        entry = self.entries.pop(key)
+        self._names.get((entry['name'], entry['size']), set()).discard(key)
+
+    @staticmethod
+    def file_hash(file_path, block_size=1 << 20):
+        """
+        Calculate the sha256 hash of a file's contents.
+
+        Parameters
+        ----------
+        file_path : str
+            File path.
+        block_size : int, optional
+            Number of bytes read at a time.
+
+        Returns
+        -------
+        digest : str
+            Hex digest of the file contents.
+        """
+        sha = hashlib.sha256()
+        with open(file_path, 'rb') as fh:
+            for block in iter(lambda: fh.read(block_size), b''):
+                sha.update(block)
+        return sha.hexdigest()
+
+    @classmethod
+    def fingerprint(cls, file_path):
+        """
+        Size, modification time and content hash of a file, taken before the
+        file is moved into the archive.
+
+        Parameters
+        ----------
+        file_path : str
+            File path.
+
+        Returns
+        -------
+        fingerprint : dict
+            File size, mtime & sha256.
+        """
+        stat = os.stat(file_path)
+        return {'size': stat.st_size, 'mtime': stat.st_mtime, 'sha256': cls.file_hash(file_path)}
+
+    def match(self, file_path):
+        """
+        Find the entry of a file which has already been processed. Only
+        entries of the same name and size are considered, the content hash is
+        calculated when the modification time differs.
+
+        Parameters
+        ----------
+        file_path : str
+            File path.
+
+        Returns
+        -------
+        key : str
+            Key of the entry, None if the file has not been processed, has
+            changed, no longer exists or any of its outputs are missing.
+        """
+        file_path = Path(file_path)
+        try:
+            stat = os.stat(file_path)
+        except FileNotFoundError:
+            return None
+        digest = None
+        for key in sorted(self._names.get((file_path.name, stat.st_size), ())):
+            entry = self.entries[key]
+            if not all(Path(output).exists() for output in entry['outputs']):
+                continue
+            if stat.st_mtime == entry['mtime']:
+                return key
+            if digest is None:
+                digest = self.file_hash(file_path)
+            if digest == key:
+                return key
+        return None
+
+    def outputs(self, file_path):
+        """
+        Outputs recorded for a file, or None if the file has not been processed.
+        """
+        key = self.match(file_path)
+        return self.entries[key]['outputs'] if key is not None else None
+
+    def is_processed(self, file_path):
+        """
+        Check whether a file has already been processed and is unchanged.
+
+        Parameters
+        ----------
+        file_path : str
+            File path.
+
+        Returns
+        -------
+        processed : bool
+            True if the file is unchanged and all of its outputs exist.
+        """
+        return self.match(file_path) is not None
+
+    def record(self, file_path, header, outputs, fingerprint=None, save=False):
+        """
+        Record a processed file, the manifest is saved once every `save_every`
+        files rather than rewritten for each.
+
+        Parameters
+        ----------
+        file_path : str
+            Path of the processed file, before it was archived.
+        header : dict
+            Dictionary containing observation parameters, eg. transmitter freq.
+        outputs : list
+            Paths of the files produced.
+        fingerprint : dict, optional
+            Fingerprint of the file taken before it was moved, calculated from
+            file_path when not given.
+        save : bool, optional
+            Save the manifest to disk immediately.
+        """
+        entry = dict(fingerprint or self.fingerprint(file_path))
+        key = entry.pop('sha256')
+        entry.update({'name': Path(file_path).name,
+                      'site': header['Site'].lower(),
+                      'date': header['UTC_StartTime'][:10],
+                      'outputs': [str(output) for output in outputs]})
+        if key in self.entries:
+            self._discard(key)
+        self._add(key, entry)
+        self._changed(1, save)
+
+    def _changed(self, count, save):
+        self._unsaved += count
+        if save or self._unsaved >= self.save_every:
+            self.save()
+
+    def update(self, entries, save=False):
+        """
+        Merge entries recorded elsewhere, eg. by a worker process.
+
+        Parameters
+        ----------
+        entries : dict
+            Manifest entries keyed by content hash.
+        save : bool, optional
+            Save the manifest to disk immediately.
+        """
+        if entries:
+            for key, entry in entries.items():
+                if key in self.entries:
+                    self._discard(key)
+                self._add(key, entry)
+            self._changed(len(entries), save)
+
+    def invalidate(self, site=None, date=None):
+        """
+        Remove entries so that the matching files are processed again.
+
+        Parameters
+        ----------
+        site : str, optional
+            Site name, all sites if not given.
+        date : str, optional
+            Date in yyyy-mm-dd, all dates if not given.
+
+        Returns
+        -------
+        removed : int
+            Number of entries removed.
+        """
+        keys = [key for key, entry in self.entries.items()
+                if (site is None or entry['site'] == site.lower())
+                and (date is None or entry['date'] == str(date))]
+        for key in keys:
+            self._discard(key)
+        self._removed.update(keys)
+        if keys:
+            self._changed(len(keys), True)
+        logging.debug('%d manifest entries invalidated.', len(keys))
+        return len(keys)
+
+    def save(self):
+        """
+        Write the manifest to disk, the file is replaced atomically so that it
+        is never left partially written. The entries saved by other processes
+        or nodes since the manifest was loaded are merged in under a lock, so
+        that several may record files at once.
+        """
+        if not self._unsaved or self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with file_lock(self.path.with_name(self.path.name + '.lock')):
+            for key, entry in self._read().items():
+                if key not in self.entries and key not in self._removed:
+                    self._add(key, entry)
+            # Named per process, as several processes or machines may save the manifest at once.
+            temp_path = self.path.with_name('{}.{}-{}.tmp'.format(self.path.name, socket.gethostname(),
+                                                                   os.getpid()))
+            with open(temp_path, 'w') as fh:
+                json.dump(self.entries, fh, separators=(',', ':'))
+            os.replace(temp_path, self.path)
+        self._unsaved = 0
+        self._removed.clear()
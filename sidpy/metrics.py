@@ -0,0 +1,338 @@
+"""
+Per-stage instrumentation of the processing pipeline. The wall time of each
+stage of `sidpy.run.process_file` (parsing, filtering, the sunrise
+calculation, drawing, savefig, publishing the live png and the archive move)
+is recorded for each file, along with its peak memory if traced, added up for
+the run and written as a JSON summary and a Prometheus textfile alongside the
+log. When disabled the stages are shared no-op context managers, so the
+instrumentation costs little more than a function call per stage.
+
+@author:
+    Oscar Sage David O'Hara
+@email:
+    oharao@tcd.ie
+"""
+
+import json
+import os
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+from sidpy.logger import log_directory
+
+__all__ = ['Metrics', 'NullMetrics', 'NULL_METRICS', 'active', 'stage']
+
+
+class _NullStage:
+    """
+    Context manager which does nothing, shared by every disabled stage.
+    """
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class NullMetrics:
+    """
+    Stand-in for `Metrics` when instrumentation is disabled.
+    """
+    enabled = False
+    records = ()
+
+    def stage(self, name):
+        return _NULL_STAGE
+
+    def file(self, file_path):
+        return _NULL_STAGE
+
+    def extend(self, records):
+        pass
+
+
+NULL_METRICS = NullMetrics()
+# Metrics of the file being processed, to which `stage` records.
+_active = NULL_METRICS
+
+
+def active():
+    """
+    The metrics of the file being processed, `NULL_METRICS` if none.
+    """
+    return _active
+
+
+def stage(name):
+    """
+    Time a stage of the file being processed, a no-op unless metrics are
+    being recorded.
+
+    Parameters
+    ----------
+    name : str
+        Name of the stage.
+
+    Returns
+    -------
+    context : object
+        Context manager enclosing the stage.
+    """
+    return _active.stage(name)
+
+
+class _Stage:
+    """
+    Context manager recording the wall time and peak memory of a stage.
+    """
+    __slots__ = ('metrics', 'name', 'start', 'memory', 'peak')
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        if self.metrics._tracing:
+            self.memory = tracemalloc.get_traced_memory()[0]
+            # The peak of an enclosing stage is carried over before the peak is reset.
+            self.peak = self.memory
+            if self.metrics._stack:
+                outer = self.metrics._stack[-1]
+                outer.peak = max(outer.peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        self.metrics._stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.start
+        self.metrics._stack.pop()
+        peak = None
+        if self.metrics._tracing:
+            self.peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+            peak = self.peak - self.memory
+            if self.metrics._stack:
+                outer = self.metrics._stack[-1]
+                outer.peak = max(outer.peak, self.peak)
+        self.metrics.records.append({'file': self.metrics._file, 'stage': self.name, 'seconds': seconds,
+                                     'peak_bytes': peak})
+        return False
+
+
+class _File:
+    """
+    Context manager making the metrics active while a file is processed.
+    """
+    __slots__ = ('metrics', 'file_path', 'stage', 'previous', 'started')
+
+    def __init__(self, metrics, file_path):
+        self.metrics = metrics
+        self.file_path = file_path
+
+    def __enter__(self):
+        global _active
+        self.previous, _active = _active, self.metrics
+        self.metrics._file = str(self.file_path)
+        self.started = (self.metrics.trace_memory and hasattr(tracemalloc, 'reset_peak')
+                        and not tracemalloc.is_tracing())
+        if self.started:
+            tracemalloc.start()
+        self.metrics._tracing = tracemalloc.is_tracing() and hasattr(tracemalloc, 'reset_peak')
+        self.stage = _Stage(self.metrics, 'total').__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        global _active
+        self.stage.__exit__(*exc)
+        if self.started:
+            tracemalloc.stop()
+        self.metrics._tracing = False
+        self.metrics._file = None
+        _active = self.previous
+        return False
+
+
+class Metrics:
+    """
+    Record the wall time and peak memory of each stage of each file.
+
+    Parameters
+    ----------
+    trace_memory : bool, optional
+        Also record the peak memory allocated within each stage, using
+        tracemalloc which slows the processing several times over. Requires
+        Python 3.9 or later.
+
+    Attributes
+    ----------
+    records : list
+        A dictionary of the file, stage, seconds and peak_bytes (None if not
+        traced) of each stage, in the order in which the stages completed. The
+        whole of each file is recorded as the stage "total".
+    """
+    enabled = True
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.records = []
+        self.started = datetime.utcnow()
+        self._start = time.perf_counter()
+        self._stack = []
+        self._tracing = False
+        self._file = None
+
+    def file(self, file_path):
+        """
+        Record the stages of a file, including those timed by `sidpy.metrics.stage`.
+
+        Parameters
+        ----------
+        file_path : str
+            Path of the file being processed.
+
+        Returns
+        -------
+        context : object
+            Context manager enclosing the processing of the file.
+        """
+        return _File(self, file_path)
+
+    def stage(self, name):
+        """
+        Record a stage, of the current file if any or otherwise of the run.
+
+        Parameters
+        ----------
+        name : str
+            Name of the stage.
+
+        Returns
+        -------
+        context : object
+            Context manager enclosing the stage.
+        """
+        return _Stage(self, name)
+
+    def extend(self, records):
+        """
+        Add the records of files processed elsewhere, eg. by a worker process.
+        """
+        self.records.extend(records)
+
+    def totals(self):
+        """
+        Add up the records of each stage.
+
+        Returns
+        -------
+        totals : dict
+            Stage : dictionary of the count, total seconds, maximum seconds of a
+            single file and maximum peak_bytes.
+        """
+        totals = {}
+        for record in self.records:
+            total = totals.setdefault(record['stage'], {'count': 0, 'seconds': 0.0, 'max_seconds': 0.0,
+                                                        'peak_bytes': None})
+            total['count'] += 1
+            total['seconds'] += record['seconds']
+            total['max_seconds'] = max(total['max_seconds'], record['seconds'])
+            if record['peak_bytes'] is not None:
+                total['peak_bytes'] = max(total['peak_bytes'] or 0, record['peak_bytes'])
+        return totals
+
+    def summary(self):
+        """
+        Summary of the run.
+
+        Returns
+        -------
+        summary : dict
+            The start time, wall time, number of files, stage totals and the
+            stages of each file.
+        """
+        files = {}
+        for record in self.records:
+            if record['file'] is not None:
+                files.setdefault(record['file'], {})[record['stage']] = {'seconds': record['seconds'],
+                                                                         'peak_bytes': record['peak_bytes']}
+        return {'started': self.started.isoformat(),
+                'seconds': time.perf_counter() - self._start,
+                'files': len(files),
+                'stages': self.totals(),
+                'per_file': files}
+
+    def prometheus(self, summary=None):
+        """
+        Format the run totals in the Prometheus text exposition format.
+
+        Parameters
+        ----------
+        summary : dict, optional
+            Output of `summary`, calculated if not given.
+
+        Returns
+        -------
+        text : str
+            Metrics for the node exporter textfile collector.
+        """
+        summary = self.summary() if summary is None else summary
+        lines = ['# HELP sidpy_run_seconds Wall time of the last processing run.',
+                 '# TYPE sidpy_run_seconds gauge',
+                 'sidpy_run_seconds {:.6f}'.format(summary['seconds']),
+                 '# HELP sidpy_run_timestamp_seconds Start of the last processing run.',
+                 '# TYPE sidpy_run_timestamp_seconds gauge',
+                 'sidpy_run_timestamp_seconds {:.3f}'.format(
+                     (self.started - datetime(1970, 1, 1)).total_seconds()),
+                 '# HELP sidpy_files_processed Files processed by the last processing run.',
+                 '# TYPE sidpy_files_processed gauge',
+                 'sidpy_files_processed {}'.format(summary['files'])]
+        series = [('stage_seconds', 'seconds', 'Wall time spent in each stage by the last processing run.'),
+                  ('stage_max_seconds', 'max_seconds', 'Longest time spent in each stage by a single file.'),
+                  ('stage_calls', 'count', 'Number of times each stage ran in the last processing run.'),
+                  ('stage_peak_bytes', 'peak_bytes', 'Peak memory allocated within each stage.')]
+        for name, key, description in series:
+            values = [(stage_name, total[key]) for stage_name, total in sorted(summary['stages'].items())
+                      if total[key] is not None]
+            if not values:
+                continue
+            lines.append('# HELP sidpy_{} {}'.format(name, description))
+            lines.append('# TYPE sidpy_{} gauge'.format(name))
+            lines.extend('sidpy_{}{{stage="{}"}} {}'.format(name, stage_name, value) for stage_name, value in values)
+        return '\n'.join(lines) + '\n'
+
+    def write(self, directory=None, name='sidpy_metrics'):
+        """
+        Write the summary as ``{name}.json`` and ``{name}.prom``, each via a
+        temporary file so that a partially written file is never read.
+
+        Parameters
+        ----------
+        directory : str, optional
+            Directory the files are written to, that of the log by default.
+        name : str, optional
+            Name of the files, without the suffix.
+
+        Returns
+        -------
+        paths : list
+            Paths of the json and prom files.
+        """
+        directory = log_directory() if directory is None else Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        summary = self.summary()
+        paths = []
+        for suffix, text in (('.json', json.dumps(summary, indent=1)), ('.prom', self.prometheus(summary))):
+            path = directory / (name + suffix)
+            temp_path = path.with_name(path.name + '.tmp')
+            with open(temp_path, 'w') as fh:
+                fh.write(text)
+            os.replace(temp_path, path)
+            paths.append(path)
+        return paths
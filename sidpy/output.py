@@ -0,0 +1,160 @@
+"""
+Atomic publication of the files written to the archive. Each file is written
+under a temporary name within its directory and renamed into place once
+complete, so that readers, eg. a web server, never see a partially written
+png. The live pngs are published as hard links or reflinks of the dated pngs
+where the filesystem allows, rather than written a second time, and the
+directories created are remembered so that each is only created once per run.
+
+@author:
+    Oscar Sage David O'Hara
+@email:
+    oharao@tcd.ie
+"""
+
+import errno
+import logging
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+__all__ = ['make_dirs', 'clear_dir_cache', 'atomic_path', 'publish']
+
+# Linux ioctl cloning the extents of one file into another, on btrfs, XFS and others.
+FICLONE = 0x40049409
+
+# Directories created, or found to exist, by this process since the cache was last cleared.
+_created = set()
+# Method found to publish into each directory, so that failing links are not attempted for every file.
+_methods = {}
+
+
+def make_dirs(path):
+    """
+    Create a directory and its parents, unless already created by this
+    process since `clear_dir_cache` was last called.
+
+    Parameters
+    ----------
+    path : PosixPath
+        Directory path.
+
+    Returns
+    -------
+    path : PosixPath
+        The directory path.
+    """
+    path = Path(path)
+    if path not in _created:
+        path.mkdir(parents=True, exist_ok=True)
+        _created.add(path)
+    return path
+
+
+def clear_dir_cache():
+    """
+    Forget the directories created, eg. at the start of a run or once a
+    directory may have been removed.
+    """
+    _created.clear()
+    _methods.clear()
+
+
+def _temp_path(path):
+    # Hidden and named per thread, so that concurrent writers and directory listings ignore it.
+    return path.with_name('.{}.{}-{}.tmp'.format(path.name, os.getpid(), threading.get_ident()))
+
+
+@contextmanager
+def atomic_path(path):
+    """
+    Path to which a file is written before being renamed into place, the
+    directory is created if needed. The temporary file is removed if an
+    exception is raised.
+
+    Parameters
+    ----------
+    path : PosixPath
+        Final path of the file.
+
+    Yields
+    ------
+    temp_path : PosixPath
+        Temporary path, within the same directory.
+    """
+    path = Path(path)
+    make_dirs(path.parent)
+    temp_path = _temp_path(path)
+    try:
+        yield temp_path
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def _link(source, target):
+    os.link(source, target)
+
+
+def _reflink(source, target):
+    try:
+        import fcntl
+    except ImportError:
+        raise OSError(errno.EOPNOTSUPP, 'Reflinks are not supported on this platform')
+    with open(source, 'rb') as src, open(target, 'wb') as dst:
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+
+
+def _copy(source, target):
+    shutil.copyfile(source, target)
+
+
+_PUBLISHERS = {'link': _link, 'reflink': _reflink, 'copy': _copy}
+
+
+def publish(source, target):
+    """
+    Publish a file under a second path, as a hard link, a reflink or failing
+    both a copy, replacing any existing file atomically. As every file is
+    replaced rather than written in place, a linked file is not changed when
+    either path is later rewritten.
+
+    Parameters
+    ----------
+    source : PosixPath
+        Existing file.
+    target : PosixPath
+        Path under which the file is published.
+
+    Returns
+    -------
+    method : str
+        Either 'link', 'reflink' or 'copy'.
+    """
+    target = Path(target)
+    make_dirs(target.parent)
+    # Starting from the method which last worked for the directory.
+    methods = list(_PUBLISHERS)
+    methods = methods[methods.index(_methods.get(target.parent, 'link')):]
+    for method in methods:
+        temp_path = _temp_path(target)
+        try:
+            _PUBLISHERS[method](source, temp_path)
+            os.replace(temp_path, target)
+        except OSError as e:
+            try:
+                os.remove(temp_path)
+            except FileNotFoundError:
+                pass
+            if method == 'copy' or e.errno in (errno.ENOENT, errno.ENOSPC):
+                raise
+            logging.debug('%s : Could not %s, %s.', target, method, e)
+            continue
+        _methods[target.parent] = method
+        return method
@@ -0,0 +1,204 @@
+"""
+Query the archive for a site, station and instrument over a time range. The
+matching archived days are found directly from the {site}/{instrument}/YYYY/MM/DD
+layout, loaded lazily in parallel and returned as one contiguous series.
+
+@author:
+    Oscar Sage David O'Hara
+@email:
+    oharao@tcd.ie
+"""
+
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from sidpy.archiver import Archiver
+from sidpy.compression import is_csv
+from sidpy.daystore import read_day
+from sidpy.reader import read_file
+
+__all__ = ['ArchiveQuery', 'find_days', 'query']
+
+INSTRUMENTS = ('sid', 'super_sid')
+
+
+def _matches_station(path, station):
+    return station.upper() in path.name.split('.')[0].upper().split('_')
+
+
+def find_days(archive_path, site, station, start, end, instrument=None):
+    """
+    Find the archived files for a station between two dates, the binary day
+    store is preferred over the csv when both exist.
+
+    Parameters
+    ----------
+    archive_path : str
+        Archive root.
+    site : str
+        Site name.
+    station : str
+        Transmitter StationID, eg. NAA.
+    start : datetime
+        Start of the time range.
+    end : datetime
+        End of the time range.
+    instrument : str, optional
+        Either 'sid' or 'super_sid', both are searched when not given.
+
+    Returns
+    -------
+    paths : list
+        Archived file paths, in date order.
+
+    Raises
+    ------
+    ValueError
+        If no instrument is given and days of both instruments are found, as
+        their signal strengths are in different units.
+    """
+    instruments = INSTRUMENTS if instrument is None else (instrument,)
+    site_path = Archiver(archive_path).site_path(site)
+    found = {}
+    for name in instruments:
+        paths = []
+        for day in pd.date_range(pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize(), freq='D'):
+            day_path = site_path / name / day.strftime('%Y/%m/%d')
+            for file_type in ('npz', 'csv'):
+                if not (day_path / file_type).is_dir():
+                    continue
+                day_paths = sorted(path for path in (day_path / file_type).iterdir()
+                                   if _matches_station(path, station) and (file_type == 'npz' or is_csv(path)))
+                if day_paths:
+                    paths.extend(day_paths)
+                    break
+        if paths:
+            found[name] = paths
+    if len(found) > 1:
+        # SID signal strengths are in volts and SuperSID in dB, so the two are not joined.
+        raise ValueError('{} at {} was recorded by both {} between {} and {}, an instrument must be given.'.format(
+            station, site, ' and '.join(found), start, end))
+    return next(iter(found.values()), [])
+
+
+class ArchiveQuery:
+    """
+    Lazily loaded result of an archive query. Iterating yields one series per
+    archived day, loading at most ``workers`` days ahead of the caller, while
+    `to_series` joins all days into a single contiguous series.
+
+    Parameters
+    ----------
+    paths : list
+        Archived file paths, in date order.
+    start : datetime
+        Start of the time range.
+    end : datetime
+        End of the time range.
+    downsample : str, optional
+        Pandas offset alias, eg. '1min', each day is resampled to the mean over
+        this interval as it is loaded.
+    workers : int, optional
+        Number of days loaded in parallel.
+    """
+
+    def __init__(self, paths, start, end, downsample=None, workers=4):
+        self.paths = list(paths)
+        self.start, self.end = pd.Timestamp(start), pd.Timestamp(end)
+        self.downsample = downsample
+        self.workers = max(1, workers)
+
+    def __len__(self):
+        return len(self.paths)
+
+    def load(self, path):
+        """
+        Load a single archived day, trimmed to the query time range.
+
+        Parameters
+        ----------
+        path : PosixPath
+            Archived file path.
+
+        Returns
+        -------
+        series : pandas.Series
+            Signal strength indexed by datetime.
+        """
+        if path.suffix == '.npz':
+            header, data = read_day(path)
+        else:
+            header, data = read_file(path)
+        series = pd.Series(data['signal_strength'].values, index=pd.DatetimeIndex(data['datetime']),
+                           name=header.get('StationID'))
+        series = series[(series.index >= self.start) & (series.index <= self.end)]
+        if self.downsample is not None:
+            series = series.resample(self.downsample).mean()
+        logging.debug('%s loaded.', path.name)
+        return series
+
+    def __iter__(self):
+        paths = iter(self.paths)
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            pending = deque(executor.submit(self.load, path) for _, path in zip(range(self.workers), paths))
+            while pending:
+                series = pending.popleft().result()
+                for path in paths:
+                    pending.append(executor.submit(self.load, path))
+                    break
+                if len(series):
+                    yield series
+
+    def to_series(self):
+        """
+        Join all archived days into a single series.
+
+        Returns
+        -------
+        series : pandas.Series
+            Signal strength indexed by datetime.
+        """
+        days = list(self)
+        if not days:
+            return pd.Series([], index=pd.DatetimeIndex([]), dtype=float)
+        return pd.concat(days)
+
+
+def query(archive_path, site, station, start, end, instrument=None, downsample=None, workers=4):
+    """
+    Query the archive for a station received at a site over a time range, eg.
+    NAA at Dunsink from 2021-06-01 to 2021-08-31.
+
+    Parameters
+    ----------
+    archive_path : str
+        Archive root.
+    site : str
+        Site name.
+    station : str
+        Transmitter StationID, eg. NAA.
+    start : datetime
+        Start of the time range.
+    end : datetime
+        End of the time range.
+    instrument : str, optional
+        Either 'sid' or 'super_sid', both are searched when not given, in which
+        case days of only one of them may be found.
+    downsample : str, optional
+        Pandas offset alias, eg. '1min', each day is resampled to the mean over
+        this interval as it is loaded.
+    workers : int, optional
+        Number of days loaded in parallel.
+
+    Returns
+    -------
+    result : ArchiveQuery
+        Lazily loaded result, iterate for one series per day or call
+        ``to_series()`` for a single contiguous series.
+    """
+    paths = find_days(archive_path, site, station, start, end, instrument)
+    logging.debug('%d archived days found for %s at %s.', len(paths), station, site)
+    return ArchiveQuery(paths, start, end, downsample, workers)
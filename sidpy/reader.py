@@ -0,0 +1,215 @@
+"""
+Fast, single pass readers for SID and SuperSID csv files. The leading '#'
+header block is split from the numeric body while the file is being read, the
+body is parsed straight into typed arrays and the fixed-width timestamps are
+decoded in a vectorized manner.
+
+@author:
+    Oscar Sage David O'Hara
+@email:
+    oharao@tcd.ie
+"""
+
+import logging
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from sidpy.compression import open_csv
+from sidpy.conditioning import condition_signal
+from sidpy.metrics import stage
+
+__all__ = ['Header', 'read_header', 'read_file', 'parse_header_lines', 'parse_timestamps']
+
+# Offsets of the digits within a fixed-width 'YYYY-MM-DD HH:MM:SS[.ffffff]' timestamp.
+_SEPARATORS = {4: b'-', 7: b'-', 10: b' ', 13: b':', 16: b':'}
+
+
+def parse_header_lines(lines):
+    """
+    Process csv comment lines into file parameters, following the same rules
+    as `~sidpy.vlfclient.VLFClient.get_header`.
+
+    Parameters
+    ----------
+    lines : list
+        Comment lines, including the leading '#'.
+
+    Returns
+    -------
+    parameters : dict
+        Dictionary containing observation parameters, eg. transmitter freq.
+    """
+    parameters_dict = {}
+    for line in lines:
+        para = line[1:].replace(" ", "").rstrip('\r\n').split('=')
+        if len(para) == 2:
+            parameters_dict[para[0]] = para[1]
+    return parameters_dict
+
+
+class Header:
+    """
+    Typed view of the observation parameters held within a csv file header.
+
+    Parameters
+    ----------
+    parameters : dict
+        Dictionary containing observation parameters, as returned by
+        `parse_header_lines`.
+    """
+
+    def __init__(self, parameters):
+        self.parameters = parameters
+        self.site = parameters.get('Site')
+        self.country = parameters.get('Country')
+        self.station_id = parameters.get('StationID')
+        self.monitor_id = parameters.get('MonitorID', '')
+        self.frequency = parameters.get('Frequency')
+        self.latitude = self._to_float(parameters.get('Latitude'))
+        self.longitude = self._to_float(parameters.get('Longitude'))
+        self.sample_rate = self._to_float(parameters.get('SampleRate'))
+        try:
+            self.utc_start_time = datetime.strptime(parameters['UTC_StartTime'], '%Y-%m-%d%H:%M:%S')
+        except (KeyError, ValueError):
+            self.utc_start_time = None
+
+    @staticmethod
+    def _to_float(value):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
+
+    @property
+    def original_sid(self):
+        """
+        Statement on whether SID or Supersid data is being used, SID monitor
+        IDs contain a '-'.
+        """
+        return '-' in self.monitor_id
+
+    def __repr__(self):
+        return ('Header(site={!r}, station_id={!r}, utc_start_time={!r}, original_sid={!r})'
+                .format(self.site, self.station_id, self.utc_start_time, self.original_sid))
+
+
+def _read_header_block(fh):
+    """
+    Read the leading comment block of an open binary file, leaving the file
+    positioned at the start of the first data line. The next line is peeked at
+    rather than seeked back to, as decompressing streams may not seek.
+    """
+    lines = []
+    while fh.peek(1)[:1] == b'#':
+        lines.append(fh.readline().decode('utf-8', errors='replace'))
+    return lines
+
+
+def parse_timestamps(values):
+    """
+    Convert fixed-width 'YYYY-MM-DD HH:MM:SS[.ffffff]' strings into datetime64
+    values without parsing each string individually.
+
+    Parameters
+    ----------
+    values : array-like
+        Timestamp strings.
+
+    Returns
+    -------
+    timestamps : numpy.ndarray
+        Array of datetime64[ns] values.
+    """
+    raw = np.asarray(values, dtype='S')
+    if raw.size == 0:
+        return np.array([], dtype='datetime64[ns]')
+    width = raw.dtype.itemsize
+    chars = raw.view(np.uint8).reshape(raw.size, width)
+    if (width < 19 or any((chars[:, i] != ord(sep)).any() for i, sep in _SEPARATORS.items())
+            or (width > 19 and ((chars[:, 19] != ord('.')) & (chars[:, 19] != 0)).any())):
+        # Not the fixed-width layout, fall back to pandas' own parser.
+        return pd.to_datetime(pd.Series(values).astype(str)).values
+
+    digits = chars.astype(np.int64) - ord('0')
+
+    def field(start, stop):
+        out = np.zeros(raw.size, dtype=np.int64)
+        for i in range(start, stop):
+            out = out * 10 + digits[:, i]
+        return out
+
+    months = (field(0, 4) - 1970) * 12 + field(5, 7) - 1
+    days = months.astype('datetime64[M]').astype('datetime64[D]').astype(np.int64) + field(8, 10) - 1
+    seconds = ((days * 24 + field(11, 13)) * 60 + field(14, 16)) * 60 + field(17, 19)
+    nanoseconds = seconds * 1000000000
+    if width > 20:
+        # Fractional seconds of varying length are zero padded to the right.
+        fraction = np.where(chars[:, 20:29] == 0, 0, digits[:, 20:29])
+        scale = 10 ** np.arange(8, 8 - fraction.shape[1], -1, dtype=np.int64)
+        nanoseconds += fraction @ scale
+    return nanoseconds.astype('datetime64[ns]')
+
+
+def read_header(filename):
+    """
+    Read only the leading '#' header block of a csv file, stopping at the
+    first data line.
+
+    Parameters
+    ----------
+    filename : str
+        Path to csv file, which may be gzip or zstd compressed.
+
+    Returns
+    -------
+    header : Header
+        Typed observation parameters.
+    """
+    with open_csv(filename) as fh:
+        header = Header(parse_header_lines(_read_header_block(fh)))
+    logging.debug('File %s header read.', filename)
+    return header
+
+
+def read_file(filename, original_sid=None):
+    """
+    Read a SID or SuperSID csv file in a single pass, returning both the
+    header parameters and the processed data.
+
+    Parameters
+    ----------
+    filename : str
+        Path to csv file, which may be gzip or zstd compressed.
+    original_sid : bool, optional
+        Statement on whether SID or Supersid data is being used, determined
+        from the MonitorID within the header when not given.
+
+    Returns
+    -------
+    header : dict
+        Dictionary containing observation parameters, eg. transmitter freq.
+    data : pandas.DataFrame
+        Dataframe containing the datetime and float signal strength, matching
+        the output of `~sidpy.vlfclient.VLFClient.get_data`.
+    """
+    with stage('parse'), open_csv(filename) as fh:
+        header = parse_header_lines(_read_header_block(fh))
+        body = pd.read_csv(fh,
+                           header=None,
+                           names=['datetime', 'signal_strength'],
+                           skipinitialspace=True,
+                           dtype={'datetime': object, 'signal_strength': np.float64},
+                           comment='#')
+        times = parse_timestamps(body['datetime'].values)
+    if original_sid is None:
+        original_sid = '-' in header.get('MonitorID', '')
+
+    signal = body['signal_strength'].values
+    if not original_sid:
+        with stage('filter'):
+            condition_signal(signal, out=signal)
+    data = pd.DataFrame({'datetime': times, 'signal_strength': signal}, copy=False)
+    logging.debug('File %s read.', filename)
+    return header, data
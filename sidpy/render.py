@@ -0,0 +1,328 @@
+"""
+Rendering engine for the SID and SuperSID quick-look pngs. Rather than building
+every plot from scratch through pyplot, a figure template is built once per
+layout on an Agg canvas, holding all static artists; the grid lines, GOES class
+bands, twin axis, tick locators and formatters. For each file only the data
+lines, sunrise/sunset markers, labels and x limits are swapped in before the
+figure is saved.
+
+@author:
+    Oscar Sage David O'Hara
+@email:
+    oharao@tcd.ie
+"""
+
+import logging
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from matplotlib import dates
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from sidpy.config.config import transmitters
+from sidpy.decimate import decimate_series
+from sidpy.geographic_midpoint.geographic_midpoint import Geographic_Midpoint
+from sidpy.metrics import stage
+from sidpy.output import atomic_path
+
+__all__ = ['PLOT_WIDTH', 'PlotTemplate', 'add_goes_panel', 'get_template', 'render_plot', 'plot_title',
+           'png_parent']
+
+# Width of the generated pngs in pixels.
+PLOT_WIDTH = 1000
+
+GRID_HOURS = [2, 4, 6, 8, 10, 12, 14, 16, 18, 20, 22]
+
+_templates = {}
+
+
+def plot_title(header, original_sid):
+    """
+    Title of the plot for the given observation parameters.
+
+    Parameters
+    ----------
+    header : dict
+        Dictionary containing observation parameters, eg. transmitter freq.
+    original_sid : bool
+        Statement on whether SID or Supersid data is being used.
+
+    Returns
+    -------
+    title : str
+        Plot title.
+    """
+    if original_sid == True:
+        return ('SID (' + header['Site'] + ') - ' + header['StationID'] + ' (' +
+                transmitters[str(header['StationID'])][2] + ', ' + header['Frequency'][0:-3] +
+                '.' + header['Frequency'][2] + 'kHz' + ')')
+    return ('SuperSID (' + header['Site'] + ', ' + header['Country'] + ') - ' +
+            header['StationID'] + ' (' + transmitters[str(header['StationID'])][2] +
+            ', ' + header['Frequency'][0:-3] + ' kHz' + ')')
+
+
+def png_parent(header, archive_path, original_sid):
+    """
+    Archive directory of the png for the given observation parameters.
+
+    Parameters
+    ----------
+    header : dict
+        Dictionary containing observation parameters, eg. transmitter freq.
+    archive_path : str
+        Path to archive.
+    original_sid : bool
+        Statement on whether SID or Supersid data is being used.
+
+    Returns
+    -------
+    parent : PosixPath
+        {site}/{instrument}/YYYY/MM/DD/png path.
+    """
+    date_time_obj = datetime.strptime(header['UTC_StartTime'], '%Y-%m-%d%H:%M:%S')
+    instrument = 'sid' if original_sid == True else 'super_sid'
+    return (Path(archive_path) / header['Site'].lower() / instrument /
+            date_time_obj.strftime('%Y') / date_time_obj.strftime('%m') /
+            date_time_obj.strftime('%d') / 'png')
+
+
+def add_goes_panel(axes):
+    """
+    Set up axes for the GOES XRS long and short channels, including the GOES
+    class interval bands on a twin axis.
+
+    Parameters
+    ----------
+    axes : matplotlib.axes.Axes
+        Axes of the GOES XRS panel.
+
+    Returns
+    -------
+    lines : tuple
+        The empty GOES long and short channel lines.
+    """
+    goes_long, = axes.plot([], [], color='r', label=r'GOES 1.0-8.0 $\AA$')
+    goes_short, = axes.plot([], [], color='b', label=r'GOES 0.5-4.0 $\AA$')
+    axes.set(yscale='log', ylim=[10 ** -9, 10 ** -2])
+    axes.set_yticks([10 ** -8, 10 ** -7, 10 ** -6, 10 ** -5, 10 ** -4, 10 ** -3])
+    axes.legend(frameon=True, loc='upper center', ncol=2)
+    # Create GOES Class interval bands.
+    ax2 = axes.twinx()
+    ax2.set(yscale='log', ylim=[10 ** -9, 10 ** -2])
+    ax2.set_yticks([3 * 10 ** -8, 3 * 10 ** -7, 3 * 10 ** -6, 3 * 10 ** -5, 3 * 10 ** -4])
+    for band in [1 * 10 ** -8, 1 * 10 ** -7, 1 * 10 ** -6, 1 * 10 ** -5, 1 * 10 ** -4, 1 * 10 ** -3]:
+        ax2.axhline(band, color="grey", ls="dashed", lw=1)
+    ax2.set_yticklabels(['A', 'B', 'C', 'M', 'X'], fontsize=12)
+    ax2.tick_params(axis=u'both', which=u'both', length=0)
+    axes.set_ylabel("Flux (Wm$^{-2}$)")
+    return goes_long, goes_short
+
+
+class PlotTemplate:
+    """
+    Reusable figure for a single plot layout, drawn directly on an Agg canvas.
+
+    Parameters
+    ----------
+    xrs : bool
+        Include the GOES XRS panel beneath the VLF data.
+    """
+
+    def __init__(self, xrs):
+        self.xrs = xrs
+        self.figure = Figure(figsize=(9, 6) if xrs else (9, 3))
+        FigureCanvasAgg(self.figure)
+        axes = self.figure.subplots(2 if xrs else 1, sharex=xrs)
+        self.axes = list(axes) if xrs else [axes]
+        self.vlf_axes = self.axes[0]
+        # Artists are created in the same order as VLFClient.create_plot so
+        # that they are drawn in the same order.
+        self.sunrise = self.vlf_axes.axvline(0, alpha=0.5, ls="dashed", color='orange', label='Local Sunrise')
+        self.sunset = self.vlf_axes.axvline(0, alpha=0.5, ls="dashed", color='red', label='Local Sunset')
+        self.data_line, = self.vlf_axes.plot([], [], color='k')
+        self.vlf_axes.xaxis.set_major_locator(dates.HourLocator(interval=2))
+        self.vlf_axes.xaxis.set_major_formatter(dates.DateFormatter("%H:%M"))
+        if xrs:
+            self._build_xrs()
+        else:
+            self.grid = [self.vlf_axes.axvline(0, color="grey", ls="dashed", lw=0.5) for _ in GRID_HOURS]
+            self.vlf_axes.tick_params(which="both", direction="in")
+            self.generated = self.vlf_axes.text(0.875, 0.03, '', horizontalalignment='center',
+                                                verticalalignment='center', transform=self.vlf_axes.transAxes,
+                                                fontsize=8)
+        self.figure.subplots_adjust(hspace=0.01)
+        dpi = self.figure.get_dpi()
+        self.figure.set_size_inches(PLOT_WIDTH / float(dpi), (500 if xrs else 400) / float(dpi))
+        self._initial_layout = self._subplot_params()
+        self._layouts = {}
+
+    def _subplot_params(self):
+        params = self.figure.subplotpars
+        return {name: getattr(params, name) for name in ('left', 'right', 'bottom', 'top', 'wspace', 'hspace')}
+
+    def _build_xrs(self):
+        goes_axes = self.axes[1]
+        self.generated = goes_axes.text(0.875, 0.03, '', horizontalalignment='center',
+                                        verticalalignment='center', transform=goes_axes.transAxes, fontsize=8)
+        self.goes_long, self.goes_short = add_goes_panel(goes_axes)
+        self.grid = []
+        for a in self.axes:
+            self.grid.extend(a.axvline(0, color="grey", ls="dashed", lw=0.5) for _ in GRID_HOURS)
+            a.tick_params(which="both", direction="in")
+        goes_axes.xaxis.set_major_locator(dates.HourLocator(interval=2))
+        goes_axes.xaxis.set_major_formatter(dates.DateFormatter("%H:%M"))
+
+    @staticmethod
+    def _to_num(index):
+        return dates.date2num(np.asarray(index, dtype='datetime64[ns]'))
+
+    def _layout_key(self):
+        """
+        Text which determines the tight layout of the figure, the layout is only
+        recalculated when one of these changes.
+        """
+        key = [self.vlf_axes.get_ylabel(), self.vlf_axes.get_title(), self.axes[-1].get_xlabel()]
+        axis = self.vlf_axes.yaxis
+        locs = [loc for loc in axis.get_major_locator()() if min(axis.get_view_interval()) <= loc
+                <= max(axis.get_view_interval())]
+        key.extend(axis.get_major_formatter().format_ticks(locs))
+        return tuple(key)
+
+    def render(self, header, data, image_path, original_sid=False, gl=None, gs=None, decimate=True):
+        """
+        Swap the given data into the template and save the figure.
+
+        Parameters
+        ----------
+        header : dict
+            Dictionary containing observation parameters, eg. transmitter freq.
+        data : object
+            Pandas dataframe containing csv data.
+        image_path : PosixPath
+            Path of the png.
+        original_sid : bool
+            Statement on whether SID or Supersid data is being used.
+        gl : pandas.Series, optional
+            GOES XRS Long data, required by the xrs template.
+        gs : pandas.Series, optional
+            GOES XRS Short data, required by the xrs template.
+        decimate : bool
+            Reduce the data to the minimum and maximum within each pixel column
+            before plotting.
+
+        Returns
+        -------
+        image_path : PosixPath
+            Path of the png.
+        """
+        date_time_obj = datetime.strptime(header['UTC_StartTime'], '%Y-%m-%d%H:%M:%S')
+        # Get local sunrise and sunset markers.
+        try:
+            with stage('sunrise'):
+                sunrise, sunset = Geographic_Midpoint.sunrise_sunset_cached(date_time_obj.date(),
+                                                                            header['Latitude'], header['Longitude'])
+            for line, time in ((self.sunrise, sunrise), (self.sunset, sunset)):
+                line.set_xdata([dates.date2num(time)] * 2)
+                line.set_visible(True)
+        except ValueError:
+            logging.warning("Sun is always above the horizon on this day, at this location.")
+            self.sunrise.set_visible(False)
+            self.sunset.set_visible(False)
+        with stage('draw'):
+            self._update(header, data, date_time_obj, original_sid, gl, gs, decimate)
+        with stage('savefig'), atomic_path(image_path) as temp_path:
+            self.figure.savefig(fname=temp_path, format='png')
+        logging.debug('%s generated', image_path.name)
+        return image_path
+
+    def _update(self, header, data, date_time_obj, original_sid, gl, gs, decimate):
+        # Swap the data and text into the artists, then lay out the figure.
+        sid = pd.Series(data['signal_strength'].values, index=pd.to_datetime(data['datetime']))
+        if self.xrs and date_time_obj.date() == datetime.utcnow().date():
+            sid = sid.truncate(after=datetime.utcnow().replace(minute=0, second=0) - timedelta(seconds=20))
+        if decimate:
+            sid = decimate_series(sid, PLOT_WIDTH, (date_time_obj, date_time_obj + timedelta(days=1)))
+        self.data_line.set_data(self._to_num(sid.index), sid.values)
+        if self.xrs:
+            self.goes_long.set_data(self._to_num(gl.index), gl.values)
+            self.goes_short.set_data(self._to_num(gs.index), gs.values)
+        midnight = date_time_obj.replace(minute=0, second=0, microsecond=0)
+        for i, line in enumerate(self.grid):
+            line.set_xdata([dates.date2num(midnight + timedelta(hours=GRID_HOURS[i % len(GRID_HOURS)]))] * 2)
+        self.vlf_axes.relim(visible_only=True)
+        self.vlf_axes.autoscale_view(scalex=False)
+        for a in self.axes:
+            a.set_xlim(dates.date2num(date_time_obj),
+                       dates.date2num(date_time_obj + timedelta(hours=23, minutes=59, seconds=59)))
+        self.generated.set_text('Generated : ' + datetime.utcnow().strftime('%d-%b-%y %H:%M') + ' UTC')
+        # Create axis and plot labels.
+        self.axes[-1].set_xlabel("Time: {:s} (UTC)".format(date_time_obj.strftime("%Y-%m-%d")))
+        self.vlf_axes.set_ylabel("Volts (V)" if original_sid == True else "Signal Strength (dB)")
+        self.vlf_axes.set_title(plot_title(header, original_sid))
+        # The tight layout is only recalculated for text not seen before.
+        key = self._layout_key()
+        if key in self._layouts:
+            self.figure.subplots_adjust(**self._layouts[key])
+        else:
+            # Start from the layout of a new figure, as the tight layout depends on it.
+            self.figure.subplots_adjust(**self._initial_layout)
+            self.figure.tight_layout()
+            self._layouts[key] = self._subplot_params()
+
+
+def get_template(xrs):
+    """
+    Get the template for a layout, built on first use and reused thereafter
+    within the process.
+
+    Parameters
+    ----------
+    xrs : bool
+        Include the GOES XRS panel beneath the VLF data.
+
+    Returns
+    -------
+    template : PlotTemplate
+        Figure template.
+    """
+    if xrs not in _templates:
+        _templates[xrs] = PlotTemplate(xrs)
+    return _templates[xrs]
+
+
+def render_plot(header, data, file_path, archive_path, original_sid=False, gl=None, gs=None, decimate=True):
+    """
+    Generate the png for the given parameters and data, including the GOES XRS
+    panel if gl and gs are given.
+
+    Parameters
+    ----------
+    header : dict
+        Dictionary containing observation parameters, eg. transmitter freq.
+    data : object
+        Pandas dataframe containing csv data.
+    file_path : PosixPath
+        Path to csv file.
+    archive_path : str
+        Path to archive.
+    original_sid : bool
+        Statement on whether SID or Supersid data is being used.
+    gl : pandas.Series, optional
+        GOES XRS Long data.
+    gs : pandas.Series, optional
+        GOES XRS Short data.
+    decimate : bool
+        Reduce the data to the minimum and maximum within each pixel column
+        before plotting.
+
+    Returns
+    -------
+    image_path : PosixPath
+        Path to image location.
+    """
+    xrs = gl is not None and gs is not None
+    image_path = (png_parent(header, archive_path, original_sid) / Path(file_path).name).with_suffix('.png')
+    return get_template(xrs).render(header, data, image_path, original_sid, gl, gs, decimate)
@@ -0,0 +1,411 @@
+"""
+Reprocess day files already within the archive, eg. once the filtering or
+plot style has changed. The archived csv files of the chosen sites, stations
+and dates are read in place, nothing is moved, and their day stores, pngs and
+catalog rows are rewritten. Progress is checkpointed so that an interrupted job
+resumes where it stopped, and the throughput is logged as it goes.
+
+@author:
+    Oscar Sage David O'Hara
+@email:
+    oharao@tcd.ie
+"""
+
+import json
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from sidpy.archiver import Archiver
+from sidpy.catalog import INSTRUMENTS, Catalog, data_entry
+from sidpy.compression import is_csv
+from sidpy.logger import ensure_logger, log_level, worker_queue
+from sidpy.metrics import NULL_METRICS, Metrics
+from sidpy.output import clear_dir_cache
+from sidpy.run import _init_worker, _run_isolated, _worker_goes, write_products
+
+__all__ = ['archived_files', 'reprocess_file', 'Checkpoint', 'reprocess']
+
+logger = logging.getLogger()
+
+
+def archived_files(archive_path, site=None, station=None, instrument=None, start=None, end=None):
+    """
+    List the archived csv files matching the given criteria, from the catalog
+    once it has been rebuilt and so holds every archived file, otherwise from
+    the archive directories.
+
+    Parameters
+    ----------
+    archive_path : str
+        Archive root.
+    site : str, optional
+        Site name.
+    station : str, optional
+        Transmitter StationID, eg. NAA.
+    instrument : str, optional
+        Either 'sid' or 'super_sid'.
+    start : str, optional
+        First date, yyyy-mm-dd.
+    end : str, optional
+        Last date, yyyy-mm-dd.
+
+    Returns
+    -------
+    csv_paths : list
+        Paths of the archived csv files, in date order.
+    """
+    archive_path = Path(archive_path)
+    if (archive_path / 'catalog.sqlite').exists():
+        with Catalog(archive_path) as catalog:
+            # Files archived before the catalog was created are missing from it until rebuilt.
+            if catalog.rebuilt is not None:
+                return [archive_path / row['csv_path'] for row in catalog.files(site, station, instrument, start,
+                                                                                 end)]
+
+    logger.info('%s : Catalog has not been rebuilt, listing the archive directories.', archive_path)
+    csv_paths = []
+    for name in [instrument] if instrument is not None else INSTRUMENTS:
+        pattern = '{}/{}/*/*/*/csv/*.csv*'.format(Archiver(archive_path).site_path(site).name
+                                                  if site is not None else '*', name)
+        for path in filter(is_csv, archive_path.glob(pattern)):
+            # {site}/{instrument}/YYYY/MM/DD/csv/{name}.csv
+            date = '-'.join(path.relative_to(archive_path).parts[2:5])
+            if start is not None and date < str(start)[:10] or end is not None and date > str(end)[:10]:
+                continue
+            if station is not None and '_{}_'.format(station) not in path.name:
+                continue
+            csv_paths.append((date, path))
+    return [path for _, path in sorted(csv_paths)]
+
+
+def reprocess_file(csv_path, archive_path, goes_store=None, metrics=None):
+    """
+    Rewrite the day store and png of an archived csv in place.
+
+    Parameters
+    ----------
+    csv_path : PosixPath
+        {site}/{instrument}/YYYY/MM/DD/csv/ path of the archived csv.
+    archive_path : str
+        Archive root.
+    goes_store : sidpy.goes.GOESStore, optional
+        Historical GOES XRS data.
+    metrics : sidpy.metrics.Metrics, optional
+        Records the wall time and peak memory of each stage.
+
+    Returns
+    -------
+    image_path : PosixPath
+        Path of the dated png, None if the header does not describe a known
+        transmitter.
+    entry : dict
+        Catalog row of the file, None if not reprocessed.
+    """
+    from sidpy.reader import read_file, read_header
+
+    metrics = NULL_METRICS if metrics is None else metrics
+    csv_path = Path(csv_path)
+    with metrics.file(csv_path):
+        with metrics.stage('header'):
+            file_header = read_header(csv_path)
+        if file_header.station_id is None or file_header.utc_start_time is None:
+            logger.warning('%s : Header does not describe a known transmitter.', csv_path)
+            return None, None
+        header, data = read_file(csv_path, file_header.original_sid)
+        image_path, day_store = write_products(csv_path, archive_path, header, data, file_header.original_sid,
+                                               goes_store=goes_store, metrics=metrics)
+        return image_path, data_entry(archive_path, header, file_header.original_sid, data, csv_path, image_path,
+                                      [day_store])
+
+
+def _reprocess_safely(csv_path, archive_path, goes_store=None, metrics=None):
+    try:
+        return reprocess_file(csv_path, archive_path, goes_store, metrics) + (None,)
+    except Exception as e:
+        logger.exception('%s : The following exception was raised:', csv_path)
+        clear_dir_cache()
+        return None, None, '{}: {}'.format(type(e).__name__, e)
+
+
+def _reprocess_worker(csv_path, archive_path, record_metrics=False, trace_memory=False):
+    metrics = Metrics(trace_memory) if record_metrics else NULL_METRICS
+    image, entry, error = _reprocess_safely(csv_path, archive_path, _worker_goes.get('store'), metrics)
+    return image, entry, error, list(metrics.records)
+
+
+def _reprocess_isolated(csv_path, archive_path, goes_store=None, record_metrics=False, trace_memory=False):
+    """
+    Reprocess a file in a worker process of its own, once the worker of a pool
+    has died while the file was pending, so that a file crashing its worker
+    only fails itself.
+    """
+    try:
+        return _run_isolated(goes_store, _reprocess_worker, csv_path, archive_path, record_metrics, trace_memory)
+    except BrokenProcessPool as e:
+        logger.error('%s : The worker process died while reprocessing the file.', csv_path)
+        return None, None, '{}: {}'.format(type(e).__name__, e), []
+
+
+class Checkpoint:
+    """
+    Record of the files reprocessed by a job, appended to as each batch of
+    files completes so that an interrupted job resumes where it stopped.
+
+    The first line holds the parameters of the job and each following line the
+    csv, png and error of a reprocessed file, relative to the archive root. A
+    checkpoint left by a job with other parameters is discarded.
+
+    Parameters
+    ----------
+    root : str
+        Archive root.
+    job : dict
+        Parameters of the job.
+    restart : bool, optional
+        Discard any existing checkpoint.
+    filename : str, optional
+        Name of the checkpoint file within root.
+    """
+
+    def __init__(self, root, job, restart=False, filename='reprocess.checkpoint'):
+        self.root = Path(root)
+        self.path = self.root / filename
+        self.job = job
+        self.done = {}
+        if not restart and self.path.exists():
+            self._load()
+        # Rewritten without any partial line left by an interrupted job, then appended to.
+        with open(self.path, 'w') as file:
+            file.write(''.join(json.dumps(entry) + '\n' for entry in [{'job': job}, *self.done.values()]))
+        self.file = open(self.path, 'a')
+
+    def _load(self):
+        with open(self.path) as file:
+            lines = file.read().splitlines()
+        try:
+            if not lines or json.loads(lines[0]).get('job') != self.job:
+                logger.warning('%s : Checkpoint of another job, starting again.', self.path)
+                return
+        except ValueError:
+            logger.warning('%s : Checkpoint could not be read, starting again.', self.path)
+            return
+        for line in lines[1:]:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # The last line is partial if the job was stopped while it was written.
+                continue
+            self.done[entry['csv']] = entry
+        logger.info('%s : Resuming, %d files already reprocessed.', self.path, len(self.done))
+
+    def _relative(self, path):
+        return None if path is None else Path(path).relative_to(self.root).as_posix()
+
+    def is_done(self, csv_path):
+        return self._relative(csv_path) in self.done
+
+    def outcome(self, csv_path):
+        """
+        Path of the png and error of a file reprocessed by an earlier run of the job.
+        """
+        entry = self.done[self._relative(csv_path)]
+        return None if entry['png'] is None else self.root / entry['png'], entry['error']
+
+    def extend(self, results):
+        """
+        Record reprocessed files.
+
+        Parameters
+        ----------
+        results : list
+            (csv path, image path, error) tuples.
+        """
+        lines = []
+        for csv_path, image, error in results:
+            entry = {'csv': self._relative(csv_path), 'png': self._relative(image), 'error': error}
+            self.done[entry['csv']] = entry
+            lines.append(json.dumps(entry) + '\n')
+        self.file.write(''.join(lines))
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+    def remove(self):
+        """
+        Remove the checkpoint once the job has completed.
+        """
+        self.close()
+        self.path.unlink()
+
+
+class _Progress:
+    """
+    Log the files reprocessed, files and MB per second and the time remaining
+    at most once every interval.
+    """
+
+    def __init__(self, total, total_bytes, interval):
+        self.total, self.total_bytes, self.interval = total, total_bytes, interval
+        self.done = self.bytes = 0
+        self.start = self.last = time.perf_counter()
+
+    def update(self, size, force=False):
+        self.done += 1
+        self.bytes += size
+        now = time.perf_counter()
+        if force or now - self.last >= self.interval:
+            self.last = now
+            logger.info(self.report())
+
+    def report(self):
+        elapsed = max(time.perf_counter() - self.start, 1e-9)
+        rate = self.done / elapsed
+        remaining = (self.total - self.done) / rate if rate else float('nan')
+        return '{}/{} files reprocessed, {:.2f} files/s, {:.2f} MB/s, {:.0f} s remaining.'.format(
+            self.done, self.total, rate, self.bytes / elapsed / 1e6, remaining)
+
+
+def reprocess(archive_path, site=None, station=None, instrument=None, start=None, end=None, workers=None,
+              restart=False, summary=True, metrics=False, report_interval=30, batch_size=64, trace_memory=False):
+    """
+    Reprocess the archived files of the given sites, stations and dates in
+    place, rewriting their day stores, pngs and catalog rows. The live pngs are
+    not changed.
+
+    Parameters
+    ----------
+    archive_path : str
+        Archive root.
+    site, station, instrument, start, end : str, optional
+        Files reprocessed, see `archived_files`. All files by default.
+    workers : int, optional
+        Number of worker processes, by default the number of processors. If
+        1, files are reprocessed sequentially.
+    restart : bool, optional
+        Reprocess all files, discarding the checkpoint of an interrupted job.
+    summary : bool, optional
+        Render the summary of each site and day reprocessed once done.
+    metrics : bool, optional
+        Record the wall time of each stage of each file, written to
+        sidpy_metrics.json and sidpy_metrics.prom alongside the log.
+    report_interval : float, optional
+        Seconds between reports of the throughput.
+    batch_size : int, optional
+        Number of files recorded to the catalog and checkpoint at a time.
+    trace_memory : bool, optional
+        Also record the peak memory of each stage when recording metrics,
+        using tracemalloc which slows the processing several times over.
+
+    Returns
+    -------
+    results : list
+        A (csv path, image path, error) tuple for each file, in date order,
+        including those reprocessed by an earlier run of the job.
+    """
+    ensure_logger()
+    from sidpy.goes import GOESStore
+    from sidpy.summary import render_summaries
+
+    archive_path = Path(archive_path)
+    clear_dir_cache()
+    csv_paths = archived_files(archive_path, site, station, instrument, start, end)
+    job = {'site': site, 'station': station, 'instrument': instrument, 'start': start, 'end': end}
+    checkpoint = Checkpoint(archive_path, job, restart)
+    pending = [path for path in csv_paths if not checkpoint.is_done(path)]
+    sizes = {path: path.stat().st_size for path in pending}
+    logger.info('Reprocessing %d of %d archived files.', len(pending), len(csv_paths))
+
+    run_metrics = Metrics(trace_memory) if metrics else NULL_METRICS
+    goes_store = GOESStore(archive_path / 'goes' / 'xrs')
+    progress = _Progress(len(pending), sum(sizes.values()), report_interval)
+    outcomes, batch, entries = {}, [], []
+    catalog = Catalog(archive_path)
+
+    def complete(csv_path, image, entry, error):
+        outcomes[csv_path] = (image, error)
+        batch.append((csv_path, image, error))
+        if entry is not None:
+            entries.append(entry)
+        if len(batch) >= batch_size:
+            flush()
+        progress.update(sizes[csv_path])
+
+    def flush():
+        # Catalogued before checkpointed, so that a resumed job catalogues every file.
+        catalog.update(entries)
+        checkpoint.extend(batch)
+        del batch[:], entries[:]
+
+    try:
+        if workers == 1:
+            for csv_path in pending:
+                complete(csv_path, *_reprocess_safely(csv_path, archive_path, goes_store, run_metrics))
+        else:
+            # A bounded number of files are submitted at a time, rather than the whole archive at once.
+            queued, broken = deque(pending), []
+            window = 4 * (workers or os.cpu_count() or 1)
+            while queued:
+                executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                               initargs=(None, None, goes_store, worker_queue(), log_level()))
+                with executor:
+                    running = {}
+                    while running or (queued and not broken):
+                        while queued and not broken and len(running) < window:
+                            csv_path = queued.popleft()
+                            try:
+                                running[executor.submit(_reprocess_worker, csv_path, archive_path, metrics,
+                                                        trace_memory)] = csv_path
+                            except BrokenProcessPool:
+                                broken.append(csv_path)
+                        if not running:
+                            break
+                        finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                        for future in finished:
+                            csv_path = running.pop(future)
+                            try:
+                                image, entry, error, records = future.result()
+                            except BrokenProcessPool:
+                                # A worker died, failing every file left pending within the pool.
+                                broken.append(csv_path)
+                                continue
+                            run_metrics.extend(records)
+                            complete(csv_path, image, entry, error)
+                if broken:
+                    logger.warning('A worker process died, %d files are reprocessed again one at a time.',
+                                   len(broken))
+                # Checkpointed even when failing again, so that a resumed job does not stop on the same file.
+                for csv_path in broken:
+                    image, entry, error, records = _reprocess_isolated(csv_path, archive_path, goes_store, metrics,
+                                                                       trace_memory)
+                    run_metrics.extend(records)
+                    complete(csv_path, image, entry, error)
+                del broken[:]
+        flush()
+    finally:
+        catalog.close()
+        checkpoint.close()
+    if pending:
+        logger.info(progress.report())
+
+    results = []
+    for csv_path in csv_paths:
+        image, error = outcomes[csv_path] if csv_path in outcomes else checkpoint.outcome(csv_path)
+        if image is None:
+            logger.warning('%s : Could not be reprocessed.', csv_path)
+        results.append((csv_path, image, error))
+    if summary:
+        with run_metrics.stage('summary'):
+            render_summaries(results, archive_path, goes_store, live=False)
+        logger.debug('Site summaries rendered.')
+    if run_metrics.enabled:
+        logger.info('Metrics written to %s.', ', '.join(str(path) for path in run_metrics.write()))
+    checkpoint.remove()
+    logger.info('Reprocessing completed.')
+    return results
@@ -9,19 +9,33 @@ their specified locations.
     oharao@tcd.ie
 """
 
-import shutil
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime, timedelta
 from pathlib import Path
 
 from sidpy.config.config import transmitters
 from sidpy.archiver import Archiver
-from sidpy.logger import init_logger
-from sidpy.vlfclient import VLFClient
+from sidpy.catalog import Catalog, data_entry
+from sidpy.compression import plain_path
+from sidpy.lease import holds_lease
+from sidpy.logger import ensure_logger, init_worker_logger, log_level, worker_queue
+from sidpy.manifest import Manifest
+from sidpy.metrics import NULL_METRICS, Metrics
+from sidpy.output import clear_dir_cache, make_dirs, publish
 
-logger = init_logger()
+# pandas, scipy & matplotlib are imported by the reading, rendering and GOES
+# modules, which are imported once needed so that importing run is fast.
 
+logger = logging.getLogger()
 
-def process_file(file_path, archive_path, gl=None, gs=None):
+# GOES XRS data held by each worker process when processing in parallel.
+_worker_goes = {}
+
+
+def process_file(file_path, archive_path, gl=None, gs=None, manifest=None, goes_store=None, metrics=None,
+                 catalog=None, compression=None):
     """
     Process single given csv file meeting the appropriate criteria, before
     saving the corresponding png and input csv to the appropriate archive
@@ -35,79 +49,402 @@ def process_file(file_path, archive_path, gl=None, gs=None):
         GOES XRS Long data.
     gs : pandas.Series
         GOES XRS Short data.
+    manifest : sidpy.manifest.Manifest, optional
+        Record of processed files, unchanged files found within the manifest are
+        skipped and newly processed files are recorded.
+    goes_store : sidpy.goes.GOESStore, optional
+        Historical GOES XRS data, used in place of gl & gs so that files of
+        any age are plotted with GOES XRS data where it is held.
+    metrics : sidpy.metrics.Metrics, optional
+        Records the wall time and peak memory of each stage of processing.
+    catalog : sidpy.catalog.Catalog, optional
+        Catalog of the archive, to which the archived file is added.
+    compression : str, optional
+        Compress the archived csv, either 'gzip' or 'zstd'.
 
     Returns
     -------
     image_path : str
         Temporary path of generated png.
     """
+    metrics = NULL_METRICS if metrics is None else metrics
+    ensure_logger()
     if (str(file_path).endswith('.csv') and any(i in str(file_path) for i in transmitters)
                 and not str(file_path).__contains__("current")
                     and not str(file_path).__contains__(" ")):
-        vlfclient, archiver = VLFClient(), Archiver(archive_path)
-        logger.debug('The vlfclient and archiver have been initialised.')
+        key = manifest.match(file_path) if manifest is not None else None
+        if key is not None:
+            return _skip_processed(file_path, manifest.entries[key])
 
-        dataframe = vlfclient.read_csv(file_path)
-        header = vlfclient.get_header(dataframe)
+        from sidpy.reader import read_file, read_header
 
-        archiver.static_summary_path(header['Site'])
+        with metrics.file(file_path):
+            archiver = Archiver(archive_path, compression)
+            logger.debug('The archiver has been initialised.')
 
-        # Determine VLF receiver which is recording data.
-        original_sid = False
-        if '-' in header['MonitorID']:
-            original_sid = True
+            # Determine VLF receiver which is recording data from the header alone.
+            with metrics.stage('header'):
+                file_header = read_header(file_path)
+            if file_header.station_id not in transmitters or file_header.utc_start_time is None:
+                logger.warning('%s : Header does not describe a known transmitter.', file_path)
+                return None
+            original_sid = file_header.original_sid
 
-        data = vlfclient.get_data(dataframe, original_sid)
+            header, data = read_file(file_path, original_sid)
 
-        if (datetime.strptime(header['UTC_StartTime'], '%Y-%m-%d%H:%M:%S') > datetime.utcnow() - timedelta(days=6) and
-                gs is not None):
-            image_path = vlfclient.create_plot_xrs(header, data, file_path, archive_path, gl, gs, original_sid)
-        else:
-            image_path = vlfclient.create_plot(header, data, file_path, archive_path, original_sid)
+            archiver.static_summary_path(header['Site'])
+            image_path, day_store = write_products(file_path, archive_path, header, data, original_sid, gl, gs,
+                                                   goes_store, metrics)
 
-        parents = archiver.archive_path(header, original_sid)
-        for path in parents:
-            if not path.exists():
-                path.mkdir(parents=True)
+            parents = archiver.archive_path(header, original_sid)
+            make_dirs(parents[1])
+
+            with metrics.stage('publish'):
+                # Linked rather than copied where possible, replacing the previous live png atomically.
+                if True == original_sid:
+                    method = publish(image_path, parents[0] / (header['StationID'] + '_SID.png'))
+                else:
+                    method = publish(image_path, parents[0] / (header['StationID'] + '_SuperSID.png'))
+            logger.debug('Live PNG published by %s.', method)
+            fingerprint = manifest.fingerprint(file_path) if manifest is not None else None
+            with metrics.stage('move'):
+                csv_path = archiver.store_csv(file_path, parents[1])
+            logger.debug('CSVs moved to archive.')
+            if manifest is not None:
+                with metrics.stage('manifest'):
+                    manifest.record(file_path, header, [image_path, csv_path, day_store], fingerprint)
+            if catalog is not None:
+                with metrics.stage('catalog'):
+                    catalog.record(data_entry(archive_path, header, original_sid, data, csv_path, image_path,
+                                              [day_store]))
+            return image_path
+
+
+def _skip_processed(file_path, entry):
+    """
+    Skip a file which has already been processed, leaving it in place.
+
+    Returns
+    -------
+    image_path : PosixPath
+        Path of the png recorded for the file.
+    """
+    logger.debug('%s : Already processed, skipping.', file_path)
+    return Path(entry['outputs'][0])
+
+
+def write_products(file_path, archive_path, header, data, original_sid, gl=None, gs=None, goes_store=None,
+                   metrics=None):
+    """
+    Write the day store and png of a file to the archive, without moving or
+    copying the file itself.
+
+    Parameters
+    ----------
+    file_path : PosixPath
+        Path of the csv, the outputs are named after it without any
+        compression suffix.
+    archive_path : str
+        Archive root.
+    header : dict
+        Dictionary containing observation parameters, eg. transmitter freq.
+    data : pandas.DataFrame
+        Dataframe containing the datetime and signal strength.
+    original_sid : bool
+        Statement on whether SID or Supersid data is being used.
+    gl : pandas.Series, optional
+        GOES XRS Long data.
+    gs : pandas.Series, optional
+        GOES XRS Short data.
+    goes_store : sidpy.goes.GOESStore, optional
+        Historical GOES XRS data, used in place of gl & gs.
+    metrics : sidpy.metrics.Metrics, optional
+        Records the wall time and peak memory of each stage.
+
+    Returns
+    -------
+    image_path : PosixPath
+        Path of the dated png.
+    day_store : PosixPath
+        Path of the .npz day store.
+    """
+    from sidpy.daystore import write_day
+    from sidpy.render import render_plot
+
+    metrics = NULL_METRICS if metrics is None else metrics
+    # The outputs of a compressed csv, eg. x.csv.gz, are named after x.csv.
+    file_path = plain_path(file_path)
+    with metrics.stage('daystore'):
+        day_store = write_day(Archiver(archive_path).day_store_path(header, original_sid) /
+                              (file_path.stem + '.npz'), header, data)
+
+    start_time = datetime.strptime(header['UTC_StartTime'], '%Y-%m-%d%H:%M:%S')
+    if goes_store is not None:
+        gl, gs = goes_store.get_day(start_time)
+    elif start_time <= datetime.utcnow() - timedelta(days=6):
+        gl, gs = None, None
+    # Rendered on figure templates reused between files, the GOES XRS panel is included if available.
+    image_path = render_plot(header, data, file_path, archive_path, original_sid, gl, gs)
+    return image_path, day_store
+
+
+def _init_worker(gl, gs, goes_store=None, log_queue=None, level=None):
+    """
+    Process pool initializer, the GOES data is sent once to each worker
+    rather than once per file and the records logged are sent to the parent.
+    """
+    init_worker_logger(log_queue, level)
+    _worker_goes['gl'], _worker_goes['gs'], _worker_goes['store'] = gl, gs, goes_store
+
+
+def _process_worker(file_path, archive_path, record_metrics=False, compression=None, lease=None, trace_memory=False):
+    # Entries and metrics are recorded in memory and merged by the parent.
+    if lease is not None and not holds_lease(lease):
+        return None, None, {}, [], [], False
+    manifest, catalog = Manifest(None), Catalog(None)
+    metrics = Metrics(trace_memory) if record_metrics else NULL_METRICS
+    image, error = _process_safely(file_path, archive_path, _worker_goes.get('gl'), _worker_goes.get('gs'),
+                                   manifest, _worker_goes.get('store'), metrics, catalog, compression)
+    return image, error, manifest.entries, list(metrics.records), catalog.entries, True
+
+
+def _process_isolated(file_path, archive_path, goes_store=None, record_metrics=False, compression=None, lease=None,
+                      trace_memory=False):
+    """
+    Process a file in a worker process of its own, once the worker of a pool
+    has died while the file was pending, so that a file crashing its worker,
+    eg. by running out of memory, only fails itself.
+    """
+    try:
+        return _run_isolated(goes_store, _process_worker, file_path, archive_path, record_metrics, compression,
+                             lease, trace_memory)
+    except BrokenProcessPool as e:
+        logger.error('%s : The worker process died while processing the file.', file_path)
+        return None, '{}: {}'.format(type(e).__name__, e), {}, [], [], True
 
-        if True == original_sid:
-            shutil.copy(image_path, parents[0] / (header['StationID'] + '_SID.png'))
-        else:
-            shutil.copy(image_path, parents[0] / (header['StationID'] + '_SuperSID.png'))
-        logger.debug('PNGs copied to archive.')
-        shutil.move(Path(file_path), parents[1] / file_path.name)
-        logger.debug('CSVs moved to archive.')
-        return image_path
 
+def _run_isolated(goes_store, function, *args):
+    """
+    Call a worker function within a process pool of its own.
+
+    Raises
+    ------
+    BrokenProcessPool
+        If the worker process dies before returning.
+    """
+    executor = ProcessPoolExecutor(max_workers=1, initializer=_init_worker,
+                                   initargs=(None, None, goes_store, worker_queue(), log_level()))
+    with executor:
+        return executor.submit(function, *args).result()
+
+
+def _merge_result(result, manifest, catalog, metrics):
+    """
+    Merge the entries and metrics recorded by a worker process.
+
+    Returns
+    -------
+    outcome : tuple
+        The image path and error, None if the lease of the file was lost.
+    """
+    image, error, entries, records, catalog_entries, held = result
+    manifest.update(entries)
+    catalog.update(catalog_entries)
+    metrics.extend(records)
+    return (image, error) if held else None
 
-def process_directory(data_path, archive_path):
+
+def _process_safely(file_path, archive_path, gl=None, gs=None, manifest=None, goes_store=None, metrics=None,
+                    catalog=None, compression=None):
+    """
+    Wrap process_file such that an exception raised for one file does not
+    stop the remaining files from being processed.
+
+    Returns
+    -------
+    result : tuple
+        The image path (None if not processed) and the error message (None if
+        no exception was raised).
+    """
+    try:
+        return (process_file(file_path, archive_path, gl, gs, manifest, goes_store, metrics, catalog, compression),
+                None)
+    except Exception as e:
+        logger.exception('%s : The following exception was raised:', file_path)
+        # The archive directories may have been removed since they were created.
+        clear_dir_cache()
+        return None, '{}: {}'.format(type(e).__name__, e)
+
+
+def list_files(data_path):
+    """
+    List the files within each data directory in a deterministic order.
+
+    Parameters
+    ----------
+    data_path : list
+        Directories containing data to be processed.
+
+    Returns
+    -------
+    files : list
+        File paths, grouped by directory and sorted by name.
+    """
+    files = []
+    for directory in data_path:
+        files.extend(sorted(path for path in Path(directory).iterdir() if path.is_file()))
+    return files
+
+
+def process_directory(data_path, archive_path, workers=1, force=False, force_site=None, force_date=None,
+                      goes_ttl=600, summary=True, goes_url=None, metrics=False, compression=None, leases=None,
+                      trace_memory=False):
     """Function to be run hourly in order to process and archive all files listed
     within the data_path specified within config.cfg.
 
     Parameters
     ----------
-    data_path : str
-        Directory containing data to be processed.
+    data_path : list
+        Directories containing data to be processed.
     archive_path : str
         Directory whhere the data will be archived.
+    workers : int, optional
+        Number of worker processes, files are processed sequentially by default.
+        If None, the number of processors on the machine is used. Should a
+        worker die, the files it left pending are processed again, each in a
+        worker of its own.
+    force : bool, optional
+        Process all files, ignoring the record of previously processed files.
+    force_site : str, optional
+        Process files for the given site, even if already processed.
+    force_date : str, optional
+        Process files for the given yyyy-mm-dd date, even if already processed.
+    goes_ttl : float, optional
+        Time in seconds for which the cached GOES XRS data is used before
+        refreshing.
+    summary : bool, optional
+        Render the summary of all stations of each site and day with newly
+        processed files.
+    goes_url : str, optional
+        URL of the GOES XRS feed, or path to a local json file, by default
+        `sidpy.goes.GOES_URL`.
+    metrics : bool, optional
+        Record the wall time of each stage of each file, added up and written
+        to sidpy_metrics.json and sidpy_metrics.prom alongside the log.
+    compression : str, optional
+        Compress the archived csv files, either 'gzip' or 'zstd' (requires
+        the zstandard package).
+    leases : sidpy.lease.Leases, optional
+        Claim each file before it is processed, so that several nodes sharing
+        the data directories may run at once. The lease is checked again right
+        before each file is processed. Files claimed by other nodes, of other
+        shards or whose lease was lost, are left out of the results.
+
+    Returns
+    -------
+    results : list
+        A (file path, image path, error) tuple for each file, in the order in
+        which the files are listed. The image path is None for files which
+        could not be processed and the error is None unless an exception was
+        raised.
+
+    Raises
+    ------
+    ValueError
+        If workers is less than 1.
     """
+    if workers is not None and workers < 1:
+        raise ValueError('workers must be at least 1, or None for one per processor, not {}.'.format(workers))
+    ensure_logger()
     logger.info('Processing called')
+    from sidpy.goes import GOES_URL, GOESCache, GOESStore
+    from sidpy.summary import render_summaries
+
     archive_path = Path(archive_path)
+    clear_dir_cache()
+    results = []
+    run_metrics = Metrics(trace_memory) if metrics else NULL_METRICS
+    manifest = catalog = None
     try:
-        vlfclient = VLFClient()
-        gl, gs = vlfclient.get_recent_goes()
-
-        for directory in data_path:
-            directory = Path(directory)
-            for file in Path.iterdir(directory):
-                image = process_file(directory / file, archive_path, gl, gs)
-                if image:
-                    logger.debug('%s : Has been processed and archived.', file)
-                else:
-                    logger.warning('%s : Could not be processed.', file)
+        with run_metrics.stage('goes'):
+            gl, gs = GOESCache(archive_path / 'goes', url=goes_url or GOES_URL, ttl=goes_ttl).get()
+            goes_store = GOESStore(archive_path / 'goes' / 'xrs')
+            goes_store.merge(gl, gs)
+        files = list_files(data_path)
+        if leases is not None:
+            leases.start()
+            files = leases.claim_files(files)
+
+        manifest = Manifest(archive_path)
+        if force or force_site or force_date:
+            manifest.invalidate(force_site, force_date)
+        # The write-ahead log of SQLite may not be shared between machines.
+        catalog = Catalog(archive_path, journal_mode='WAL' if leases is None else 'DELETE')
+
+        matched = [manifest.match(file) for file in files]
+        skipped = [key is not None for key in matched]
+        # Each outcome is an (image, error) tuple, or None for files whose lease was lost before processing.
+        if workers == 1:
+            outcomes = ((_skip_processed(file, manifest.entries[key]), None) if key is not None else
+                        None if leases is not None and not leases.holds(file) else
+                        _process_safely(file, archive_path, manifest=manifest, goes_store=goes_store,
+                                        metrics=run_metrics, catalog=catalog, compression=compression)
+                        for file, key in zip(files, matched))
+        else:
+            executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                           initargs=(None, None, goes_store, worker_queue(), log_level()))
+            with executor:
+                futures = [None if skip else
+                           executor.submit(_process_worker, file, archive_path, metrics, compression,
+                                           leases.token(file) if leases is not None else None, trace_memory)
+                           for file, skip in zip(files, skipped)]
+                outcomes, broken = [], []
+                for index, (file, key, future) in enumerate(zip(files, matched, futures)):
+                    if future is None:
+                        outcomes.append((_skip_processed(file, manifest.entries[key]), None))
+                        continue
+                    try:
+                        outcomes.append(_merge_result(future.result(), manifest, catalog, run_metrics))
+                    except BrokenProcessPool:
+                        # A worker died, failing every file left pending within the pool.
+                        broken.append(index)
+                        outcomes.append(None)
+            if broken:
+                logger.warning('A worker process died, %d files are processed again one at a time.', len(broken))
+            for index in broken:
+                result = _process_isolated(files[index], archive_path, goes_store, metrics, compression,
+                                           leases.token(files[index]) if leases is not None else None, trace_memory)
+                outcomes[index] = _merge_result(result, manifest, catalog, run_metrics)
+
+        processed = []
+        for file, skip, outcome in zip(files, skipped, outcomes):
+            if outcome is None:
+                continue
+            image, error = outcome
+            if image:
+                logger.debug('%s : Has been processed and archived.', file)
+            else:
+                logger.warning('%s : Could not be processed.', file)
+            results.append((file, image, error))
+            if not skip:
+                processed.append((file, image, error))
+        if summary:
+            with run_metrics.stage('summary'):
+                render_summaries(processed, archive_path, goes_store)
+            logger.debug('Site summaries rendered.')
+        if run_metrics.enabled:
+            logger.info('Metrics written to %s.', ', '.join(str(path) for path in run_metrics.write()))
         logger.info('Processing completed.')
     except Exception:
         logger.exception("The following exception was raised:")
+    finally:
+        if manifest is not None:
+            manifest.save()
+        if catalog is not None:
+            catalog.close()
+        if leases is not None:
+            leases.stop()
+    return results
 
 
 """"
@@ -0,0 +1,211 @@
+"""
+Site summary plots, all transmitters received at a site on a given day stacked
+above a single GOES XRS panel. Each station is read once from the binary day
+store, the local sunrise and sunset are calculated once for the site and the
+summary is rendered once per site and day, to the live directory and to the
+dated archive.
+
+@author:
+    Oscar Sage David O'Hara
+@email:
+    oharao@tcd.ie
+"""
+
+import logging
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from matplotlib import dates
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from sidpy.archiver import Archiver
+from sidpy.daystore import read_day
+from sidpy.decimate import decimate_series
+from sidpy.geographic_midpoint.geographic_midpoint import Geographic_Midpoint
+from sidpy.output import atomic_path, publish
+from sidpy.query import INSTRUMENTS
+from sidpy.render import GRID_HOURS, PLOT_WIDTH, add_goes_panel
+
+__all__ = ['site_days', 'day_files', 'render_summary', 'render_summaries']
+
+# Height in pixels of each panel of the summary.
+PANEL_HEIGHT = 150
+
+
+def site_days(results, archive_path):
+    """
+    Group the files processed by `sidpy.run.process_directory` by site and
+    UTC date, from the archive path of each generated png.
+
+    Parameters
+    ----------
+    results : list
+        (file path, image path, error) tuples.
+    archive_path : str
+        Archive root.
+
+    Returns
+    -------
+    days : list
+        Sorted (site, yyyy-mm-dd) tuples.
+    """
+    root = Path(archive_path)
+    days = set()
+    for _, image, _ in results:
+        if image is None:
+            continue
+        # {site}/{instrument}/YYYY/MM/DD/png/{name}.png
+        parts = Path(image).relative_to(root).parts
+        days.add((parts[0], '-'.join(parts[2:5])))
+    return sorted(days)
+
+
+def day_files(archive_path, site, date):
+    """
+    Find the day store files of every station received at a site on a day.
+
+    Parameters
+    ----------
+    archive_path : str
+        Archive root.
+    site : str
+        Site name.
+    date : str
+        UTC date, yyyy-mm-dd.
+
+    Returns
+    -------
+    paths : list
+        Day store paths, SID before SuperSID and sorted by name.
+    """
+    day = pd.Timestamp(date).strftime('%Y/%m/%d')
+    paths = []
+    for instrument in INSTRUMENTS:
+        directory = Archiver(archive_path).site_path(site) / instrument / day / 'npz'
+        if directory.is_dir():
+            paths.extend(sorted(directory.glob('*.npz')))
+    return paths
+
+
+def render_summary(archive_path, site, date, goes_store=None, live=True):
+    """
+    Render the summary of all stations received at a site on a day.
+
+    Parameters
+    ----------
+    archive_path : str
+        Archive root.
+    site : str
+        Site name.
+    date : str
+        UTC date, yyyy-mm-dd.
+    goes_store : sidpy.goes.GOESStore, optional
+        Source of the GOES XRS panel, omitted if not given or if the day is not
+        held.
+    live : bool, optional
+        Also copy the summary to the live directory of the site.
+
+    Returns
+    -------
+    image_path : PosixPath
+        Path of the dated summary, None if no stations were found.
+    """
+    stations = [read_day(path) for path in day_files(archive_path, site, date)]
+    if not stations:
+        logging.warning('No stations found for %s on %s.', site, date)
+        return None
+    gl, gs = goes_store.get_day(date) if goes_store is not None else (None, None)
+    xrs = gl is not None and gs is not None
+
+    day = datetime.strptime(date, '%Y-%m-%d')
+    x_range = (day, day + timedelta(days=1))
+    figure = Figure()
+    FigureCanvasAgg(figure)
+    rows = len(stations) + xrs
+    dpi = figure.get_dpi()
+    figure.set_size_inches(PLOT_WIDTH / float(dpi), (PANEL_HEIGHT * rows + 100) / float(dpi))
+    axes = figure.subplots(rows, sharex=True, squeeze=False)[:, 0]
+
+    # The sunrise and sunset are the same for every station received at the site.
+    site_header = stations[0][0]
+    try:
+        sun = Geographic_Midpoint.sunrise_sunset_cached(day.date(), site_header['Latitude'],
+                                                        site_header['Longitude'])
+    except ValueError:
+        logging.warning("Sun is always above the horizon on this day, at this location.")
+        sun = None
+    for a, (header, data) in zip(axes, stations):
+        if sun is not None:
+            a.axvline(sun[0], alpha=0.5, ls="dashed", color='orange', label='Local Sunrise')
+            a.axvline(sun[1], alpha=0.5, ls="dashed", color='red', label='Local Sunset')
+        sid = decimate_series(pd.Series(data['signal_strength'].values.astype(np.float64),
+                                        index=pd.DatetimeIndex(data['datetime'])), PLOT_WIDTH, x_range)
+        a.plot(sid, color='k')
+        original_sid = '-' in header.get('MonitorID', '')
+        a.set_ylabel(header['StationID'] + ('\n(V)' if original_sid else '\n(dB)'))
+    if xrs:
+        goes_long, goes_short = add_goes_panel(axes[-1])
+        goes_long.set_data(dates.date2num(gl.index.values), gl.values)
+        goes_short.set_data(dates.date2num(gs.index.values), gs.values)
+    for a in axes:
+        for t in GRID_HOURS:
+            a.axvline(day + timedelta(hours=t), color="grey", ls="dashed", lw=0.5)
+        a.tick_params(which="both", direction="in")
+    axes[-1].set_xlim(day, day + timedelta(hours=23, minutes=59, seconds=59))
+    axes[-1].xaxis.set_major_locator(dates.HourLocator(interval=2))
+    axes[-1].xaxis.set_major_formatter(dates.DateFormatter("%H:%M"))
+    axes[-1].set_xlabel("Time: {:s} (UTC)".format(date))
+    axes[-1].text(0.875, 0.03, 'Generated : ' + datetime.utcnow().strftime('%d-%b-%y %H:%M') + ' UTC',
+                  horizontalalignment='center', verticalalignment='center', transform=axes[-1].transAxes,
+                  fontsize=8)
+    axes[0].set_title(site_header['Site'] + ' - ' + ', '.join(h['StationID'] for h, _ in stations))
+    figure.tight_layout()
+    figure.subplots_adjust(hspace=0.05)
+
+    archiver = Archiver(archive_path)
+    image_path = archiver.summary_path(site, date) / '{}_{}_summary.png'.format(site.lower(), date)
+    with atomic_path(image_path) as temp_path:
+        figure.savefig(fname=temp_path, format='png')
+    if live:
+        publish(image_path, archiver.static_summary_path(site) / 'Summary.png')
+    logging.debug('%s generated', image_path.name)
+    return image_path
+
+
+def render_summaries(results, archive_path, goes_store=None, live=True):
+    """
+    Render the summary of every site and day processed by
+    `sidpy.run.process_directory`. The most recent day of each site is also
+    copied to its live directory.
+
+    Parameters
+    ----------
+    results : list
+        (file path, image path, error) tuples.
+    archive_path : str
+        Archive root.
+    goes_store : sidpy.goes.GOESStore, optional
+        Source of the GOES XRS panels.
+    live : bool, optional
+        Copy the most recent day of each site to its live directory.
+
+    Returns
+    -------
+    image_paths : list
+        Paths of the dated summaries.
+    """
+    days = site_days(results, archive_path)
+    latest = {site: date for site, date in days}
+    image_paths = []
+    for site, date in days:
+        try:
+            image_path = render_summary(archive_path, site, date, goes_store, live=live and latest[site] == date)
+        except Exception:
+            logging.exception('Summary of %s on %s could not be rendered.', site, date)
+            continue
+        if image_path is not None:
+            image_paths.append(image_path)
+    return image_paths
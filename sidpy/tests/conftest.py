@@ -0,0 +1,33 @@
+"""
+Fixtures shared by the Python tests.
+
+@author:
+    Oscar Sage David O'Hara
+@email:
+    oharao@tcd.ie
+"""
+
+import pytest
+
+from sidpy import logger
+
+
+@pytest.fixture(scope='session', autouse=True)
+def log_file(tmp_path_factory):
+    """
+    Log to a file within the temporary directory of the session, rather than
+    to error.log within the working directory.
+    """
+    path = tmp_path_factory.mktemp('logs') / 'error.log'
+    logger.init_logger(filename=path, console=False)
+    yield path
+    logger.stop_logger()
+
+
+@pytest.fixture
+def restore_logger(log_file):
+    """
+    Restore the logging of the session once a test has replaced it.
+    """
+    yield
+    logger.init_logger(filename=log_file, console=False)
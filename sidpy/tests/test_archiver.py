@@ -37,3 +37,17 @@ def test_static_summary_path(create_tmpdir):
     archiver = Archiver(create_tmpdir)
     archiver.static_summary_path('test_site')
     assert os.path.exists(create_tmpdir / 'test_site' / "live")
+
+
+def test_day_store_path():
+    header = {'Site': 'Test', 'UTC_StartTime': '2020-01-0112:12:12'}
+    archiver = Archiver(root='test')
+    assert archiver.day_store_path(header, False) == Path('test') / 'test' / 'super_sid' / '2020/01/01' / 'npz'
+    assert archiver.day_path(header, True) == Path('test') / 'test' / 'sid' / '2020/01/01'
+
+
+def test_summary_path(create_tmpdir):
+    archiver = Archiver(create_tmpdir)
+    assert archiver.site_path('Test Site') == create_tmpdir / 'test_site'
+    assert archiver.static_summary_path('Test Site') == create_tmpdir / 'test_site' / 'live'
+    assert archiver.summary_path('Test Site', '2021-07-10') == create_tmpdir / 'test_site' / 'summary' / '2021/07/10'
@@ -0,0 +1,58 @@
+"""
+Python tests for catalog.py.
+
+@author:
+    Oscar Sage David O'Hara
+@email:
+    oharao@tcd.ie
+"""
+
+import shutil
+from pathlib import Path
+
+import pytest
+
+from sidpy import run
+from sidpy.catalog import Catalog, rebuild
+
+DATA = Path(__file__).parent / 'data'
+
+
+@pytest.fixture(scope='module')
+def archive(tmp_path_factory):
+    root = tmp_path_factory.mktemp('catalog')
+    data_path = root / 'data'
+    data_path.mkdir()
+    shutil.copy(DATA / '20210703_000000_NAA_S-0055.csv', data_path)
+    shutil.copy(DATA / 'Dunsink_NAA_2021-07-10_000000.csv', data_path)
+    run.process_directory([data_path], root / 'archive', summary=False, goes_url=DATA / 'xrays-3-day.json')
+    return root / 'archive'
+
+
+def test_process_directory_records(archive):
+    with Catalog(archive) as catalog:
+        files = catalog.files(site='Dunsink', station='NAA')
+        assert [(row['instrument'], row['date']) for row in files] == [('sid', '2021-07-03'),
+                                                                       ('super_sid', '2021-07-10')]
+        sid = files[0]
+        assert sid['csv_path'] == 'dunsink/sid/2021/07/03/csv/20210703_000000_NAA_S-0055.csv'
+        assert sid['png_path'] == 'dunsink/sid/2021/07/03/png/20210703_000000_NAA_S-0055.png'
+        assert sid['derived'] == '["dunsink/sid/2021/07/03/npz/20210703_000000_NAA_S-0055.npz"]'
+        assert sid['rows'] > 0 and sid['first_time'].startswith('2021-07-03T00:00')
+        assert catalog.days('dunsink', 'NAA', start='2021-07-01', end='2021-07-31') == ['2021-07-03', '2021-07-10']
+        assert catalog.days('Dunsink', 'NAA', instrument='sid') == ['2021-07-03']
+        assert catalog.gaps('Dunsink', 'NAA', '2021-07-02', '2021-07-04') == ['2021-07-02', '2021-07-04']
+        [coverage] = catalog.coverage(instrument='super_sid')
+        assert (coverage['site'], coverage['days'], coverage['rows']) == ('dunsink', 1, files[1]['rows'])
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_rebuild_matches_process(archive, tmp_path, workers):
+    with Catalog(archive) as catalog:
+        expected = catalog.files()
+    copy = tmp_path / 'archive'
+    shutil.copytree(archive, copy)
+    (copy / 'catalog.sqlite').unlink()
+    assert rebuild(copy, workers=workers) == 2
+    with Catalog(copy) as catalog:
+        assert catalog.files() == expected
@@ -0,0 +1,60 @@
+"""
+Python tests for cli.py.
+
+@author:
+    Oscar Sage David O'Hara
+@email:
+    oharao@tcd.ie
+"""
+
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from sidpy import cli, logger
+
+DATA = Path(__file__).parent / 'data'
+
+
+def test_parser():
+    args = cli.build_parser().parse_args(['process', 'in1', 'in2', '-a', 'archive', '-w', '4', '--force-site',
+                                          'Dunsink'])
+    assert args.func is cli._process
+    assert args.data_path == [Path('in1'), Path('in2')]
+    assert args.archive == Path('archive')
+    assert (args.workers, args.force_site, args.summary) == (4, 'Dunsink', True)
+    assert args.compression is None
+    assert not args.metrics and not args.trace_memory
+    args = cli.build_parser().parse_args(['watch', 'in1', '-a', 'archive', '--compression', 'zstd'])
+    assert args.compression == 'zstd'
+    assert args.retry_interval == 60
+
+
+def test_main_invalid_workers(tmp_path):
+    with pytest.raises(SystemExit):
+        cli.main(['process', str(tmp_path), '--archive', str(tmp_path / 'archive'), '--workers', '-1'])
+
+
+def test_main_process(tmp_path, restore_logger):
+    data_path = tmp_path / 'data'
+    data_path.mkdir()
+    shutil.copy(DATA / 'Dunsink_NAA_2021-07-10_000000.csv', data_path)
+    status = cli.main(['--quiet', '--log-file', str(tmp_path / 'sidpy.log'), '--log-level', 'info', 'process',
+                       str(data_path), '--archive', str(tmp_path / 'archive'), '--no-summary',
+                       '--goes-url', str(DATA / 'xrays-3-day.json')])
+    assert status == 0
+    assert not list(data_path.iterdir())
+    assert (tmp_path / 'archive' / 'dunsink' / 'live' / 'NAA_SuperSID.png').exists()
+    logger.stop_logger()
+    assert 'Processing completed.' in (tmp_path / 'sidpy.log').read_text()
+
+
+def test_heavy_dependencies_imported_lazily():
+    code = ('import sys, sidpy.cli, sidpy.run; '
+            'print(",".join(sorted({"pandas", "scipy", "matplotlib"} & set(sys.modules))))')
+    output = subprocess.run([sys.executable, '-c', code], stdout=subprocess.PIPE, universal_newlines=True,
+                            check=True, cwd=str(Path(__file__).parents[2])).stdout
+    assert output.strip() == ''
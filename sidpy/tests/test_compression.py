@@ -0,0 +1,76 @@
+"""
+Python tests for compression.py.
+
+@author:
+    Oscar Sage David O'Hara
+@email:
+    oharao@tcd.ie
+"""
+
+import shutil
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from sidpy import compression, run
+from sidpy.catalog import Catalog, rebuild
+from sidpy.compression import compress_file, is_csv, open_csv, plain_path
+from sidpy.query import query
+from sidpy.reader import read_file, read_header
+from sidpy.vlfclient import VLFClient
+
+DATA = Path(__file__).parent / 'data'
+METHODS = ['gzip', pytest.param('zstd', marks=pytest.mark.skipif(compression.zstandard is None,
+                                                                 reason='zstandard is not installed'))]
+
+
+@pytest.mark.parametrize('method', METHODS)
+@pytest.mark.parametrize('name', ['20210703_000000_NAA_S-0055.csv', 'Dunsink_NAA_2021-07-10_000000.csv'])
+def test_read_compressed(tmp_path, method, name):
+    path = compress_file(DATA / name, tmp_path, method)
+    assert path.name == name + compression.COMPRESSIONS[method]
+    assert path.stat().st_size < (DATA / name).stat().st_size / 2
+    assert not list(tmp_path.glob('.*'))
+    with open_csv(path) as fh:
+        assert fh.read() == (DATA / name).read_bytes()
+
+    assert read_header(path).parameters == read_header(DATA / name).parameters
+    header, data = read_file(path)
+    expected_header, expected = read_file(DATA / name)
+    assert header == expected_header
+    pd.testing.assert_frame_equal(data, expected)
+    pd.testing.assert_frame_equal(VLFClient.read_csv(path), VLFClient.read_csv(DATA / name))
+
+
+def test_paths():
+    assert plain_path('a/x.csv.gz') == Path('a/x.csv')
+    assert plain_path('a/x.csv') == Path('a/x.csv')
+    assert is_csv('x.csv.zst') and is_csv('x.csv') and not is_csv('.x.csv.gz.partial') and not is_csv('x.npz')
+    with pytest.raises(ValueError):
+        compress_file(DATA / 'Dunsink_NAA_2021-07-10_000000.csv', '.', 'bz2')
+
+
+def test_process_directory_compressed(tmp_path):
+    data_path = tmp_path / 'data'
+    data_path.mkdir()
+    shutil.copy(DATA / 'Dunsink_NAA_2021-07-10_000000.csv', data_path)
+    archive = tmp_path / 'archive'
+    [(_, image, error)] = run.process_directory([data_path], archive, summary=False, compression='gzip',
+                                                goes_url=DATA / 'xrays-3-day.json')
+    assert error is None and image.name == 'Dunsink_NAA_2021-07-10_000000.png'
+    day = archive / 'dunsink' / 'super_sid' / '2021' / '07' / '10'
+    assert [path.name for path in (day / 'csv').iterdir()] == ['Dunsink_NAA_2021-07-10_000000.csv.gz']
+    assert not list(data_path.iterdir())
+
+    with Catalog(archive) as catalog:
+        expected = catalog.files()
+    assert expected[0]['csv_path'].endswith('.csv.gz')
+    (archive / 'catalog.sqlite').unlink()
+    assert rebuild(archive, workers=1) == 1
+    with Catalog(archive) as catalog:
+        assert catalog.files() == expected
+
+    (day / 'npz' / 'Dunsink_NAA_2021-07-10_000000.npz').unlink()
+    series = query(archive, 'Dunsink', 'NAA', '2021-07-10', '2021-07-10 23:59:59').to_series()
+    assert len(series) == expected[0]['rows']
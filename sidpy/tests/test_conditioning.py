@@ -0,0 +1,56 @@
+"""
+Python tests for conditioning.py.
+
+@author:
+    Oscar Sage David O'Hara
+@email:
+    oharao@tcd.ie
+"""
+
+import tracemalloc
+
+import numpy as np
+import pytest
+from scipy.signal import savgol_filter
+
+from sidpy.conditioning import Conditioner, condition_signal
+
+
+@pytest.fixture(scope='module')
+def signal():
+    return np.abs(np.random.default_rng(0).normal(5, 1, 200003)) + 0.1
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 9, 1000, 1 << 16, 1 << 20])
+def test_condition_signal_matches_unblocked(signal, chunk_size):
+    expected = 20 * np.log10(savgol_filter(signal, 9, 1))
+    assert np.array_equal(condition_signal(signal, chunk_size=chunk_size), expected)
+    in_place = signal.copy()
+    assert condition_signal(in_place, out=in_place, chunk_size=chunk_size) is in_place
+    assert np.array_equal(in_place, expected)
+
+
+def test_condition_signal_float32(signal):
+    out = condition_signal(signal, out=np.empty(len(signal), dtype=np.float32))
+    assert out.dtype == np.float32
+    np.testing.assert_allclose(out, 20 * np.log10(savgol_filter(signal, 9, 1)), rtol=1e-6)
+
+
+def test_conditioner_short_signal():
+    conditioner = Conditioner()
+    assert len(conditioner.feed(np.ones(8))) == 0
+    with pytest.raises(ValueError):
+        conditioner.finish()
+    conditioned = np.concatenate([conditioner.feed(np.ones(1)), conditioner.finish()])
+    assert np.array_equal(conditioned, 20 * np.log10(savgol_filter(np.ones(9), 9, 1)))
+
+
+def test_condition_signal_memory_does_not_grow():
+    peaks = []
+    for n in (10 ** 6, 4 * 10 ** 6):
+        signal = np.full(n, 2.0)
+        tracemalloc.start()
+        condition_signal(signal, out=signal)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    assert peaks[1] < 1.5 * peaks[0] < 8 * 10 ** 6
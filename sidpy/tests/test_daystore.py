@@ -0,0 +1,37 @@
+"""
+Python tests for daystore.py.
+
+@author:
+    Oscar Sage David O'Hara
+@email:
+    oharao@tcd.ie
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from sidpy.daystore import read_day, write_day
+from sidpy.reader import read_file
+
+DATA = Path(__file__).parent / 'data'
+
+
+def test_day_store_round_trip(tmp_path):
+    header, data = read_file(DATA / 'Dunsink_NAA_2021-07-10_000000.csv')
+    path = write_day(tmp_path / 'day.npz', header, data)
+    store_header, store_data = read_day(path)
+    assert store_header == header
+    assert store_data['signal_strength'].dtype == np.float32
+    np.testing.assert_array_equal(store_data['datetime'].values, data['datetime'].values)
+    np.testing.assert_array_equal(store_data['signal_strength'].values,
+                                  data['signal_strength'].values.astype(np.float32))
+
+
+def test_day_store_irregular(tmp_path):
+    data = pd.DataFrame({'datetime': pd.to_datetime(['2021-07-10 00:00:00', '2021-07-10 00:00:01',
+                                                     '2021-07-10 00:00:05']),
+                         'signal_strength': [1.0, 2.0, 3.0]})
+    _, store_data = read_day(write_day(tmp_path / 'day.npz', {}, data))
+    np.testing.assert_array_equal(store_data['datetime'].values, data['datetime'].values)
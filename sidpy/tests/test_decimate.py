@@ -0,0 +1,51 @@
+"""
+Python tests for decimate.py.
+
+@author:
+    Oscar Sage David O'Hara
+@email:
+    oharao@tcd.ie
+"""
+
+import numpy as np
+import pandas as pd
+
+from sidpy.decimate import decimate_series, minmax_decimate
+
+
+def test_minmax_decimate_keeps_extremes():
+    rng = np.random.default_rng(0)
+    y = rng.normal(size=86400)
+    y[40000] = 50
+    y[60000] = -50
+    indices = minmax_decimate(np.arange(86400), y, 1000)
+    assert len(indices) <= 2002
+    assert np.all(np.diff(indices) > 0)
+    assert {0, 40000, 60000, 86399} <= set(indices)
+    buckets = np.arange(86400) * 1000 // 86400
+    for bucket in (0, 17, 999):
+        kept = y[indices[buckets[indices] == bucket]]
+        assert y[buckets == bucket].min() in kept and y[buckets == bucket].max() in kept
+
+
+def test_minmax_decimate_gaps():
+    y = np.ones(86400)
+    y[10000:20000] = np.nan
+    indices = minmax_decimate(np.arange(86400), y, 1000)
+    assert np.isnan(y[indices]).sum() > 0
+    # Out of order samples give the same extremes.
+    x = np.arange(86400)
+    x[[5, 6]] = x[[6, 5]]
+    assert set(y[minmax_decimate(x, y, 1000)]) >= {1.0}
+
+
+def test_minmax_decimate_short():
+    np.testing.assert_array_equal(minmax_decimate(np.arange(10), np.arange(10), 1000), np.arange(10))
+
+
+def test_decimate_series():
+    index = pd.date_range('2021-07-03', periods=86400, freq='s')
+    series = pd.Series(np.sin(np.arange(86400) / 1000), index=index)
+    decimated = decimate_series(series, 500, (index[0], index[0] + pd.Timedelta(days=1)))
+    assert len(decimated) <= 1002
+    assert decimated.max() == series.max() and decimated.min() == series.min()
@@ -9,6 +9,10 @@ Python tests for geographic_midpoint.py.
 from sidpy.geographic_midpoint.geographic_midpoint import Geographic_Midpoint
 from datetime import datetime
 
+import numpy as np
+import pandas as pd
+import pytest
+
 
 def test_to_cart():
     geo = Geographic_Midpoint()
@@ -40,3 +44,68 @@ def test_sunrise_sunset():
     sunrise, sunset = geo.sunrise_sunset(datetime(year=2020, month=1, day=1), 0, 0)
     assert sunrise.strftime("%Y/%m/%d %H:%M:%S:%f") == '2020/01/01 05:59:46:642588'
     assert sunset.strftime("%Y/%m/%d %H:%M:%S:%f") == '2020/01/01 18:06:52:306438'
+
+
+def test_sunrise_sunset_cached():
+    geo = Geographic_Midpoint()
+    date = datetime(year=2021, month=7, day=3).date()
+    assert geo.sunrise_sunset_cached(date, '53.39', '-6.34') == geo.sunrise_sunset(date, 53.39, -6.34)
+    assert geo.sunrise_sunset_cached(date, 53.3901, -6.3401) == geo.sunrise_sunset(date, 53.3901, -6.3401)
+    # The sun does not set at the pole in summer, a new exception is raised each time.
+    errors = []
+    for _ in range(2):
+        with pytest.raises(ValueError) as error:
+            geo.sunrise_sunset_cached(date, 89.9, 0)
+        errors.append(error.value)
+    assert errors[0] is not errors[1] and str(errors[0]) == str(errors[1])
+
+
+def test_sunrise_sunset_range():
+    geo = Geographic_Midpoint()
+    dates = pd.date_range('2021-01-01', '2021-12-31')
+    sunrise, sunset = geo.sunrise_sunset_range(dates, 53.39, -6.34)
+    for i in range(0, len(dates), 30):
+        expected = geo.sunrise_sunset(dates[i].date(), 53.39, -6.34)
+        assert abs(np.datetime64(expected[0].replace(tzinfo=None)) - sunrise[i]) < np.timedelta64(1, 'ms')
+        assert abs(np.datetime64(expected[1].replace(tzinfo=None)) - sunset[i]) < np.timedelta64(1, 'ms')
+    # The sun does not set during the polar day.
+    sunrise, sunset = geo.sunrise_sunset_range(['2021-06-21'], 78.2, 15.6)
+    assert np.isnat(sunrise[0]) and np.isnat(sunset[0])
+
+
+def test_calc_midpoints():
+    geo = Geographic_Midpoint()
+    rng = np.random.default_rng(0)
+    lat1, lat2 = rng.uniform(-89, 89, (2, 50))
+    lon1, lon2 = rng.uniform(-180, 180, (2, 50))
+    lat, lon = geo.calc_midpoints(lat1, lon1, lat2, lon2)
+    for i in range(50):
+        expected = geo.calc_midpoint([lat1[i], lon1[i]], [lat2[i], lon2[i]])
+        np.testing.assert_allclose((lat[i], lon[i]), expected, atol=1e-9)
+    cart = geo.to_cart_array(lat1, lon1)
+    np.testing.assert_allclose(cart[3], geo.to_cart(lat1[3], lon1[3]))
+    np.testing.assert_allclose(geo.to_latlon_array(cart)[0], lat1)
+
+
+def test_weighted_centroid():
+    geo = Geographic_Midpoint()
+    lat, lon = geo.weighted_centroid([[10, 0, -10]], [[0, 10, 0]], [1, 2, 1])
+    outer = geo.weighted_avg_coord(geo.to_cart(10, 0), geo.to_cart(-10, 0))
+    expected = geo.to_latlon(*geo.weighted_avg_coord(outer, geo.to_cart(0, 10), 2, 2))
+    np.testing.assert_allclose((lat[0], lon[0]), expected, atol=1e-9)
+
+
+def test_great_circle_distance():
+    geo = Geographic_Midpoint()
+    np.testing.assert_allclose(geo.great_circle_distance(0, 0, [0, 90], [90, 0]), [10007.543, 10007.543],
+                               rtol=1e-6)
+
+
+def test_path_geometry():
+    geo = Geographic_Midpoint()
+    transmitters = {'NAA': [44.644, -67.282, 'Maine, USA'], 'HWU': [46.714, 1.244, 'Rosnay, France']}
+    geometry = geo.path_geometry({'Dunsink': [53.39, -6.34], 'Birr': [53.09, -7.92]}, transmitters)
+    assert len(geometry) == 4
+    lat, lon, distance = geometry[('Birr', 'HWU')]
+    np.testing.assert_allclose((lat, lon), geo.calc_midpoint([53.09, -7.92], [46.714, 1.244]))
+    assert 900 < distance < 1000
@@ -0,0 +1,81 @@
+"""
+Python tests for goes.py.
+
+@author:
+    Oscar Sage David O'Hara
+@email:
+    oharao@tcd.ie
+"""
+
+import shutil
+import threading
+from pathlib import Path
+
+import pandas as pd
+
+from sidpy.goes import GOESCache, GOESStore
+from sidpy.vlfclient import VLFClient
+
+DATA = Path(__file__).parent / 'data'
+
+
+def test_goes_cache(tmp_path):
+    source = tmp_path / 'xrays-3-day.json'
+    shutil.copy(DATA / 'xrays-3-day.json', source)
+    cache = GOESCache(tmp_path / 'cache', url=source, ttl=3600)
+    gl, gs = cache.get()
+    expected_gl, expected_gs = VLFClient.get_recent_goes(DATA / 'xrays-3-day.json')
+    assert gl.equals(expected_gl)
+    assert gs.equals(expected_gs)
+    assert not cache.is_stale()
+    # The last good copy is used once the source is no longer reachable.
+    source.unlink()
+    cache.ttl = 0
+    assert not cache.refresh()
+    assert cache.get()[0].equals(expected_gl)
+
+
+def test_goes_cache_concurrent_writes(tmp_path):
+    # The watcher refreshes the cache on its own thread while the main thread may also refresh it.
+    cache = GOESCache(tmp_path / 'cache', url=DATA / 'xrays-3-day.json')
+    content = (DATA / 'xrays-3-day.json').read_bytes()
+    errors = []
+
+    def write():
+        try:
+            for _ in range(50):
+                cache._write(content, {'fetched': 0})
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert cache.path.read_bytes() == content
+    assert sorted(path.name for path in cache.cache_dir.iterdir()) == [cache.path.name, cache.meta_path.name]
+
+
+def test_goes_cache_unavailable(tmp_path):
+    cache = GOESCache(tmp_path / 'cache', url=tmp_path / 'missing' / 'xrays.json', timeout=1)
+    assert cache.get() == (None, None)
+
+
+def test_goes_store(tmp_path):
+    gl, gs = VLFClient.get_recent_goes(DATA / 'xrays-3-day.json')
+    store = GOESStore(tmp_path)
+    assert store.merge(gl, gs) == ['2021-06-29', '2021-06-30', '2021-07-01', '2021-07-02']
+    # Merging data already held rewrites neither the days nor the index.
+    mtimes = {path: path.stat().st_mtime_ns for path in tmp_path.rglob('*') if path.is_file()}
+    assert store.merge(gl[-1000:], gs[-1000:]) == []
+    assert {path: path.stat().st_mtime_ns for path in tmp_path.rglob('*') if path.is_file()} == mtimes
+    # Merging overlapping data does not duplicate timestamps.
+    assert store.merge(gl[-100:] * 2, gs[-100:]) == ['2021-07-02']
+    day_gl, day_gs = GOESStore(tmp_path).get_day(pd.Timestamp('2021-07-02 12:00'))
+    expected = gl[gl.index >= '2021-07-02']
+    assert day_gl.index.equals(expected.index)
+    assert (day_gl[-100:] == expected[-100:] * 2).all()
+    assert day_gs.equals(gs[gs.index >= '2021-07-02'])
+    assert store.get_day(pd.Timestamp('2021-07-03')) == (None, None)
@@ -0,0 +1,175 @@
+"""
+Python tests for lease.py.
+
+@author:
+    Oscar Sage David O'Hara
+@email:
+    oharao@tcd.ie
+"""
+
+import json
+import multiprocessing
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from sidpy import run
+from sidpy.catalog import Catalog
+from sidpy.lease import Leases, file_lock, holds_lease, parse_shard
+from sidpy.manifest import Manifest
+
+DATA = Path(__file__).parent / 'data'
+FILES = ['20210703_000000_NAA_S-0055.csv', 'Dunsink_NAA_2021-07-10_000000.csv']
+
+
+@pytest.fixture
+def data_path(tmp_path):
+    data_path = tmp_path / 'data'
+    data_path.mkdir()
+    for name in FILES:
+        shutil.copy(DATA / name, data_path)
+    return data_path
+
+
+def test_parse_shard():
+    assert parse_shard('1/3') == (1, 3)
+    for value in ['3/3', '1', 'a/b']:
+        with pytest.raises(ValueError):
+            parse_shard(value)
+
+
+def test_claim_is_exclusive(tmp_path):
+    nodes = [Leases(tmp_path / 'leases', owner='node{}'.format(i)) for i in range(8)]
+    barrier = threading.Barrier(len(nodes))
+    claimed = []
+
+    def claim(node):
+        barrier.wait()
+        if node.claim('x.csv'):
+            claimed.append(node.owner)
+
+    threads = [threading.Thread(target=claim, args=(node,)) for node in nodes]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(claimed) == 1
+    assert Leases.owner_of(nodes[0].lease_path('x.csv')) == claimed[0]
+
+
+def test_expired_lease_taken_over(tmp_path):
+    crashed, node = Leases(tmp_path, ttl=60, owner='crashed'), Leases(tmp_path, ttl=60, owner='node')
+    assert crashed.claim('x.csv')
+    assert not node.claim('x.csv')
+    expired = time.time() - 120
+    os.utime(crashed.lease_path('x.csv'), (expired, expired))
+    assert node.claim('x.csv')
+    assert Leases.owner_of(node.lease_path('x.csv')) == 'node'
+    assert [path.name for path in tmp_path.iterdir()] == ['x.csv.lease']
+
+    # The crashed node finds its lease lost once it renews, and does not remove the lease taken over.
+    assert crashed.renew() == [crashed.lease_path('x.csv')]
+    crashed.release('x.csv')
+    assert node.holds('x.csv')
+    node.stop()
+    assert not list(tmp_path.iterdir())
+
+
+def test_lost_lease_not_processed(data_path, tmp_path):
+    node = Leases(tmp_path / 'leases', owner='node')
+    file = data_path / FILES[0]
+    assert node.claim(file) and node.holds(file) and holds_lease(node.token(file))
+    # Taken over by another node, eg. while an expired lease was being put back.
+    node.lease_path(file).write_text(json.dumps({'owner': 'other'}))
+    assert not holds_lease(node.token(file))
+    assert run._process_worker(file, tmp_path / 'archive', lease=node.token(file))[-1] is False
+    assert not node.holds(file) and file.exists()
+    # Not released, as now held by the other node.
+    node.stop()
+    assert node.lease_path(file).exists()
+
+
+def test_heartbeat_renews(tmp_path):
+    with Leases(tmp_path, ttl=0.3, owner='node') as node:
+        node.claim('x.csv')
+        time.sleep(0.6)
+        assert not Leases(tmp_path, ttl=0.3).claim('x.csv')
+    assert not node.lease_path('x.csv').exists()
+
+
+def test_shards_partition_files(data_path, tmp_path):
+    files = run.list_files([data_path])
+    nodes = [Leases(tmp_path / 'leases', shard=(i, 2), steal_after=None) for i in range(2)]
+    assert [node.shard_of(file) for node in nodes for file in files] == [0, 0, 0, 0]
+    assert nodes[0].claim_files(files) == files
+    assert nodes[1].claim_files(files) == []
+    # Files of other shards are claimed once older than steal_after.
+    nodes[0].stop()
+    nodes[1].steal_after = 0
+    assert nodes[1].claim_files(files) == files
+
+
+def test_process_directory_nodes(data_path, tmp_path):
+    archive = tmp_path / 'archive'
+    first, second = Leases(archive / 'leases', owner='first'), Leases(archive / 'leases', owner='second')
+    second.claim(data_path / FILES[1])
+    results = run.process_directory([data_path], archive, summary=False, goes_url=DATA / 'xrays-3-day.json',
+                                    leases=first)
+    assert [(file.name, error) for file, _, error in results] == [(FILES[0], None)]
+    assert [path.name for path in data_path.iterdir()] == [FILES[1]]
+    assert [path.name for path in (archive / 'leases').iterdir()] == [FILES[1] + '.lease']
+    second.release(data_path / FILES[1])
+
+    results = run.process_directory([data_path], archive, summary=False, goes_url=DATA / 'xrays-3-day.json',
+                                    leases=second)
+    assert [(file.name, error) for file, _, error in results] == [(FILES[1], None)]
+    assert not list(data_path.iterdir()) and not list((archive / 'leases').iterdir())
+
+
+def _node(owner, data_path, archive, barrier, queue):
+    barrier.wait()
+    results = run.process_directory([data_path], archive, summary=False, goes_url=DATA / 'xrays-3-day.json',
+                                    leases=Leases(archive / 'leases', owner=owner))
+    queue.put([(file.name, error) for file, _, error in results])
+
+
+def test_nodes_share_state(data_path, tmp_path):
+    archive = tmp_path / 'archive'
+    context = multiprocessing.get_context('fork')
+    barrier, queue = context.Barrier(2), context.Queue()
+    nodes = [context.Process(target=_node, args=(owner, data_path, archive, barrier, queue))
+             for owner in ('first', 'second')]
+    for node in nodes:
+        node.start()
+    results = queue.get(timeout=120) + queue.get(timeout=120)
+    for node in nodes:
+        node.join(30)
+    # Each file is processed by one node, and both nodes' updates of the shared files are kept.
+    assert sorted(results) == [(name, None) for name in FILES]
+    assert sorted(entry['name'] for entry in Manifest(archive).entries.values()) == FILES
+    with Catalog(archive, journal_mode='DELETE') as catalog:
+        assert len(catalog.files()) == 2
+    with open(archive / 'goes' / 'xrs' / 'index.json') as fh:
+        assert sorted(json.load(fh)) == ['2021-06-29', '2021-06-30', '2021-07-01', '2021-07-02']
+    assert not list(data_path.iterdir()) and not list((archive / 'leases').iterdir())
+    assert not list(archive.rglob('*.lock'))
+
+
+def test_file_lock(tmp_path):
+    path = tmp_path / 'x.lock'
+    with file_lock(path):
+        with pytest.raises(TimeoutError):
+            with file_lock(path, timeout=0.1):
+                pass
+    assert not path.exists()
+    # A lock left by a process which died is broken once stale.
+    path.write_text('dead')
+    stale = time.time() - 300
+    os.utime(path, (stale, stale))
+    with file_lock(path, timeout=0.1):
+        assert path.read_text() != 'dead'
+    assert not path.exists()
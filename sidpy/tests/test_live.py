@@ -0,0 +1,69 @@
+"""
+Python tests for live.py.
+
+@author:
+    Oscar Sage David O'Hara
+@email:
+    oharao@tcd.ie
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from sidpy.live import BUFFER_DTYPE, LiveTail, tail
+from sidpy.reader import read_file
+
+DATA = Path(__file__).parent / 'data'
+
+
+def split_file(name):
+    lines = (DATA / name).read_bytes().splitlines(keepends=True)
+    body = next(i for i, line in enumerate(lines) if not line.startswith(b'#'))
+    return lines[:body], lines[body:]
+
+
+def test_update_reads_only_appended_rows(tmp_path):
+    header, rows = split_file('Dunsink_NAA_2021-07-10_000000.csv')
+    live_file = tmp_path / 'data' / 'Dunsink_NAA_current.csv'
+    live_file.parent.mkdir()
+    live_file.write_bytes(b''.join(header))
+    live = LiveTail(tmp_path / 'archive')
+    assert live.update(live_file) is None
+
+    with open(live_file, 'ab') as fh:
+        fh.write(b''.join(rows[:1000]) + rows[1000][:10])
+    image_path = live.update(live_file)
+    assert image_path == tmp_path / 'archive' / 'dunsink' / 'live' / 'NAA_SuperSID.png'
+    assert image_path.exists()
+    buffer_path = Path(live.state[str(live_file.resolve())]['buffer'])
+    assert len(np.fromfile(buffer_path, dtype=BUFFER_DTYPE)) == 1000
+
+    # The offsets are persistent, a new reader continues from the partial row.
+    with open(live_file, 'ab') as fh:
+        fh.write(rows[1000][10:] + b''.join(rows[1001:]))
+    assert LiveTail(tmp_path / 'archive').update(live_file) == image_path
+    day = np.fromfile(buffer_path, dtype=BUFFER_DTYPE)
+    _, data = read_file(DATA / 'Dunsink_NAA_2021-07-10_000000.csv', original_sid=True)
+    assert np.array_equal(day['time'].astype('datetime64[ns]'), data['datetime'].values)
+    assert np.array_equal(day['signal'], data['signal_strength'].values)
+
+
+def test_tail_starts_new_buffer_for_new_day(tmp_path):
+    header, rows = split_file('Dunsink_NAA_2021-07-10_000000.csv')
+    live_file = tmp_path / 'data' / 'Dunsink_NAA_current.csv'
+    live_file.parent.mkdir()
+    live_file.write_bytes(b''.join(header + rows[:100]))
+    (tmp_path / 'data' / 'Dunsink_NAA_2021-07-09_000000.csv').write_bytes(b'')
+    assert tail([tmp_path / 'data'], tmp_path / 'archive') == [
+        tmp_path / 'archive' / 'dunsink' / 'live' / 'NAA_SuperSID.png']
+
+    header = [line.replace(b'2021-07-10', b'2021-07-11') for line in header]
+    live_file.write_bytes(b''.join(header + [line.replace(b'2021-07-10', b'2021-07-11') for line in rows[:50]]))
+    assert len(tail([tmp_path / 'data'], tmp_path / 'archive')) == 1
+    buffers = sorted((tmp_path / 'archive' / 'dunsink' / 'live' / 'buffer').iterdir())
+    assert [path.name for path in buffers] == ['NAA_super_sid_20210711.bin']
+    day = np.fromfile(buffers[0], dtype=BUFFER_DTYPE)
+    assert len(day) == 50
+    assert pd.Timestamp(day['time'][0]).date().isoformat() == '2021-07-11'
@@ -0,0 +1,39 @@
+"""
+Python tests for logger.py.
+
+@author:
+    Oscar Sage David O'Hara
+@email:
+    oharao@tcd.ie
+"""
+
+import logging
+
+from sidpy import logger
+
+
+def test_init_logger_is_idempotent(tmp_path, restore_logger):
+    root = logging.getLogger()
+    logger.init_logger(filename=tmp_path / 'error.log', console=False)
+    before = len(root.handlers)
+    for _ in range(2):
+        logger.init_logger(filename=tmp_path / 'error.log', console=False)
+    assert len(root.handlers) == before
+    logging.info('Written once.')
+    logger.stop_logger()
+    lines = (tmp_path / 'error.log').read_text().splitlines()
+    assert len(lines) == 1
+    assert lines[0].endswith(' - INFO - Written once.')
+
+
+def test_level_and_rotation(tmp_path, restore_logger, monkeypatch):
+    monkeypatch.setenv('SIDPY_LOG_LEVEL', 'info')
+    logger.init_logger(filename=tmp_path / 'error.log', max_bytes=200, backup_count=2, console=False)
+    assert logger.log_directory() == tmp_path
+    logging.debug('Not written.')
+    for i in range(20):
+        logging.info('Record %d', i)
+    logger.stop_logger()
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['error.log', 'error.log.1', 'error.log.2']
+    assert 'Record 19' in (tmp_path / 'error.log').read_text()
+    assert 'Not written.' not in ''.join(path.read_text() for path in tmp_path.iterdir())
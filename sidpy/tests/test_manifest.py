@@ -0,0 +1,102 @@
+"""
+Python tests for manifest.py.
+
+@author:
+    Oscar Sage David O'Hara
+@email:
+    oharao@tcd.ie
+"""
+
+import json
+import os
+import shutil
+from pathlib import Path
+
+from sidpy.manifest import Manifest
+
+HEADER = {'Site': 'Dunsink', 'UTC_StartTime': '2021-07-0300:00:00'}
+
+
+def test_manifest_record(tmp_path):
+    source, output = tmp_path / 'source.csv', tmp_path / 'output.png'
+    source.write_text('data')
+    output.write_text('')
+    manifest = Manifest(tmp_path)
+    assert not manifest.is_processed(source)
+    manifest.record(source, HEADER, [output])
+    assert not Manifest(tmp_path).is_processed(source)
+    manifest.save()
+    assert Manifest(tmp_path).is_processed(source)
+    # Touching without changing the content is still processed.
+    os.utime(source, (0, 0))
+    assert manifest.is_processed(source)
+    source.write_text('changed')
+    assert not manifest.is_processed(source)
+
+
+def test_manifest_saved_every(tmp_path):
+    manifest = Manifest(tmp_path, save_every=2)
+    for name in ('a.csv', 'b.csv', 'c.csv'):
+        (tmp_path / name).write_text(name)
+        manifest.record(tmp_path / name, HEADER, [])
+    assert len(Manifest(tmp_path).entries) == 2
+    manifest.save()
+    assert len(Manifest(tmp_path).entries) == 3
+
+
+def test_manifest_missing_output(tmp_path):
+    source = tmp_path / 'source.csv'
+    source.write_text('data')
+    manifest = Manifest(tmp_path)
+    manifest.record(source, HEADER, [tmp_path / 'missing.png'])
+    assert not manifest.is_processed(source)
+
+
+def test_manifest_invalidate(tmp_path):
+    source = tmp_path / 'source.csv'
+    source.write_text('data')
+    manifest = Manifest(tmp_path)
+    manifest.record(source, HEADER, [])
+    assert manifest.invalidate(site='Birr') == 0
+    assert manifest.invalidate(date='2021-07-04') == 0
+    assert manifest.invalidate(site='Dunsink', date='2021-07-03') == 1
+    assert Manifest(tmp_path).entries == {}
+
+
+def test_manifest_copy_recognised(tmp_path):
+    source, output = tmp_path / 'source.csv', tmp_path / 'output.png'
+    source.write_text('data')
+    output.write_text('')
+    manifest = Manifest(tmp_path)
+    manifest.record(source, HEADER, [output])
+    (tmp_path / 'incoming').mkdir()
+    copy = Path(shutil.copy(source, tmp_path / 'incoming'))
+    os.utime(copy, (0, 0))
+    assert manifest.outputs(copy) == [str(output)]
+    assert not manifest.is_processed(shutil.copy(source, tmp_path / 'renamed.csv'))
+
+
+def test_manifest_path_keys_migrated(tmp_path):
+    source, output = tmp_path / 'source.csv', tmp_path / 'output.png'
+    source.write_text('data')
+    output.write_text('')
+    stat = source.stat()
+    entry = {'size': stat.st_size, 'mtime': stat.st_mtime, 'sha256': Manifest.file_hash(source),
+             'site': 'dunsink', 'date': '2021-07-03', 'outputs': [str(output)]}
+    (tmp_path / 'manifest.json').write_text(json.dumps({str(source): entry}))
+    manifest = Manifest(tmp_path)
+    assert list(manifest.entries) == [entry['sha256']]
+    assert manifest.is_processed(source)
+
+
+def test_manifest_saves_merged(tmp_path):
+    # Loaded by two processes at once, neither loses the files recorded by the other.
+    first, second = Manifest(tmp_path), Manifest(tmp_path)
+    for manifest, name in ((first, 'a.csv'), (second, 'b.csv')):
+        (tmp_path / name).write_text(name)
+        manifest.record(tmp_path / name, HEADER, [])
+    first.save()
+    second.save()
+    assert sorted(entry['name'] for entry in Manifest(tmp_path).entries.values()) == ['a.csv', 'b.csv']
+    assert first.invalidate() == 1
+    assert sorted(entry['name'] for entry in Manifest(tmp_path).entries.values()) == ['b.csv']
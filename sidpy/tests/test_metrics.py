@@ -0,0 +1,71 @@
+"""
+Python tests for metrics.py.
+
+@author:
+    Oscar Sage David O'Hara
+@email:
+    oharao@tcd.ie
+"""
+
+import json
+import shutil
+from pathlib import Path
+
+import numpy as np
+
+from sidpy import metrics, run
+from sidpy.metrics import NULL_METRICS, Metrics
+
+DATA = Path(__file__).parent / 'data'
+
+
+def test_stage_is_noop_when_inactive():
+    assert metrics.active() is NULL_METRICS
+    with metrics.stage('parse'):
+        pass
+    assert NULL_METRICS.records == ()
+
+
+def test_memory_not_traced_by_default():
+    recorder = Metrics()
+    with recorder.file('a.csv'):
+        with metrics.stage('parse'):
+            pass
+    assert [record['peak_bytes'] for record in recorder.records] == [None, None]
+
+
+def test_nested_stage_peak():
+    recorder = Metrics(trace_memory=True)
+    with recorder.file('a.csv'):
+        with metrics.stage('allocate'):
+            block = np.ones(1 << 20)
+            del block
+        with metrics.stage('small'):
+            pass
+    assert metrics.active() is NULL_METRICS
+    stages = {record['stage']: record for record in recorder.records}
+    assert set(stages) == {'allocate', 'small', 'total'}
+    assert stages['allocate']['peak_bytes'] >= 8 << 20
+    assert stages['small']['peak_bytes'] < 1 << 20
+    # The peak of the file includes that of the stages within it.
+    assert stages['total']['peak_bytes'] >= stages['allocate']['peak_bytes']
+    assert stages['total']['seconds'] >= stages['allocate']['seconds'] + stages['small']['seconds']
+
+
+def test_process_directory_metrics(tmp_path, monkeypatch):
+    data_path = tmp_path / 'data'
+    data_path.mkdir()
+    shutil.copy(DATA / 'Dunsink_NAA_2021-07-10_000000.csv', data_path)
+    monkeypatch.setattr(metrics, 'log_directory', lambda: tmp_path / 'logs')
+    results = run.process_directory([data_path], tmp_path / 'archive', summary=False,
+                                    goes_url=DATA / 'xrays-3-day.json', metrics=True)
+    assert results[0][1] is not None
+
+    summary = json.loads((tmp_path / 'logs' / 'sidpy_metrics.json').read_text())
+    assert summary['files'] == 1
+    assert {'parse', 'filter', 'sunrise', 'draw', 'savefig', 'publish', 'move', 'total',
+            'goes'} <= set(summary['stages'])
+    assert summary['stages']['total']['count'] == 1
+    prom = (tmp_path / 'logs' / 'sidpy_metrics.prom').read_text()
+    assert 'sidpy_files_processed 1\n' in prom
+    assert 'sidpy_stage_seconds{stage="savefig"}' in prom
@@ -0,0 +1,75 @@
+"""
+Python tests for output.py.
+
+@author:
+    Oscar Sage David O'Hara
+@email:
+    oharao@tcd.ie
+"""
+
+import errno
+import os
+
+import pytest
+
+from sidpy import output
+from sidpy.output import atomic_path, clear_dir_cache, make_dirs, publish
+
+
+def test_atomic_path(tmp_path):
+    path = tmp_path / 'day' / 'a.png'
+    with atomic_path(path) as temp_path:
+        temp_path.write_text('new')
+        assert not path.exists()
+    assert path.read_text() == 'new'
+
+    with pytest.raises(RuntimeError):
+        with atomic_path(path) as temp_path:
+            temp_path.write_text('partial')
+            raise RuntimeError
+    assert path.read_text() == 'new'
+    assert [child.name for child in path.parent.iterdir()] == ['a.png']
+
+
+def test_make_dirs_cached(tmp_path):
+    path = tmp_path / 'a' / 'b'
+    assert make_dirs(path).is_dir()
+    path.rmdir()
+    make_dirs(path)
+    assert not path.exists()
+    clear_dir_cache()
+    assert make_dirs(path).is_dir()
+
+
+def test_publish_link(tmp_path):
+    clear_dir_cache()
+    source, target = tmp_path / 'dated.png', tmp_path / 'live' / 'live.png'
+    source.write_text('first')
+    assert publish(source, target) == 'link'
+    assert os.path.samefile(source, target)
+
+    # Rewriting the dated png replaces it, leaving the live png as published.
+    with atomic_path(source) as temp_path:
+        temp_path.write_text('second')
+    assert target.read_text() == 'first'
+    assert publish(source, target) == 'link'
+    assert target.read_text() == 'second'
+    assert [child.name for child in target.parent.iterdir()] == ['live.png']
+
+
+def test_publish_falls_back(tmp_path, monkeypatch):
+    clear_dir_cache()
+
+    def unsupported(source, target):
+        raise OSError(errno.EXDEV, 'Invalid cross-device link')
+
+    monkeypatch.setitem(output._PUBLISHERS, 'link', unsupported)
+    monkeypatch.setitem(output._PUBLISHERS, 'reflink', unsupported)
+    source, target = tmp_path / 'dated.png', tmp_path / 'live.png'
+    source.write_text('first')
+    assert publish(source, target) == 'copy'
+    assert target.read_text() == 'first' and not os.path.samefile(source, target)
+    # The method which worked is tried first for the rest of the run.
+    monkeypatch.setitem(output._PUBLISHERS, 'link', None)
+    assert publish(source, target) == 'copy'
+    clear_dir_cache()
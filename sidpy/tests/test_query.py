@@ -0,0 +1,73 @@
+"""
+Python tests for query.py.
+
+@author:
+    Oscar Sage David O'Hara
+@email:
+    oharao@tcd.ie
+"""
+
+import shutil
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from sidpy.archiver import Archiver
+from sidpy.daystore import write_day
+from sidpy.query import find_days, query
+from sidpy.reader import read_file
+
+DATA = Path(__file__).parent / 'data'
+
+
+@pytest.fixture(scope='module')
+def archive(tmp_path_factory):
+    root = tmp_path_factory.mktemp('archive')
+    archiver = Archiver(root)
+    # SID day archived as csv only, SuperSID days as csv and binary day store or binary day store only.
+    header, _ = read_file(DATA / '20210703_000000_NAA_S-0055.csv')
+    csv_dir = archiver.archive_path(header, True)[1]
+    csv_dir.mkdir(parents=True)
+    shutil.copy(DATA / '20210703_000000_NAA_S-0055.csv', csv_dir)
+    header, data = read_file(DATA / 'Dunsink_NAA_2021-07-10_000000.csv')
+    csv_dir = archiver.archive_path(header, False)[1]
+    csv_dir.mkdir(parents=True)
+    shutil.copy(DATA / 'Dunsink_NAA_2021-07-10_000000.csv', csv_dir)
+    write_day(archiver.day_store_path(header, False) / 'Dunsink_NAA_2021-07-10_000000.npz', header, data)
+    header = dict(header, UTC_StartTime='2021-07-1100:00:00')
+    write_day(archiver.day_store_path(header, False) / 'Dunsink_NAA_2021-07-11_000000.npz', header,
+              data.assign(datetime=data['datetime'] + pd.Timedelta(days=1)))
+    return root
+
+
+def test_find_days(archive):
+    paths = find_days(archive, 'Dunsink', 'NAA', datetime(2021, 7, 1), datetime(2021, 7, 31), 'super_sid')
+    assert [path.name for path in paths] == ['Dunsink_NAA_2021-07-10_000000.npz',
+                                             'Dunsink_NAA_2021-07-11_000000.npz']
+    assert [path.name for path in find_days(archive, 'Dunsink', 'NAA', datetime(2021, 7, 1),
+                                            datetime(2021, 7, 31), 'sid')] == ['20210703_000000_NAA_S-0055.csv']
+    # SID and SuperSID days are in different units, so are not mixed.
+    with pytest.raises(ValueError):
+        find_days(archive, 'Dunsink', 'NAA', datetime(2021, 7, 1), datetime(2021, 7, 31))
+    assert find_days(archive, 'Dunsink', 'NAA', datetime(2021, 7, 5), datetime(2021, 7, 31)) == paths
+    assert find_days(archive, 'Dunsink', 'HWU', datetime(2021, 7, 1), datetime(2021, 7, 31)) == []
+
+
+def test_query(archive):
+    result = query(archive, 'Dunsink', 'NAA', datetime(2021, 7, 10, 12), datetime(2021, 7, 11, 6), 'super_sid')
+    assert len(result) == 2
+    days = list(result)
+    assert days[0].index[0] == datetime(2021, 7, 10, 12)
+    assert days[1].index[-1] == datetime(2021, 7, 11, 6)
+    series = result.to_series()
+    assert len(series) == len(days[0]) + len(days[1])
+    assert series.index.is_monotonic_increasing
+    assert series.index[0] == days[0].index[0] and series.index[-1] == days[1].index[-1]
+
+
+def test_query_downsample(archive):
+    series = query(archive, 'Dunsink', 'NAA', datetime(2021, 7, 10), datetime(2021, 7, 10, 23, 59, 59),
+                   downsample='1h').to_series()
+    assert len(series) == 24
@@ -0,0 +1,55 @@
+"""
+Python tests for reader.py.
+
+@author:
+    Oscar Sage David O'Hara
+@email:
+    oharao@tcd.ie
+"""
+
+from pathlib import Path
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from sidpy.reader import parse_timestamps, read_file, read_header
+from sidpy.vlfclient import VLFClient
+
+DATA = Path(__file__).parent / 'data'
+
+
+@pytest.mark.parametrize('name, original_sid', [('20210703_000000_NAA_S-0055.csv', True),
+                                                ('Dunsink_NAA_2021-07-10_000000.csv', False)])
+def test_read_file_matches_legacy(name, original_sid):
+    df = VLFClient.read_csv(DATA / name)
+    expected = VLFClient.get_data(df, original_sid)
+    header, data = read_file(DATA / name)
+    assert header == VLFClient.get_header(df)
+    assert data['signal_strength'].dtype == np.float64
+    np.testing.assert_array_equal(data['datetime'].values, expected['datetime'].values)
+    np.testing.assert_array_equal(data['signal_strength'].values,
+                                  expected['signal_strength'].values.astype(np.float64))
+
+
+def test_parse_timestamps():
+    values = ['2021-07-03 00:00:00', '2021-07-03 00:00:01.5', '2021-12-31 23:59:59.123456']
+    np.testing.assert_array_equal(parse_timestamps(values), pd.to_datetime(values).values)
+
+
+def test_parse_timestamps_fallback():
+    assert parse_timestamps(['2021/07/03 00:00:01'])[0] == np.datetime64('2021-07-03T00:00:01')
+
+
+def test_read_header():
+    header = read_header(DATA / '20210703_000000_NAA_S-0055.csv')
+    assert header.site == 'Dunsink'
+    assert header.station_id == 'NAA'
+    assert (header.latitude, header.longitude) == (53.39, -6.34)
+    assert header.utc_start_time == datetime(2021, 7, 3)
+    assert header.sample_rate == 1.0
+    assert header.original_sid
+    assert header.parameters == read_file(DATA / '20210703_000000_NAA_S-0055.csv')[0]
+    assert not read_header(DATA / 'Dunsink_NAA_2021-07-10_000000.csv').original_sid
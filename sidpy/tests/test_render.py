@@ -0,0 +1,54 @@
+"""
+Python tests for render.py.
+
+@author:
+    Oscar Sage David O'Hara
+@email:
+    oharao@tcd.ie
+"""
+
+from pathlib import Path
+
+import matplotlib.image as mpimg
+import numpy as np
+import pytest
+
+from sidpy.reader import read_file
+from sidpy.render import get_template, plot_title, png_parent, render_plot
+from sidpy.vlfclient import VLFClient
+
+DATA = Path(__file__).parent / 'data'
+
+
+@pytest.fixture(scope='module')
+def goes():
+    return VLFClient.get_recent_goes(DATA / 'xrays-3-day.json')
+
+
+def same_image(a, b):
+    # The generated time, bottom right, may differ by a minute between the two renders.
+    return np.array_equal(mpimg.imread(a)[:, :750], mpimg.imread(b)[:, :750])
+
+
+def test_plot_title_and_parent():
+    header, _ = read_file(DATA / 'Dunsink_NAA_2021-07-10_000000.csv')
+    assert plot_title(header, False) == 'SuperSID (Dunsink, Ireland) - NAA (Maine, USA, 24 kHz)'
+    assert png_parent(header, '/archive', False) == Path('/archive/dunsink/super_sid/2021/07/10/png')
+
+
+@pytest.mark.parametrize('xrs', [False, True])
+def test_render_plot_matches_create_plot(tmp_path, goes, xrs):
+    gl, gs = goes if xrs else (None, None)
+    # Render every file twice so that the reused template is compared as well as a new one.
+    for name in ['20210703_000000_NAA_S-0055.csv', 'Dunsink_NAA_2021-07-10_000000.csv'] * 2:
+        file_path = DATA / name
+        header, data = read_file(file_path)
+        original_sid = '-' in header['MonitorID']
+        if xrs:
+            expected = VLFClient.create_plot_xrs(header, data, file_path, tmp_path / 'pyplot', gl, gs, original_sid)
+        else:
+            expected = VLFClient.create_plot(header, data, file_path, tmp_path / 'pyplot', original_sid)
+        image_path = render_plot(header, data, file_path, tmp_path / 'template', original_sid, gl, gs)
+        assert image_path == tmp_path / 'template' / expected.relative_to(tmp_path / 'pyplot')
+        assert same_image(image_path, expected)
+    assert get_template(xrs) is get_template(xrs)
@@ -0,0 +1,135 @@
+"""
+Python tests for reprocess.py.
+
+@author:
+    Oscar Sage David O'Hara
+@email:
+    oharao@tcd.ie
+"""
+
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+
+from sidpy import cli, reprocess as reprocess_module, run
+from sidpy.catalog import Catalog, rebuild
+from sidpy.reprocess import Checkpoint, archived_files, reprocess
+
+DATA = Path(__file__).parent / 'data'
+
+_reprocess_worker = reprocess_module._reprocess_worker
+
+
+def _crashing_worker(csv_path, *args):
+    # Dies as if killed, eg. by the kernel when out of memory.
+    if Path(csv_path).name.startswith('Dunsink'):
+        os._exit(1)
+    return _reprocess_worker(csv_path, *args)
+
+
+@pytest.fixture(scope='module')
+def processed(tmp_path_factory):
+    root = tmp_path_factory.mktemp('reprocess')
+    data_path = root / 'data'
+    data_path.mkdir()
+    shutil.copy(DATA / '20210703_000000_NAA_S-0055.csv', data_path)
+    shutil.copy(DATA / 'Dunsink_NAA_2021-07-10_000000.csv', data_path)
+    run.process_directory([data_path], root / 'archive', summary=False, goes_url=DATA / 'xrays-3-day.json')
+    return root / 'archive'
+
+
+@pytest.fixture
+def archive(processed, tmp_path):
+    shutil.copytree(processed, tmp_path / 'archive')
+    return tmp_path / 'archive'
+
+
+def test_archived_files(archive):
+    sid = archive / 'dunsink/sid/2021/07/03/csv/20210703_000000_NAA_S-0055.csv'
+    super_sid = archive / 'dunsink/super_sid/2021/07/10/csv/Dunsink_NAA_2021-07-10_000000.csv'
+    assert archived_files(archive) == [sid, super_sid]
+    assert archived_files(archive, site='Dunsink', start='2021-07-04') == [super_sid]
+    # The archive directories are listed if there is no catalog.
+    (archive / 'catalog.sqlite').unlink()
+    assert archived_files(archive) == [sid, super_sid]
+    assert archived_files(archive, station='NAA', instrument='sid', end='2021-07-03') == [sid]
+    assert archived_files(archive, station='NAU') == []
+
+
+def test_archived_files_partial_catalog(archive):
+    sid = archive / 'dunsink/sid/2021/07/03/csv/20210703_000000_NAA_S-0055.csv'
+    # Archived before the catalog was created, so missing from it.
+    earlier = archive / 'dunsink/sid/2021/07/02/csv/20210702_000000_NAA_S-0055.csv'
+    earlier.parent.mkdir(parents=True)
+    shutil.copy(sid, earlier)
+    with Catalog(archive) as catalog:
+        assert len(catalog.files()) == 2 and catalog.rebuilt is None
+    assert archived_files(archive, instrument='sid') == [earlier, sid]
+    rebuild(archive, workers=1)
+    with Catalog(archive) as catalog:
+        assert catalog.rebuilt is not None
+    # Once rebuilt, the catalog is listed rather than the archive directories.
+    shutil.rmtree(archive / 'dunsink' / 'sid')
+    assert archived_files(archive, instrument='sid') == [earlier, sid]
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_reprocess_in_place(archive, workers):
+    with Catalog(archive) as catalog:
+        expected = catalog.files()
+    pngs = sorted(archive.glob('*/*/*/*/*/png/*.png'))
+    live = archive / 'dunsink' / 'live' / 'NAA_SID.png'
+    live_mtime = live.stat().st_mtime_ns
+    for png in pngs:
+        png.unlink()
+
+    results = reprocess(archive, workers=workers, summary=False)
+    assert [error for _, _, error in results] == [None, None]
+    assert sorted(image for _, image, _ in results) == pngs
+    assert all(png.exists() for png in pngs)
+    assert len(list(archive.glob('*/*/*/*/*/csv/*.csv'))) == 2
+    assert live.stat().st_mtime_ns == live_mtime
+    assert not (archive / 'reprocess.checkpoint').exists()
+    with Catalog(archive) as catalog:
+        assert catalog.files() == expected
+
+
+def test_reprocess_worker_died(archive, monkeypatch):
+    monkeypatch.setattr(reprocess_module, '_reprocess_worker', _crashing_worker)
+    results = reprocess(archive, workers=2, summary=False)
+    results = {csv_path.name: (image, error) for csv_path, image, error in results}
+    assert results['20210703_000000_NAA_S-0055.csv'][0] is not None
+    assert results['20210703_000000_NAA_S-0055.csv'][1] is None
+    image, error = results['Dunsink_NAA_2021-07-10_000000.csv']
+    assert image is None and error.startswith('BrokenProcessPool')
+
+
+def test_reprocess_resumes(archive):
+    sid, super_sid = archived_files(archive)
+    job = {'site': None, 'station': None, 'instrument': None, 'start': None, 'end': None}
+    checkpoint = Checkpoint(archive, job)
+    checkpoint.extend([(sid, archive / 'dunsink/sid/2021/07/03/png/20210703_000000_NAA_S-0055.png', None)])
+    checkpoint.close()
+    # A partial line left by an interrupted job is ignored.
+    with open(checkpoint.path, 'a') as file:
+        file.write('{"csv": "dunsink/super')
+
+    sid_npz = archive / 'dunsink/sid/2021/07/03/npz/20210703_000000_NAA_S-0055.npz'
+    super_npz = archive / 'dunsink/super_sid/2021/07/10/npz/Dunsink_NAA_2021-07-10_000000.npz'
+    sid_npz.unlink()
+    super_npz.unlink()
+    results = reprocess(archive, workers=1, summary=False)
+    assert [csv_path for csv_path, _, _ in results] == [sid, super_sid]
+    assert all(image is not None for _, image, _ in results)
+    assert not sid_npz.exists() and super_npz.exists()
+
+    # Another job, or a restart, starts again.
+    assert not Checkpoint(archive, dict(job, site='dunsink')).done
+
+
+def test_cli_reprocess(archive):
+    args = cli.build_parser().parse_args(['reprocess', '-a', str(archive), '--site', 'Dunsink', '--restart'])
+    assert args.func is cli._reprocess
+    assert (args.site, args.workers, args.restart, args.summary) == ('Dunsink', 0, True, True)
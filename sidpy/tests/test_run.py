@@ -0,0 +1,94 @@
+"""
+Python tests for run.py.
+
+@author:
+    Oscar Sage David O'Hara
+@email:
+    oharao@tcd.ie
+"""
+
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+
+from sidpy import run
+
+DATA = Path(__file__).parent / 'data'
+_process_worker = run._process_worker
+
+
+def _crashing_worker(file_path, *args):
+    # Dies as if killed, eg. by the kernel when out of memory.
+    if Path(file_path).name.startswith('Dunsink'):
+        os._exit(1)
+    return _process_worker(file_path, *args)
+
+
+@pytest.fixture
+def data_dirs(tmp_path):
+    dirs = [tmp_path / 'in1', tmp_path / 'in2']
+    for directory in dirs:
+        directory.mkdir()
+    shutil.copy(DATA / '20210703_000000_NAA_S-0055.csv', dirs[0])
+    shutil.copy(DATA / 'Dunsink_NAA_2021-07-10_000000.csv', dirs[1])
+    (dirs[0] / 'b.txt').write_text('')
+    (dirs[0] / 'a.txt').write_text('')
+    return dirs
+
+
+def test_list_files(data_dirs):
+    assert [file.name for file in run.list_files(data_dirs)] == ['20210703_000000_NAA_S-0055.csv', 'a.txt',
+                                                                 'b.txt', 'Dunsink_NAA_2021-07-10_000000.csv']
+
+
+def test_process_safely(data_dirs, tmp_path):
+    broken = data_dirs[0] / '20210704_000000_NAA_S-0055.csv'
+    broken.write_text('# Site = Dunsink\n# StationID = NAA\n# UTC_StartTime = 2021-07-04 00:00:00\n')
+    image, error = run._process_safely(broken, tmp_path / 'archive')
+    assert image is None
+    assert error.startswith('ValueError')
+
+
+def test_process_directory_workers(data_dirs, tmp_path):
+    results = run.process_directory(data_dirs, tmp_path / 'archive', workers=2, summary=False,
+                                    goes_url=DATA / 'xrays-3-day.json')
+    assert [(file.name, error) for file, image, error in results if image is not None] == [
+        ('20210703_000000_NAA_S-0055.csv', None), ('Dunsink_NAA_2021-07-10_000000.csv', None)]
+
+
+def test_process_directory_worker_died(data_dirs, tmp_path, monkeypatch):
+    monkeypatch.setattr(run, '_process_worker', _crashing_worker)
+    results = run.process_directory(data_dirs, tmp_path / 'archive', workers=2, summary=False,
+                                    goes_url=DATA / 'xrays-3-day.json')
+    results = {file.name: (image, error) for file, image, error in results}
+    assert results['20210703_000000_NAA_S-0055.csv'][0] is not None
+    assert results['20210703_000000_NAA_S-0055.csv'][1] is None
+    image, error = results['Dunsink_NAA_2021-07-10_000000.csv']
+    assert image is None and error.startswith('BrokenProcessPool')
+    assert (data_dirs[1] / 'Dunsink_NAA_2021-07-10_000000.csv').exists()
+
+
+def test_process_directory_invalid_workers(data_dirs, tmp_path):
+    with pytest.raises(ValueError):
+        run.process_directory(data_dirs, tmp_path / 'archive', workers=0)
+
+
+def test_live_png_published(data_dirs, tmp_path):
+    run.process_directory(data_dirs[1:], tmp_path / 'archive', summary=False, goes_url=DATA / 'xrays-3-day.json')
+    site = tmp_path / 'archive' / 'dunsink'
+    dated = site / 'super_sid' / '2021' / '07' / '10' / 'png' / 'Dunsink_NAA_2021-07-10_000000.png'
+    live = site / 'live' / 'NAA_SuperSID.png'
+    assert live.read_bytes() == dated.read_bytes()
+    assert not [path for path in site.rglob('.*')]
+
+
+def test_archived_copy_skipped(data_dirs, tmp_path):
+    run.process_directory(data_dirs[1:], tmp_path / 'archive', summary=False, goes_url=DATA / 'xrays-3-day.json')
+    # The same file landing again, in another directory, is skipped and left in place.
+    copy = Path(shutil.copy(DATA / 'Dunsink_NAA_2021-07-10_000000.csv', data_dirs[0]))
+    [(file, image, error)] = [result for result in run.process_directory(
+        data_dirs, tmp_path / 'archive', summary=False, goes_url=DATA / 'xrays-3-day.json') if result[0] == copy]
+    assert image.name == 'Dunsink_NAA_2021-07-10_000000.png' and error is None
+    assert copy.exists()
@@ -0,0 +1,42 @@
+"""
+Python tests for summary.py.
+
+@author:
+    Oscar Sage David O'Hara
+@email:
+    oharao@tcd.ie
+"""
+
+from pathlib import Path
+
+from sidpy.archiver import Archiver
+from sidpy.daystore import write_day
+from sidpy.reader import read_file
+from sidpy.summary import day_files, render_summaries, site_days
+
+DATA = Path(__file__).parent / 'data'
+
+
+def test_site_days(tmp_path):
+    results = [('a.csv', tmp_path / 'dunsink/sid/2021/07/03/png/a.png', None),
+               ('b.csv', tmp_path / 'dunsink/super_sid/2021/07/03/png/b.png', None),
+               ('c.csv', tmp_path / 'birr/super_sid/2021/07/10/png/c.png', None),
+               ('d.csv', None, 'ValueError: broken')]
+    assert site_days(results, tmp_path) == [('birr', '2021-07-10'), ('dunsink', '2021-07-03')]
+
+
+def test_render_summaries(tmp_path):
+    header, data = read_file(DATA / 'Dunsink_NAA_2021-07-10_000000.csv')
+    archiver = Archiver(tmp_path)
+    for station in ['NAA', 'DHO']:
+        write_day(archiver.day_store_path(dict(header, StationID=station), False) /
+                  'Dunsink_{}_2021-07-10_000000.npz'.format(station), dict(header, StationID=station), data)
+    assert [path.name for path in day_files(tmp_path, 'Dunsink', '2021-07-10')] == [
+        'Dunsink_DHO_2021-07-10_000000.npz', 'Dunsink_NAA_2021-07-10_000000.npz']
+
+    results = [('Dunsink_NAA_2021-07-10_000000.csv',
+                tmp_path / 'dunsink/super_sid/2021/07/10/png/Dunsink_NAA_2021-07-10_000000.png', None)]
+    image_paths = render_summaries(results, tmp_path)
+    assert image_paths == [tmp_path / 'dunsink/summary/2021/07/10/dunsink_2021-07-10_summary.png']
+    assert image_paths[0].exists()
+    assert (tmp_path / 'dunsink' / 'live' / 'Summary.png').exists()
@@ -0,0 +1,84 @@
+"""
+Python tests for watch.py.
+
+@author:
+    Oscar Sage David O'Hara
+@email:
+    oharao@tcd.ie
+"""
+
+import shutil
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from sidpy import watch
+
+DATA = Path(__file__).parent / 'data'
+FILE = 'Dunsink_NAA_2021-07-10_000000.csv'
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    directory = tmp_path / 'data'
+    directory.mkdir()
+    return directory
+
+
+def test_poll_waits_for_file_to_settle(data_dir, tmp_path):
+    watcher = watch.Watcher([data_dir], tmp_path / 'archive', settle=0, use_watchdog=False, summary=False,
+                            goes_url=DATA / 'xrays-3-day.json')
+    with open(DATA / FILE, 'rb') as src, open(data_dir / FILE, 'wb') as dst:
+        dst.write(src.read(1000))
+    assert watcher.poll() == []
+    # Still being written, the size has changed since the last poll.
+    shutil.copy(DATA / FILE, data_dir / FILE)
+    assert watcher.poll() == []
+    [(path, image, error)] = watcher.poll()
+    assert path == data_dir / FILE and error is None
+    assert image.exists() and not (data_dir / FILE).exists()
+    assert watcher.poll() == []
+    # A copy of the archived file is skipped and left in place.
+    shutil.copy(DATA / FILE, data_dir / FILE)
+    assert watcher.poll() == [] and watcher.poll() == []
+    assert (data_dir / FILE).exists() and data_dir / FILE in watcher._processed
+
+
+def test_poll_retries_failed_file(data_dir, tmp_path):
+    watcher = watch.Watcher([data_dir], tmp_path / 'archive', settle=0, use_watchdog=False, summary=False,
+                            goes_url=DATA / 'xrays-3-day.json', retry_interval=0.2, max_retry_interval=0.3)
+    broken = data_dir / '20210704_000000_NAA_S-0055.csv'
+    broken.write_text('# Site = Dunsink\n# StationID = NAA\n# UTC_StartTime = 2021-07-04 00:00:00\n')
+    assert watcher.poll() == []
+    [(path, image, error)] = watcher.poll()
+    assert path == broken and image is None and error.startswith('ValueError')
+    assert watcher.poll() == [] and watcher._failed[broken][3] == 0.2
+    # Unchanged, the file is tried again after a backoff, doubled after each failure up to the maximum.
+    time.sleep(0.25)
+    assert watcher.poll() == []
+    assert len(watcher.poll()) == 1 and watcher._failed[broken][3] == 0.3
+    broken.unlink()
+    assert watcher.poll() == [] and watcher._failed == {}
+
+
+@pytest.mark.parametrize('use_watchdog', [False, pytest.param(True, marks=pytest.mark.skipif(
+    watch.Observer is None, reason='watchdog is not installed'))])
+def test_run_until_stopped(data_dir, tmp_path, use_watchdog):
+    watcher = watch.Watcher([data_dir], tmp_path / 'archive', settle=0.2, poll_interval=0.05,
+                            use_watchdog=use_watchdog, goes_url=DATA / 'xrays-3-day.json')
+    thread = threading.Thread(target=watcher.run)
+    thread.start()
+    try:
+        time.sleep(0.2)
+        shutil.copy(DATA / FILE, data_dir / FILE)
+        deadline = time.monotonic() + 20
+        while (data_dir / FILE).exists() and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        watcher.stop()
+        thread.join(10)
+    assert not thread.is_alive()
+    assert [entry['name'] for entry in watcher.manifest.entries.values()] == [FILE]
+    assert (tmp_path / 'archive' / 'dunsink' / 'live' / 'Summary.png').exists()
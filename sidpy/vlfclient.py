@@ -12,17 +12,19 @@ plot.
 
 import logging
 from datetime import datetime, timedelta
-from pathlib import Path
 
 import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 from matplotlib import dates
-from sunpy.time import parse_time
 
-from sidpy.config.config import transmitters
+from sidpy.compression import open_csv
+from sidpy.conditioning import condition_signal
+from sidpy.decimate import decimate_series
 from sidpy.geographic_midpoint.geographic_midpoint import Geographic_Midpoint
-from scipy.signal import savgol_filter
+from sidpy.goes import parse_goes
+from sidpy.reader import parse_header_lines, read_file, read_header
+from sidpy.render import PLOT_WIDTH, plot_title, png_parent
 
 np.seterr(divide='ignore')
 pd.options.mode.chained_assignment = None
@@ -44,20 +46,62 @@ class VLFClient:
         Parameters
         ----------
         filename : str
-            Path to csv file.
+            Path to csv file, which may be gzip or zstd compressed.
 
         Returns
         -------
         df : object
             Pandas dataframe containing csv data.
         """
-        df = pd.read_csv(filename,
-                         skipinitialspace=True,
-                         delimiter=',',
-                         names=['datetime', 'signal_strength'])
+        with open_csv(filename) as fh:
+            df = pd.read_csv(fh,
+                             skipinitialspace=True,
+                             delimiter=',',
+                             names=['datetime', 'signal_strength'])
         logging.debug('File %s read.', filename)
         return df
 
+    @staticmethod
+    def read_file(filename, original_sid=None):
+        """
+        Read .csv file header and data in a single pass, replacing the use of
+        read_csv, get_header & get_data.
+
+        Parameters
+        ----------
+        filename : str
+            Path to csv file, which may be gzip or zstd compressed.
+        original_sid : bool, optional
+            Statement on whether SID or Supersid data is being used, determined
+            from the MonitorID within the header when not given.
+
+        Returns
+        -------
+        header : dict
+            Dictionary containing observation parameters, eg. transmitter freq.
+        data : object
+            Pandas dataframe containing normalized csv data without comments.
+        """
+        return read_file(filename, original_sid)
+
+    @staticmethod
+    def read_header(filename):
+        """
+        Read only the header of a .csv file, without parsing the data.
+
+        Parameters
+        ----------
+        filename : str
+            Path to csv file, which may be gzip or zstd compressed.
+
+        Returns
+        -------
+        header : sidpy.reader.Header
+            Typed observation parameters, the raw dictionary is available as
+            ``header.parameters``.
+        """
+        return read_header(filename)
+
     @staticmethod
     def get_data(df, original_sid):
         """
@@ -85,9 +129,9 @@ class VLFClient:
                                             format='%Y-%m-%d %H:%M:%S.%f')
 
         if original_sid == False:
-            df['signal_strength'] = pd.to_numeric(df['signal_strength'])
-            df['signal_strength'] = savgol_filter(df['signal_strength'], 9, 1)
-            df['signal_strength'] = 20 * np.log10(df['signal_strength'])
+            # Smoothed and converted to dB in place, a block at a time.
+            signal = pd.to_numeric(df['signal_strength']).to_numpy(dtype=np.float64, copy=True)
+            df['signal_strength'] = condition_signal(signal, out=signal)
         logging.debug('File data obtained.')
         return df
 
@@ -106,13 +150,13 @@ class VLFClient:
         parameters : dict
             Dictionary containing observation parameters, eg. transmitter freq.
         """
-        parameters_dict = {}
-        for index, row in df.iterrows():
-            if (row[0])[0] == '#':
-                row = row['datetime'][1:].replace(" ", "").rstrip('\n')
-                para = row.split('=')
-                if len(para) == 2:
-                    parameters_dict[para[0]] = para[1]
+        # The header is the leading block of comments, stop at the first data line.
+        lines = []
+        for value in df['datetime'].values:
+            if not str(value).startswith('#'):
+                break
+            lines.append(value)
+        parameters_dict = parse_header_lines(lines)
         logging.debug('File header obtained.')
         return parameters_dict
 
@@ -131,20 +175,15 @@ class VLFClient:
         try:
             data = pd.read_json(file)
             logging.debug('GOES swpc xrays-7-day data acquired.')
-            data_short = data[data["energy"] == "0.05-0.4nm"]
-            data_long = data[data["energy"] == "0.1-0.8nm"]
-            time_array = [parse_time(x).datetime for x in
-                          data_short['time_tag'].values]
-
-            gl = pd.Series(data_long["flux"].values, index=time_array)
-            gs = pd.Series(data_short["flux"].values, index=time_array)
+            gl, gs = parse_goes(data)
             logging.debug('GOES XRS data processed.')
             return gl, gs
         except Exception:
+            logging.warning('GOES XRS data could not be obtained from %s.', file, exc_info=True)
             return None, None
 
     @staticmethod
-    def create_plot_xrs(header, data, file_path, archive_path, gl, gs, original_sid=False):
+    def create_plot_xrs(header, data, file_path, archive_path, gl, gs, original_sid=False, decimate=True):
         """
         Generate plot for given parameters and data.
 
@@ -164,7 +203,9 @@ class VLFClient:
             GOES XRS Short data.
         original_sid : bool
             Statement on whether SID or Supersid data is being used.
-
+        decimate : bool
+            Reduce the data to the minimum and maximum within each pixel column
+            before plotting.
 
         Returns
         -------
@@ -173,10 +214,10 @@ class VLFClient:
         """
         fig, ax = plt.subplots(2, sharex=True, figsize=(9, 6))
         # Get local sunrise and sunset markers.
-        geo = Geographic_Midpoint()
         date_time_obj = datetime.strptime(header['UTC_StartTime'], '%Y-%m-%d%H:%M:%S')
         try:
-            sunrise, sunset = geo.sunrise_sunset(date_time_obj.date(), header['Latitude'], header['Longitude'])
+            sunrise, sunset = Geographic_Midpoint.sunrise_sunset_cached(date_time_obj.date(), header['Latitude'],
+                                                                        header['Longitude'])
             ax[0].axvline(sunrise, alpha=0.5, ls="dashed", color='orange', label='Local Sunrise')
             ax[0].axvline(sunset, alpha=0.5, ls="dashed", color='red', label='Local Sunset')
         except ValueError:
@@ -186,6 +227,8 @@ class VLFClient:
         if date_time_obj.date() == datetime.utcnow().date():
             sid.sort_index()
             sid = sid.truncate(after=datetime.utcnow().replace(minute=0, second=0) - timedelta(seconds=20))
+        if decimate:
+            sid = decimate_series(sid, PLOT_WIDTH, (date_time_obj, date_time_obj + timedelta(days=1)))
         ax[0].plot(sid, color='k')
         ax[0].xaxis.set_major_locator(dates.HourLocator(interval=2))
         ax[0].xaxis.set_major_formatter(dates.DateFormatter("%H:%M"))
@@ -218,38 +261,24 @@ class VLFClient:
         # Create axis and plot labels.
         ax[1].set_ylabel("Flux (Wm$^{-2}$)")
         ax[1].set_xlabel("Time: {:s} (UTC)".format(date_time_obj.strftime("%Y-%m-%d")))
-        if original_sid == True:
-            ax[0].set_ylabel("Volts (V)")
-            ax[0].set_title('SID (' + header['Site'] + ') - ' + header['StationID'] + ' (' +
-                            transmitters[str(header['StationID'])][2] + ', ' + header['Frequency'][0:-3] +
-                            '.' + header['Frequency'][2] + 'kHz' + ')')
-            parent = (Path(archive_path) / header['Site'].lower() / 'sid' /
-                      date_time_obj.strftime('%Y') / date_time_obj.strftime('%m') /
-                      date_time_obj.strftime('%d') / 'png')
-        else:
-            ax[0].set_ylabel("Signal Strength (dB)")
-            ax[0].set_title('SuperSID (' + header['Site'] + ', ' + header['Country'] + ') - ' +
-                            header['StationID'] + ' (' + transmitters[str(header['StationID'])][2] +
-                            ', ' + header['Frequency'][0:-3] + ' kHz' + ')')
-            parent = (Path(archive_path) / header['Site'].lower() / 'super_sid' /
-                      date_time_obj.strftime('%Y') / date_time_obj.strftime('%m') /
-                      date_time_obj.strftime('%d') / 'png')
+        ax[0].set_ylabel("Volts (V)" if original_sid == True else "Signal Strength (dB)")
+        ax[0].set_title(plot_title(header, original_sid))
+        parent = png_parent(header, archive_path, original_sid)
         # Configure image dimensions.
         plt.subplots_adjust(hspace=0.01)
         dpi = fig.get_dpi()
-        fig.set_size_inches(1000 / float(dpi), 500 / float(dpi))
+        fig.set_size_inches(PLOT_WIDTH / float(dpi), 500 / float(dpi))
         fig.tight_layout()
         # Save figure to the archive.
         image_path = (parent / file_path.name).with_suffix('.png')
-        if not parent.exists():
-            parent.mkdir(parents=True)
+        parent.mkdir(parents=True, exist_ok=True)
         fig.savefig(fname=image_path)
         plt.close()
         logging.debug('%s generated', image_path.name)
         return image_path
 
     @staticmethod
-    def create_plot(header, data, file_path, archive_path, original_sid=False):
+    def create_plot(header, data, file_path, archive_path, original_sid=False, decimate=True):
         """
         Generate plot for given parameters and data.
 
@@ -265,6 +294,9 @@ class VLFClient:
             Path to archive.
         original_sid : bool
             Statement on whether SID or Supersid data is being used.
+        decimate : bool
+            Reduce the data to the minimum and maximum within each pixel column
+            before plotting.
 
         Returns
         -------
@@ -273,16 +305,18 @@ class VLFClient:
         """
         fig, ax = plt.subplots(1, figsize=(9, 3))
         # Get local sunrise and sunset markers.
-        geo = Geographic_Midpoint()
         date_time_obj = datetime.strptime(header['UTC_StartTime'], '%Y-%m-%d%H:%M:%S')
         try:
-            sunrise, sunset = geo.sunrise_sunset(date_time_obj.date(), header['Latitude'], header['Longitude'])
+            sunrise, sunset = Geographic_Midpoint.sunrise_sunset_cached(date_time_obj.date(), header['Latitude'],
+                                                                        header['Longitude'])
             ax.axvline(sunrise, alpha=0.5, ls="dashed", color='orange', label='Local Sunrise')
             ax.axvline(sunset, alpha=0.5, ls="dashed", color='red', label='Local Sunset')
         except ValueError:
             logging.warning("Sun is always above the horizon on this day, at this location.")
         # Plot VLF data.
         sid = pd.Series(data['signal_strength'].values, index=pd.to_datetime(data['datetime']))
+        if decimate:
+            sid = decimate_series(sid, PLOT_WIDTH, (date_time_obj, date_time_obj + timedelta(days=1)))
         ax.plot(sid, color='k')
         ax.xaxis.set_major_locator(dates.HourLocator(interval=2))
         ax.xaxis.set_major_formatter(dates.DateFormatter("%H:%M"))
@@ -297,31 +331,17 @@ class VLFClient:
                 fontsize=8)
         # Create axis and plot labels.
         ax.set_xlabel("Time: {:s} (UTC)".format(date_time_obj.strftime("%Y-%m-%d")))
-        if original_sid == True:
-            ax.set_ylabel("Volts (V)")
-            ax.set_title('SID (' + header['Site'] + ') - ' + header['StationID'] + ' (' +
-                         transmitters[header['StationID']][2] + ', ' + header['Frequency'][0:-3] +
-                         '.' + header['Frequency'][2] + 'kHz' + ')')
-            parent = (Path(archive_path) / header['Site'].lower() / 'sid' /
-                      date_time_obj.strftime('%Y') / date_time_obj.strftime('%m') /
-                      date_time_obj.strftime('%d') / 'png')
-        else:
-            ax.set_ylabel("Signal Strength (dB)")
-            ax.set_title('SuperSID (' + header['Site'] + ', ' + header['Country'] + ') - ' +
-                         header['StationID'] + ' (' + transmitters[header['StationID']][2] +
-                         ', ' + header['Frequency'][0:-3] + ' kHz' + ')')
-            parent = (Path(archive_path) / header['Site'].lower() / 'super_sid' /
-                      date_time_obj.strftime('%Y') / date_time_obj.strftime('%m') /
-                      date_time_obj.strftime('%d') / 'png')
+        ax.set_ylabel("Volts (V)" if original_sid == True else "Signal Strength (dB)")
+        ax.set_title(plot_title(header, original_sid))
+        parent = png_parent(header, archive_path, original_sid)
         # Configure image dimensions.
         plt.subplots_adjust(hspace=0.01)
         dpi = fig.get_dpi()
-        fig.set_size_inches(1000 / float(dpi), 400 / float(dpi))
+        fig.set_size_inches(PLOT_WIDTH / float(dpi), 400 / float(dpi))
         fig.tight_layout()
         # Save figure to the archive.
         image_path = (parent / file_path.name).with_suffix('.png')
-        if not parent.exists():
-            parent.mkdir(parents=True)
+        parent.mkdir(parents=True, exist_ok=True)
         fig.savefig(fname=image_path)
         plt.close()
         logging.debug('%s generated', (image_path.name))
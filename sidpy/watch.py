@@ -0,0 +1,303 @@
+"""
+Long running watch mode, an alternative to the hourly `sidpy.run.process_directory`
+schedule. The data directories are monitored using inotify (or the equivalent
+on other platforms) through the optional watchdog package, falling back to
+polling. Files are processed once they have stopped changing, the live pngs of
+the "current" files are updated as they grow, the GOES XRS data is refreshed on
+its own timer and the watcher shuts down gracefully on SIGTERM or SIGINT.
+
+@author:
+    Oscar Sage David O'Hara
+@email:
+    oharao@tcd.ie
+"""
+
+import logging
+import os
+import signal
+import threading
+import time
+from pathlib import Path
+
+from sidpy.catalog import Catalog
+from sidpy.goes import GOES_URL, GOESCache, GOESStore
+from sidpy.live import LiveTail, is_live_file
+from sidpy.logger import ensure_logger
+from sidpy.manifest import Manifest
+from sidpy.run import _process_safely, _skip_processed, list_files
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    FileSystemEventHandler, Observer = object, None
+
+__all__ = ['Watcher', 'watch']
+
+
+class _EventHandler(FileSystemEventHandler):
+    """
+    Collect the paths of files created, modified or moved into the watched
+    directories.
+    """
+
+    def __init__(self, watcher):
+        super().__init__()
+        self.watcher = watcher
+
+    def on_any_event(self, event):
+        if event.is_directory:
+            return
+        path = getattr(event, 'dest_path', None) or event.src_path
+        self.watcher.notify(Path(os.fsdecode(path)))
+
+
+class Watcher:
+    """
+    Watch the data directories and process files as they land.
+
+    Parameters
+    ----------
+    data_path : list
+        Directories containing data to be processed.
+    archive_path : str
+        Directory where the data will be archived.
+    settle : float, optional
+        Time in seconds for which a file must not change before it is
+        processed, so that partially written files are not processed.
+    poll_interval : float, optional
+        Time in seconds between checks of the data directories.
+    goes_interval : float, optional
+        Time in seconds between refreshes of the GOES XRS data.
+    goes_url : str, optional
+        URL of the GOES XRS feed, or path to a local json file.
+    use_watchdog : bool, optional
+        Use filesystem events rather than polling, by default used when the
+        watchdog package is installed.
+    summary : bool, optional
+        Render the site summaries of newly processed files.
+    live_interval : float, optional
+        Time in seconds between updates of the live pngs of the "current"
+        files, which are still being written to. Disabled if None.
+    compression : str, optional
+        Compress the archived csv files, either 'gzip' or 'zstd'.
+    retry_interval : float, optional
+        Time in seconds before a file which could not be processed is tried
+        again, doubled after each further failure. A file which changes is
+        tried again once it has settled.
+    max_retry_interval : float, optional
+        Maximum time in seconds between attempts at a file which could not be
+        processed.
+    """
+
+    def __init__(self, data_path, archive_path, settle=10, poll_interval=1, goes_interval=600, goes_url=GOES_URL,
+                 use_watchdog=None, summary=True, live_interval=60, compression=None,
+                 retry_interval=60, max_retry_interval=3600):
+        self.data_path = [Path(path) for path in data_path]
+        self.archive_path = Path(archive_path)
+        self.settle = settle
+        self.poll_interval = poll_interval
+        self.goes_interval = goes_interval
+        self.use_watchdog = Observer is not None if use_watchdog is None else use_watchdog
+        if self.use_watchdog and Observer is None:
+            raise ImportError('The watchdog package is required to watch for filesystem events.')
+        self.summary = summary
+        self.compression = compression
+        self.retry_interval = retry_interval
+        self.max_retry_interval = max_retry_interval
+        self.manifest = Manifest(self.archive_path)
+        self.catalog = Catalog(self.archive_path)
+        self.goes_cache = GOESCache(self.archive_path / 'goes', url=goes_url, ttl=goes_interval)
+        self.goes_store = GOESStore(self.archive_path / 'goes' / 'xrs')
+        self.live_interval = live_interval
+        self.live = LiveTail(self.archive_path, self.goes_store)
+        self._live_files = set()
+        self._next_live = 0
+        self.stop_event = threading.Event()
+        self._goes_fetched = threading.Event()
+        self._lock = threading.Lock()
+        self._events = set()
+        # Path : (size, mtime, time the size and mtime were first seen), of files waiting to settle.
+        self._pending = {}
+        # Path : (size, mtime, time of the next attempt, seconds since the last), of files which could not be
+        # processed, eg. while the GOES data or an nfs mount was unavailable.
+        self._failed = {}
+        # Path : (size, mtime), of files already processed, checked again only once changed.
+        self._processed = {}
+        self._scan = True
+
+    def notify(self, path):
+        """
+        Add a path to be checked on the next poll, called from the watchdog thread.
+        """
+        with self._lock:
+            self._events.add(path)
+
+    def stop(self):
+        """
+        Stop the watcher once the file being processed, if any, is complete.
+        """
+        self.stop_event.set()
+
+    def _candidates(self):
+        # Directories are listed on the first poll and on every poll without filesystem events.
+        if self._scan or not self.use_watchdog:
+            self._scan = False
+            paths = set(list_files(self.data_path))
+        else:
+            paths = set()
+        with self._lock:
+            paths.update(self._events)
+            self._events.clear()
+        return paths | set(self._pending) | set(self._failed)
+
+    def _settled(self, path, now):
+        try:
+            stat = path.stat()
+        except OSError:
+            # Moved or removed before being processed.
+            self._pending.pop(path, None)
+            self._failed.pop(path, None)
+            return False
+        state = (stat.st_size, stat.st_mtime)
+        failed = self._failed.get(path)
+        if failed is not None and failed[:2] != state:
+            # Changed since the failure, tried again once settled.
+            del self._failed[path]
+        elif failed is not None and now < failed[2]:
+            return False
+        if self._processed.get(path) == state:
+            return False
+        self._processed.pop(path, None)
+        if path not in self._pending or self._pending[path][:2] != state:
+            self._pending[path] = state + (now,)
+            return False
+        return now - self._pending[path][2] >= self.settle
+
+    def _refresh_goes(self):
+        # Only fetches the feed, the store is updated from the main thread between files.
+        while not self.stop_event.is_set():
+            self.goes_cache.refresh()
+            self._goes_fetched.set()
+            self.stop_event.wait(self.goes_interval)
+
+    def update_goes(self):
+        """
+        Merge the cached GOES XRS data into the local store.
+        """
+        gl, gs = self.goes_cache.get()
+        self.goes_store.merge(gl, gs)
+
+    def update_live(self):
+        """
+        Update the live pngs from the rows appended to the "current" files.
+        """
+        for path in sorted(self._live_files):
+            if not path.exists():
+                self._live_files.discard(path)
+                continue
+            try:
+                self.live.update(path)
+            except Exception:
+                logging.exception('%s : The following exception was raised:', path)
+
+    def poll(self):
+        """
+        Check the data directories once, processing all files which have settled.
+
+        Returns
+        -------
+        results : list
+            A (file path, image path, error) tuple for each file processed.
+        """
+        if self._goes_fetched.is_set():
+            self._goes_fetched.clear()
+            self.update_goes()
+        now = time.monotonic()
+        candidates = {path for path in self._candidates() if path.suffix == '.csv' and path.parent in self.data_path}
+        self._live_files.update(path for path in candidates if is_live_file(path))
+        if self.live_interval is not None and now >= self._next_live:
+            self._next_live = now + self.live_interval
+            self.update_live()
+        ready = sorted(path for path in candidates if not is_live_file(path) and self._settled(path, now))
+        results = []
+        for path in ready:
+            if self.stop_event.is_set():
+                break
+            del self._pending[path]
+            key = self.manifest.match(path)
+            if key is not None:
+                _skip_processed(path, self.manifest.entries[key])
+                stat = path.stat()
+                self._processed[path] = (stat.st_size, stat.st_mtime)
+                continue
+            image, error = _process_safely(path, self.archive_path, manifest=self.manifest,
+                                           goes_store=self.goes_store, catalog=self.catalog,
+                                           compression=self.compression)
+            if image is None and path.exists():
+                stat = path.stat()
+                delay = self.retry_interval
+                if path in self._failed:
+                    delay = min(2 * self._failed[path][3], self.max_retry_interval)
+                self._failed[path] = (stat.st_size, stat.st_mtime, time.monotonic() + delay, delay)
+                logging.debug('%s : Retrying in %.0f s.', path, delay)
+            else:
+                self._failed.pop(path, None)
+            results.append((path, image, error))
+            logging.info('%s : %s', path, 'Has been processed and archived.' if image else 'Could not be processed.')
+        self.manifest.save()
+        if self.summary and results:
+            from sidpy.summary import render_summaries
+            render_summaries(results, self.archive_path, self.goes_store)
+        return results
+
+    def run(self):
+        """
+        Watch the data directories until stopped, by `stop`, SIGTERM or SIGINT.
+        """
+        ensure_logger()
+        if threading.current_thread() is threading.main_thread():
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                signal.signal(signum, lambda signum, frame: self.stop())
+        goes_thread = threading.Thread(target=self._refresh_goes, name='goes-refresh', daemon=True)
+        goes_thread.start()
+        observer = None
+        if self.use_watchdog:
+            observer = Observer()
+            for path in self.data_path:
+                observer.schedule(_EventHandler(self), str(path), recursive=False)
+            observer.start()
+        logging.info('Watching %s (%s).', ', '.join(str(path) for path in self.data_path),
+                     'filesystem events' if observer is not None else 'polling')
+        try:
+            while not self.stop_event.is_set():
+                try:
+                    self.poll()
+                except Exception:
+                    logging.exception('The following exception was raised:')
+                self.stop_event.wait(self.poll_interval)
+        finally:
+            self.stop_event.set()
+            if observer is not None:
+                observer.stop()
+                observer.join()
+            goes_thread.join(timeout=5)
+            self.catalog.close()
+            logging.info('Watch stopped.')
+
+
+def watch(data_path, archive_path, **kwargs):
+    """
+    Process files within the data directories as they land, until SIGTERM or
+    SIGINT is received.
+
+    Parameters
+    ----------
+    data_path : list
+        Directories containing data to be processed.
+    archive_path : str
+        Directory where the data will be archived.
+    **kwargs
+        Passed to `Watcher`.
+    """
+    Watcher(data_path, archive_path, **kwargs).run()